@@ -0,0 +1,344 @@
+''' Benchmarks of the metrics-service hot paths, with JSON results comparable across commits.
+
+    Runs offline on synthetic rasters (benchmarks.synthetic_raster) and times:
+        - population: estimate_population at radii on both sides of THRESHOLD_RADIUS_M, with the
+          prefix/pyramid indexes (--indexes) or on plain window reads
+        - impact_metrics: ImpactMetrics scalar vs ImpactMetricsVec batch throughput, for the
+          overpressure isobar solver and the full summary
+        - coastal: tsunami_exposure on a coastal index built from a synthetic land/water mask
+        - serialization: time and size of the bulk response payloads, through pydantic and
+          stdlib json (before) and services.serialization (orjson, MessagePack, Arrow, gzip, zstd)
+        - http: FastAPI endpoints through an in-process ASGI client (needs httpx) at several
+          concurrency levels
+
+        python -m benchmarks.run --out bench.json
+        python -m benchmarks.run --out bench-new.json --compare bench.json
+
+    Service configuration is read at import time, so the environment is set up before the
+    service modules are imported.
+'''
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.synthetic_raster import MASK_NAME, write_benchmark_rasters, write_land_mask
+
+BENCH_LON, BENCH_LAT = 0.3, 0.2
+API_KEY = "bench"
+
+
+def configure_environment(data_dir: str, indexes: bool) -> dict:
+    ''' Write the synthetic rasters (and optionally their indexes) and point the service at them. '''
+    rasters = write_benchmark_rasters(data_dir, BENCH_LON, BENCH_LAT)
+    os.environ["RASTER_HIGHRES_PATH"] = rasters["highres"]["path"]
+    os.environ["RASTER_LOWRES_PATH"] = rasters["lowres"]["path"]
+    os.environ["POPULATION_CACHE_SIZE"] = "0"  # time the computation, not the cache
+    os.environ["POPULATION_CACHE_PATH"] = ""
+    os.environ["API_KEY"] = API_KEY
+
+    prefix_high, prefix_low, pyramid = (os.path.join(data_dir, name)
+                                        for name in ("prefix_100", "prefix_1000", "pyramid"))
+    if indexes:
+        from services.population_pyramid import build_pyramid
+        from services.summed_area import build_prefix_tables
+        for raster, out_dir in ((rasters["highres"]["path"], prefix_high), (rasters["lowres"]["path"], prefix_low)):
+            if not os.path.isdir(out_dir):
+                build_prefix_tables(raster, out_dir)
+        if not os.path.isdir(pyramid):
+            build_pyramid(rasters["highres"]["path"], pyramid)
+    else:
+        prefix_high = prefix_low = pyramid = os.path.join(data_dir, "no_index")
+    os.environ["PREFIX_HIGHRES_DIR"] = prefix_high
+    os.environ["PREFIX_LOWRES_DIR"] = prefix_low
+    os.environ["PYRAMID_DIR"] = pyramid
+    return rasters
+
+
+def timings(fn: callable, repeat: int, warmup: int = 1) -> dict:
+    ''' Call fn repeat times (after warmup calls) and summarize the wall times in ms. '''
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return summarize_ms(samples)
+
+
+def summarize_ms(samples: list[float]) -> dict:
+    s = np.asarray(samples)
+    return {"n": len(samples), "min_ms": float(s.min()), "median_ms": float(np.median(s)),
+            "p95_ms": float(np.percentile(s, 95)), "mean_ms": float(s.mean())}
+
+
+def bench_population(repeat: int) -> list[dict]:
+    from services import population_service
+    from services.population_service import THRESHOLD_RADIUS_M, estimate_population
+
+    radii = [1_000.0, 10_000.0, 50_000.0, 0.99 * THRESHOLD_RADIUS_M, 1.01 * THRESHOLD_RADIUS_M,
+             300_000.0, 1_000_000.0]
+    results = []
+    for radius in radii:
+        # Same order of preference as estimate_population
+        if population_service.select_prefix_index(radius) is not None:
+            path = "prefix"
+        elif population_service.pyramid.load() is not None:
+            path = "pyramid"
+        else:
+            path = "window"
+        stats = timings(lambda: estimate_population(BENCH_LON, BENCH_LAT, radius), repeat)
+        results.append({"case": f"estimate_population r={radius / 1000:g}km", "radius_m": radius,
+                        "resolution_m": population_service.get_resolution_m(radius), "path": path,
+                        "population": estimate_population(BENCH_LON, BENCH_LAT, radius), **stats})
+    return results
+
+
+def bench_impact_metrics(batch: int, repeat: int) -> list[dict]:
+    from services.impact_metrics import Asteroid, Atmosphere, ImpactMetrics, ImpactScenario, Target
+    from services.impact_metrics_vec import ImpactMetricsVec
+
+    rng = np.random.default_rng(0)
+    d = 10.0 ** rng.uniform(1, 3, batch)
+    v = rng.uniform(11e3, 30e3, batch)
+    rho = rng.uniform(1500, 3500, batch)
+    h = rng.uniform(1e3, 3e4, batch)
+    E = ImpactMetricsVec.kinetic_energy(d, v, rho, 1.0, 0.0)
+    n_scalar = min(batch, 200)  # the scalar paths are timed on a subset and scaled per call
+
+    def scalar_radius():
+        for i in range(n_scalar):
+            ImpactMetrics.radius_for_overpressure_airburst(float(E[i]), float(h[i]), 20.0)
+
+    def scalar_summary():
+        for i in range(n_scalar):
+            ImpactMetrics.summarize(Asteroid(float(d[i]), float(v[i]), float(rho[i])),
+                                    ImpactScenario(is_airburst=True), Target(), Atmosphere(burst_altitude_m=float(h[i])))
+
+    cases = [
+        ("radius_for_overpressure_airburst scalar", scalar_radius, n_scalar),
+        ("radius_for_overpressure_airburst batch",
+         lambda: ImpactMetricsVec.radius_for_overpressure_airburst(E, h, 20.0), batch),
+        ("summarize scalar", scalar_summary, n_scalar),
+        ("summarize batch", lambda: ImpactMetricsVec.summarize_batch(d, v, rho, 0.0, h), batch),
+    ]
+    results = []
+    for name, fn, n in cases:
+        stats = timings(fn, repeat)
+        results.append({"case": name, "scenarios": n, **stats,
+                        "scenarios_per_s": n / (stats["median_ms"] / 1000.0)})
+    return results
+
+
+def bench_coastal(data_dir: str, lowres_path: str, repeat: int) -> list[dict]:
+    import rasterio
+    from pyproj import Transformer
+
+    from benchmarks.synthetic_raster import MOLLWEIDE
+    from services.coastal_index import CoastalIndex, build_coastal_index, tsunami_exposure
+
+    mask_path = os.path.join(data_dir, MASK_NAME)
+    index_dir = os.path.join(data_dir, "coastal_index")
+    if not os.path.exists(mask_path):
+        write_land_mask(mask_path, lowres_path)
+    if not os.path.isdir(index_dir):
+        build_coastal_index(mask_path, lowres_path, index_dir)
+    index = CoastalIndex(index_dir)
+
+    # 50 km off the northern shore of the synthetic bay (see write_land_mask)
+    with rasterio.open(lowres_path) as src:
+        half = src.width * src.res[0] / 2.0
+        center_x, center_y = src.transform.c + half, src.transform.f - half
+    lon, lat = Transformer.from_crs(MOLLWEIDE, "EPSG:4326", always_xy=True).transform(
+        center_x, center_y - 0.3 * half - 50_000.0)
+    results = []
+    for energy in (1e18, 1e20, 1e22):
+        stats = timings(lambda: tsunami_exposure(index, lon, lat, energy, 3000.0), repeat)
+        result = tsunami_exposure(index, lon, lat, energy, 3000.0)
+        results.append({"case": f"tsunami_exposure E={energy:g}J", "search_radius_km": result["search_radius_km"],
+                        "coast_cells": result["coast_cells"], "exposed_population": result["exposed_population"],
+                        **stats})
+    return results
+
+
+def bench_serialization(repeat: int) -> list[dict]:
+    from fastapi.encoders import jsonable_encoder
+
+    from models.impact_models import ProfileResponse
+    from routers.population import CorridorResponse, PopulationBatchResponse
+    from services import serialization
+    from services.radial_profiles import PROFILE_MAX_POINTS
+    from services.serialization import Table
+
+    rng = np.random.default_rng(0)
+    n_batch, n_corridor = 1000, 10_000
+    r = np.geomspace(100.0, 1e5, PROFILE_MAX_POINTS)
+    profile = {"r_m": r, "overpressure_kpa": 1e5 / r, "thermal_fluence_Jm2": 1e12 / r ** 2,
+               "max_rel_error": {"overpressure": 0.007, "thermal": 0.012}}
+    batch = {"results": Table(lat=rng.uniform(-60, 60, n_batch), lon=rng.uniform(-180, 180, n_batch),
+                              radius_m=np.full(n_batch, 20_000.0), population_estimate=rng.uniform(0, 1e7, n_batch))}
+    corridor = {"radius_m": 20_000.0, "length_m": 1e6,
+                "results": Table(lat=np.linspace(0, 9, n_corridor), lon=np.linspace(0, 9, n_corridor),
+                                 distance_m=np.linspace(0, 1e6, n_corridor), population_estimate=rng.uniform(0, 1e7, n_corridor))}
+
+    def as_lists(payload: dict) -> dict:
+        # What the handlers used to hand pydantic: lists of floats and lists of records
+        return {k: v.tolist() if isinstance(v, np.ndarray) else v.records() if isinstance(v, Table) else v
+                for k, v in payload.items()}
+
+    payloads = {
+        f"profile n={PROFILE_MAX_POINTS}": (ProfileResponse, profile),
+        f"estimate_batch n={n_batch}": (PopulationBatchResponse, batch),
+        f"corridor n={n_corridor}": (CorridorResponse, corridor),
+    }
+    results = []
+    for name, (model, payload) in payloads.items():
+        fields = as_lists(payload)
+        cases = {
+            # Before: a response model validated from lists, rendered by JSONResponse (jsonable_encoder
+            # + json.dumps, older FastAPI) or by pydantic's own JSON writer (recent FastAPI)
+            "pydantic + json": lambda: json.dumps(jsonable_encoder(model(**fields)), separators=(",", ":")).encode(),
+            "pydantic dump_json": lambda: model(**fields).model_dump_json().encode(),
+            "orjson": lambda: serialization.encode_json(payload),
+            "orjson + gzip": lambda: serialization.compress(serialization.encode_json(payload), "gzip")[0],
+        }
+        if serialization.zstandard is not None:
+            cases["orjson + zstd"] = lambda: serialization.compress(serialization.encode_json(payload), "zstd")[0]
+        if serialization.msgpack is not None:
+            cases["msgpack"] = lambda: serialization.encode_msgpack(payload)
+        if serialization.pa is not None:
+            cases["arrow"] = lambda: serialization.encode_arrow(payload)
+        for method, fn in cases.items():
+            stats = timings(fn, repeat)
+            results.append({"case": f"{name} {method}", "bytes": len(fn()), **stats})
+    return results
+
+
+def bench_http(concurrency: list[int], requests: int) -> list[dict]:
+    try:
+        import httpx
+    except ImportError:
+        return [{"case": "http", "skipped": "httpx is not installed"}]
+    import main
+
+    headers = {"X-API-KEY": API_KEY}
+    # Points are jittered per request so coalescing and caches don't short-circuit the work
+    endpoints = {
+        "POST /impacts/energy/kinetic_energy": lambda i: (
+            "/impacts/energy/kinetic_energy",
+            {"diameter_m": 50.0 + i, "velocity_mps": 17e3, "density_kgm3": 3000.0, "shape_factor": 1.0, "porosity": 0.0}),
+        "POST /population/estimate": lambda i: (
+            "/population/estimate",
+            {"lon": BENCH_LON + 1e-4 * i, "lat": BENCH_LAT, "radius_m": 50_000.0, "exact": True}),
+        "POST /impacts/casualty_estimate": lambda i: (
+            "/impacts/casualty_estimate",
+            {"lon": BENCH_LON + 1e-4 * i, "lat": BENCH_LAT, "diameter_m": 60.0, "velocity_mps": 17e3,
+             "density_kgm3": 3000.0, "burst_altitude_m": 8000.0}),
+    }
+
+    async def run(client, make_request, level: int) -> tuple[list[float], float, int]:
+        latencies, errors = [], 0
+        counter = iter(range(requests))
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                path, body = make_request(i)
+                t0 = time.perf_counter()
+                response = await client.post(path, json=body, headers=headers)
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+                errors += response.status_code != 200
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(level)])
+        return latencies, time.perf_counter() - t0, errors
+
+    async def run_all() -> list[dict]:
+        results = []
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make_request in endpoints.items():
+                await run(client, make_request, 1)  # warm-up: datasets, imports, first-call costs
+                for level in concurrency:
+                    latencies, elapsed, errors = await run(client, make_request, level)
+                    results.append({"case": f"{name} c={level}", "concurrency": level, "errors": errors,
+                                    **summarize_ms(latencies), "requests_per_s": len(latencies) / elapsed})
+        return results
+
+    return asyncio.run(run_all())
+
+
+def environment_info() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    ''' One line per case present in both result files: old and new median, and their ratio. '''
+    lines = []
+    for section in ("population", "impact_metrics", "coastal", "serialization", "http"):
+        before = {r["case"]: r for r in old.get(section, []) if "median_ms" in r}
+        for r in new.get(section, []):
+            if r.get("case") in before and "median_ms" in r:
+                b = before[r["case"]]["median_ms"]
+                lines.append(f"{r['case']:<55} {b:10.3f} ms -> {r['median_ms']:10.3f} ms  x{r['median_ms'] / b:.2f}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the metrics-service hot paths")
+    parser.add_argument("--out", default="-", help="JSON results file ('-' for stdout)")
+    parser.add_argument("--data-dir", default="data/bench", help="where the synthetic rasters are written")
+    parser.add_argument("--indexes", action="store_true", help="build and use the prefix-sum and pyramid indexes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=10_000, help="scenarios per batch call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=64, help="requests per endpoint and concurrency level")
+    parser.add_argument("--only", nargs="+", choices=("population", "impact_metrics", "coastal", "serialization", "http"))
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    sections = args.only or ["population", "impact_metrics", "coastal", "serialization", "http"]
+    results = {"environment": environment_info(), "config": vars(args),
+               "rasters": configure_environment(args.data_dir, args.indexes)}
+    if "population" in sections:
+        results["population"] = bench_population(args.repeat)
+    if "impact_metrics" in sections:
+        results["impact_metrics"] = bench_impact_metrics(args.batch, args.repeat)
+    if "coastal" in sections:
+        results["coastal"] = bench_coastal(args.data_dir, results["rasters"]["lowres"]["path"], args.repeat)
+    if "serialization" in sections:
+        results["serialization"] = bench_serialization(args.repeat)
+    if "http" in sections:
+        results["http"] = bench_http(args.concurrency, args.requests)
+
+    text = json.dumps(results, indent=2)
+    if args.out == "-":
+        print(text)
+    else:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(json.load(f), results)), file=sys.stderr)
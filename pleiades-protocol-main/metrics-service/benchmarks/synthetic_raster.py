@@ -0,0 +1,160 @@
+''' Synthetic GHS-POP-like rasters, so the benchmarks run offline without the real data.
+
+    The rasters mimic the GHS-POP products the service reads: World Mollweide (ESRI:54009),
+    float32 people per pixel, nodata -200, 256 x 256 tiles with LZW. Population is a sparse
+    rural background plus a few cities (exponential density decay around a center), with a
+    band of empty "sea" and scattered nodata pixels, which exercises the same masking and
+    block-reading paths as real data. Output is deterministic for a given seed.
+    write_land_mask() writes the matching land/water mask (the sea band plus a round bay) for
+    the coastal index.
+
+        python -m benchmarks.synthetic_raster data/bench --lon 0.3 --lat 0.2
+'''
+import argparse
+import os
+
+import numpy as np
+import rasterio
+from pyproj import Transformer
+from rasterio.transform import from_origin
+
+MOLLWEIDE = "ESRI:54009"
+NODATA = -200.0
+HIGHRES_NAME = "GHS_POP_SYNTHETIC_54009_100.tif"
+LOWRES_NAME = "GHS_POP_SYNTHETIC_54009_1000.tif"
+MASK_NAME = "LAND_MASK_SYNTHETIC_54009_1000.tif"
+
+
+def write_population_raster(path: str, center_x: float, center_y: float, res_m: float,
+                            half_width_m: float, seed: int = 0, city_extent_m: float | None = None,
+                            block_rows: int = 1024) -> dict:
+    ''' Write one synthetic population raster centered on a Mollweide point.
+
+        Args:
+            path (str): Output GeoTIFF
+            center_x (float): Center of the raster in Mollweide meters
+            center_y (float): Center of the raster in Mollweide meters
+            res_m (float): Pixel size in meters
+            half_width_m (float): Half of the raster extent (the raster is square)
+            seed (int): Random seed of the cities
+            city_extent_m (float | None): Half-width of the square around the center the cities
+                                          are drawn in (default half_width_m); rasters written
+                                          with the same seed and city_extent_m have the same cities
+            block_rows (int): Rows generated and written at a time
+
+        Returns:
+            dict: Raster parameters and total population
+    '''
+    n = int(round(2 * half_width_m / res_m))
+    left, top = center_x - half_width_m, center_y + half_width_m
+
+    # Cities in meters relative to the center: the same for every resolution written with the
+    # same seed and city_extent_m
+    rng = np.random.default_rng(seed)
+    n_cities = 40
+    city_xy = rng.uniform(-0.8, 0.8, (n_cities, 2)) * (half_width_m if city_extent_m is None else city_extent_m)
+    city_xy[0] = (0.0, 0.0)  # one large city on the benchmark point
+    city_peak = 10.0 ** rng.uniform(2.5, 4.3, n_cities)  # people per km^2 at the center
+    city_peak[0] = 2.0e4
+    city_scale = 10.0 ** rng.uniform(3.3, 4.3, n_cities)  # decay length, m
+    city_scale[0] = 1.5e4
+
+    noise = np.random.default_rng(seed + int(res_m))
+    xs = left + (np.arange(n) + 0.5) * res_m - center_x
+    pixel_km2 = (res_m / 1000.0) ** 2
+    profile = {
+        "driver": "GTiff", "width": n, "height": n, "count": 1, "dtype": "float32",
+        "crs": MOLLWEIDE, "transform": from_origin(left, top, res_m, res_m), "nodata": NODATA,
+        "tiled": True, "blockxsize": 256, "blockysize": 256, "compress": "lzw",
+    }
+    total = 0.0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with rasterio.open(path, "w", **profile) as dst:
+        for row0 in range(0, n, block_rows):
+            rows = min(block_rows, n - row0)
+            ys = top - (row0 + np.arange(rows) + 0.5) * res_m - center_y
+            density = np.full((rows, n), 20.0)  # rural background, people per km^2
+            for (cx, cy), peak, scale in zip(city_xy, city_peak, city_scale):
+                d = np.hypot(xs[None, :] - cx, ys[:, None] - cy)
+                density += peak * np.exp(-d / scale)
+            block = density * pixel_km2 * noise.lognormal(0.0, 0.5, (rows, n))
+            # A band of sea along the southern edge and a few nodata pixels
+            block[ys < -0.85 * half_width_m, :] = 0.0
+            block[noise.random((rows, n)) < 0.01] = NODATA
+            block = block.astype("float32")
+            total += float(block[block != NODATA].sum(dtype="float64"))
+            dst.write(block, 1, window=rasterio.windows.Window(0, row0, n, rows))
+
+    return {"path": path, "resolution_m": res_m, "size_px": n, "half_width_m": half_width_m,
+            "seed": seed, "total_population": total}
+
+
+def write_land_mask(path: str, population_path: str, block_rows: int = 1024) -> dict:
+    ''' Write a land (1) / water (0) mask on the grid of a synthetic population raster.
+
+        Water is the sea band of write_population_raster plus a round bay reaching into the
+        land south of the center, so the coast has populated stretches facing open sea.
+
+        Returns:
+            dict: Mask path and water fraction
+    '''
+    with rasterio.open(population_path) as pop:
+        n, transform, crs = pop.width, pop.transform, pop.crs
+    res_m = transform.a
+    half_width_m = n * res_m / 2.0
+    center_x, center_y = transform.c + half_width_m, transform.f - half_width_m
+    xs = (np.arange(n) + 0.5) * res_m - half_width_m
+    profile = {
+        "driver": "GTiff", "width": n, "height": n, "count": 1, "dtype": "uint8", "crs": crs,
+        "transform": transform, "tiled": True, "blockxsize": 256, "blockysize": 256, "compress": "lzw",
+    }
+    water = 0
+    with rasterio.open(path, "w", **profile) as dst:
+        for row0 in range(0, n, block_rows):
+            rows = min(block_rows, n - row0)
+            ys = transform.f - (row0 + np.arange(rows) + 0.5) * res_m - center_y
+            sea = np.broadcast_to((ys < -0.85 * half_width_m)[:, None], (rows, n))
+            bay = np.hypot(xs[None, :], ys[:, None] + 0.6 * half_width_m) < 0.3 * half_width_m
+            block = np.where(sea | bay, 0, 1).astype("uint8")
+            water += int((block == 0).sum())
+            dst.write(block, 1, window=rasterio.windows.Window(0, row0, n, rows))
+    return {"path": path, "water_fraction": water / (n * n)}
+
+
+def write_benchmark_rasters(out_dir: str, lon: float, lat: float, high_half_width_m: float = 150_000.0,
+                            low_half_width_m: float = 1_500_000.0, seed: int = 0) -> dict:
+    ''' Write the 100 m and 1 km rasters around a WGS84 point (skipped if already present).
+
+        Both hold the same cities, all inside the 100 m raster, so circles on either side of
+        THRESHOLD_RADIUS_M measure the same population field.
+
+        Returns:
+            dict: "highres" and "lowres" raster parameters
+    '''
+    x, y = Transformer.from_crs("EPSG:4326", MOLLWEIDE, always_xy=True).transform(lon, lat)
+    rasters = {}
+    for key, name, res, half in (("highres", HIGHRES_NAME, 100.0, high_half_width_m),
+                                 ("lowres", LOWRES_NAME, 1000.0, low_half_width_m)):
+        path = os.path.join(out_dir, name)
+        if os.path.exists(path):
+            with rasterio.open(path) as src:
+                rasters[key] = {"path": path, "resolution_m": res, "size_px": src.width,
+                                "half_width_m": src.width * res / 2.0, "seed": None}
+            continue
+        rasters[key] = write_population_raster(path, x, y, res, half, seed, city_extent_m=high_half_width_m)
+    return rasters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic GHS-POP-like 100 m and 1 km rasters")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--lon", type=float, default=0.3)
+    parser.add_argument("--lat", type=float, default=0.2)
+    parser.add_argument("--high-half-width-m", type=float, default=150_000.0)
+    parser.add_argument("--low-half-width-m", type=float, default=1_500_000.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    written = write_benchmark_rasters(args.out_dir, args.lon, args.lat, args.high_half_width_m,
+                                      args.low_half_width_m, args.seed)
+    for raster in written.values():
+        print(f"{raster['path']}: {raster['size_px']} px at {raster['resolution_m']:g} m")
@@ -1,6 +1,12 @@
-from fastapi import FastAPI, Depends
+import threading
+
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from routers import population, impacts
-from services.validation import get_api_key
+from services.population_datasets import POPULATION_WARMUP, DatasetUnavailable, readiness, warm_up
+from services.telemetry import METRICS_REQUIRE_API_KEY, TelemetryMiddleware, render_metrics
+from services.validation import API_KEY_NAME, get_api_key
+from services.worker_pool import is_process_mode, prefork
 
 
 
@@ -15,7 +21,45 @@ app = FastAPI(title="Asteroids Metrics Service",
 
 app.include_router(population.router)
 app.include_router(impacts.router)
+app.add_middleware(TelemetryMiddleware)
+
+
+def warm_up_all():
+    if POPULATION_WARMUP:
+        warm_up()
+    # Start the worker processes (each opens its own datasets)
+    if is_process_mode():
+        prefork()
+
+
+@app.on_event("startup")
+def start_warm_up():
+    # In the background: the app answers (and /ready reports progress) while datasets open
+    if POPULATION_WARMUP or is_process_mode():
+        threading.Thread(target=warm_up_all, name="warm-up", daemon=True).start()
+
+
+@app.exception_handler(DatasetUnavailable)
+async def dataset_unavailable(request: Request, exc: DatasetUnavailable):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+
+async def metrics(request: Request):
+    # Plain Starlette route: outside the app-wide API key dependency unless configured
+    if METRICS_REQUIRE_API_KEY:
+        get_api_key(request.headers.get(API_KEY_NAME, ""))
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+async def ready(request: Request):
+    # Unauthenticated like /metrics, for orchestrator probes
+    is_ready, report = readiness()
+    return JSONResponse(report, status_code=200 if is_ready else 503)
+
 
+app.add_route("/metrics", metrics, methods=["GET"])
+app.add_route("/ready", ready, methods=["GET"])
 
 
 @app.get("/", tags=["helper"], response_model=dict[str, str],
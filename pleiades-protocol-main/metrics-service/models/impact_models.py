@@ -1,4 +1,6 @@
-from pydantic import BaseModel 
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
 
 
 class ImpactRequest(BaseModel):
@@ -26,9 +28,173 @@ class ThermalExposureAtDistanceRequest(BaseModel):
     eta: float 
 
 class ThermalExposureAtDistanceResponse(BaseModel):
-    thermal_exposure: float 
+    thermal_exposure: float
+
+
+class DistributionModel(BaseModel):
+    kind: Literal["fixed", "uniform", "normal", "lognormal"] = "fixed"
+    a: float = Field(..., description="fixed: value, uniform: min, normal: mean, lognormal: median")
+    b: float = Field(0.0, description="uniform: max, normal: std, lognormal: std of ln")
+
+class MonteCarloRequest(BaseModel):
+    diameter_m: DistributionModel
+    velocity_mps: DistributionModel
+    density_kgm3: DistributionModel
+    porosity: DistributionModel = DistributionModel(a=0.0)
+    burst_altitude_m: DistributionModel = DistributionModel(a=0.0)
+    shape_factor: float = 1.0
+    is_airburst: bool = True
+    target_density_kgm3: float = 2500.0
+    water_depth_m: Optional[float] = None
+    n_samples: int = Field(100_000, gt=0)
+    seed: Optional[int] = None
+    percentiles: List[float] = Field([5.0, 50.0, 95.0], min_length=1)
+
+class MetricDistribution(BaseModel):
+    mean: Optional[float]
+    percentiles: Dict[str, Optional[float]]
+    valid_fraction: float
+
+class MonteCarloResponse(BaseModel):
+    n_samples: int
+    seed: Optional[int]
+    metrics: Dict[str, MetricDistribution]
+
+
+class CasualtyRequest(BaseModel):
+    lat: float
+    lon: float
+    diameter_m: float
+    velocity_mps: float
+    density_kgm3: float
+    shape_factor: float = 1.0
+    porosity: float = 0.0
+    is_airburst: bool = True
+    burst_altitude_m: Optional[float] = None
+    target_density_kgm3: float = 2500.0
+    water_depth_m: Optional[float] = None
+
+class DamageBand(BaseModel):
+    hazard: Literal["overpressure", "thermal", "crater"]
+    threshold: str
+    threshold_value: float = Field(..., description="kPa (overpressure), J/m^2 (thermal) or m (crater diameter)")
+    inner_radius_km: Optional[float]
+    outer_radius_km: Optional[float]
+    population: int
+
+class CasualtyResponse(BaseModel):
+    lat: float
+    lon: float
+    energy_joules: float
+    yield_megatons: float
+    bands: List[DamageBand]
+    total_exposed_population: int
+    max_radius_km: float
+
+
+class ProfileRequest(BaseModel):
+    energy: float = Field(..., gt=0, description="Impact energy (J)")
+    burst_altitude_m: float = Field(0.0, ge=0)
+    r_min_m: float = Field(100.0, gt=0)
+    r_max_m: float = Field(100_000.0, gt=0)
+    n_points: int = Field(256, ge=2)
+    exact: bool = Field(False, description="Evaluate the formulas instead of the lookup tables")
+
+class ProfileResponse(BaseModel):
+    r_m: List[float]
+    overpressure_kpa: List[float]
+    thermal_fluence_Jm2: List[float]
+    max_rel_error: Dict[str, float]
+
+
+class HazardGridRequest(BaseModel):
+    lat: float
+    lon: float
+    energy: float = Field(..., gt=0, description="Impact energy (J)")
+    burst_altitude_m: float = Field(0.0, ge=0, description="0 for a ground impact")
+    radius_m: Optional[float] = Field(None, gt=0, description="Field extent; defaults to the largest damage radius")
+
+class HazardTileRequest(HazardGridRequest):
+    field: Literal["thermal", "overpressure"]
+    tile_row: int
+    tile_col: int
+    format: Literal["png", "f32"] = "png"
+    vmin: Optional[float] = Field(None, gt=0, description="PNG scale minimum (J/m^2 or kPa)")
+    vmax: Optional[float] = Field(None, gt=0, description="PNG scale maximum (J/m^2 or kPa)")
+
+class HazardGridResponse(BaseModel):
+    radius_m: float
+    crs: str
+    transform: List[float]
+    tile_size: int
+    window: Dict[str, int]
+    tile_rows: List[int] = Field(..., description="First and last tile row (inclusive)")
+    tile_cols: List[int] = Field(..., description="First and last tile column (inclusive)")
+
+
+class VulnerabilityCurveModel(BaseModel):
+    median: float = Field(..., gt=0, description="Hazard level with 50% fatality probability")
+    slope: float = Field(..., gt=0, description="Log-logistic slope")
+
+class ExpectedCasualtyRequest(CasualtyRequest):
+    radius_m: Optional[float] = Field(None, gt=0, description="Integration radius; defaults to the largest damage radius")
+    overpressure_curve: Optional[VulnerabilityCurveModel] = Field(None, description="P(overpressure in kPa)")
+    thermal_curve: Optional[VulnerabilityCurveModel] = Field(None, description="P(fluence in J/m^2)")
+
+class ExpectedCasualtyResponse(BaseModel):
+    lat: float
+    lon: float
+    energy_joules: float
+    radius_m: float
+    population: int
+    expected_casualties: float
+    expected_casualties_overpressure: float
+    expected_casualties_thermal: float
+    pixels: int
+
+
+class TsunamiExposureRequest(BaseModel):
+    lat: float
+    lon: float
+    energy: float = Field(..., gt=0, description="Impact energy (J)")
+    water_depth_m: float = Field(..., gt=0, description="Water depth at the impact point")
+    bands_m: List[float] = Field([0.5, 1.0, 2.0, 5.0, 10.0], min_length=1,
+                                 description="Lower bounds of the wave-height bands (m)")
+    max_range_km: Optional[float] = Field(None, gt=0, description="Farthest coast considered")
+
+class WaveBand(BaseModel):
+    min_height_m: float
+    max_height_m: Optional[float]
+    population: float
+    coast_cells: int
+
+class TsunamiExposureResponse(BaseModel):
+    lat: float
+    lon: float
+    energy_joules: float
+    water_depth_m: float
+    search_radius_km: float
+    coast_cells: int
+    max_wave_height_m: float
+    exposed_population: float
+    bands: List[WaveBand]
 
 
+class SweepAxisModel(BaseModel):
+    values: Optional[List[float]] = Field(None, min_length=1, description="Explicit values")
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    num: int = Field(1, ge=1)
+    log: bool = Field(False, description="Log-spaced between start and stop")
 
-    
-    
\ No newline at end of file
+class SweepRequest(BaseModel):
+    diameter_m: SweepAxisModel
+    velocity_mps: SweepAxisModel
+    density_kgm3: SweepAxisModel
+    porosity: SweepAxisModel = SweepAxisModel(values=[0.0])
+    burst_altitude_m: SweepAxisModel = SweepAxisModel(values=[0.0])
+    shape_factor: float = 1.0
+    is_airburst: bool = True
+    target_density_kgm3: float = 2500.0
+    water_depth_m: Optional[float] = None
+    format: Literal["ndjson", "arrow"] = "ndjson"
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException, status
+from models.impact_models import (
+    CasualtyRequest, CasualtyResponse, ExpectedCasualtyRequest, ExpectedCasualtyResponse,
+)
+from services.casualty_service import estimate_casualties, max_damage_radius
+from services.impact_metrics import Asteroid, ImpactMetrics, Target
+from services.telemetry import span
+from services.vulnerability import OVERPRESSURE_FATALITY, THERMAL_FATALITY, VulnerabilityCurve
+
+router = APIRouter(
+    tags=["casualty"]
+)
+
+
+@router.post("/casualty_estimate", response_model=CasualtyResponse,
+             summary="Population exposed to each damage band of an impact",
+             description="""
+                Computes the overpressure isobars (airburst) or crater (ground impact) and
+                the thermal-fluence radii of the impact, and returns the population in each
+                annulus band between consecutive radii of the same hazard.
+                All bands come from a single population read of the largest radius, so this
+                costs about one /population/estimate call.
+                Coordinates are in WGS84.
+                """)
+def casualty_estimate(payload: CasualtyRequest):
+    asteroid = Asteroid(payload.diameter_m, payload.velocity_mps, payload.density_kgm3,
+                        payload.shape_factor, payload.porosity)
+    result = estimate_casualties(payload.lon, payload.lat, asteroid, payload.is_airburst,
+                                 payload.burst_altitude_m,
+                                 Target(payload.target_density_kgm3, payload.water_depth_m))
+    return CasualtyResponse(lat=payload.lat, lon=payload.lon, **result)
+
+
+@router.post("/expected_casualties", response_model=ExpectedCasualtyResponse,
+             summary="Expected casualties integrated over the hazard field",
+             description="""
+                Sums population x fatality probability over every population-grid pixel
+                within `radius_m` of the impact (by default its largest damage radius).
+                The probability combines overpressure and thermal fluence through
+                log-logistic vulnerability curves, P = 1 / (1 + (median / x) ** slope),
+                which can be overridden per request.
+                Coordinates are in WGS84.
+                """)
+def expected_casualties(payload: ExpectedCasualtyRequest):
+    asteroid = Asteroid(payload.diameter_m, payload.velocity_mps, payload.density_kgm3,
+                        payload.shape_factor, payload.porosity)
+    with span("impact.kinetic_energy"):
+        E = ImpactMetrics.kinetic_energy(asteroid)
+    h = payload.burst_altitude_m if payload.is_airburst and payload.burst_altitude_m else 0.0
+    with span("impact.damage_radii"):
+        radius_m = payload.radius_m or max_damage_radius(
+            E, payload.is_airburst, payload.burst_altitude_m, Target(payload.target_density_kgm3, payload.water_depth_m))
+    if radius_m <= 0:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="No damage radius for this impact; pass radius_m")
+
+    from services.population_service import estimate_expected_casualties  # raster stack, on first use
+    with span("population.expected_casualties"):
+        result = estimate_expected_casualties(
+            payload.lon, payload.lat, radius_m, E, h,
+            VulnerabilityCurve(**payload.overpressure_curve.model_dump()) if payload.overpressure_curve else OVERPRESSURE_FATALITY,
+            VulnerabilityCurve(**payload.thermal_curve.model_dump()) if payload.thermal_curve else THERMAL_FATALITY,
+        )
+    return ExpectedCasualtyResponse(lat=payload.lat, lon=payload.lon, energy_joules=E, radius_m=radius_m, **result)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from services.neo_catalog import get_store
+
+router = APIRouter(
+    tags=["catalog"]
+)
+
+
+@router.get("/catalog", response_model=dict,
+            summary="List catalogued NEOs",
+            description="""
+                Lists the objects of the NEO scenario store (id and name), ordered by id.
+                The store is synchronized with the configured catalog on first use.
+                """)
+def list_catalog(limit: int = Query(100, ge=1, le=1000), offset: int = Query(0, ge=0)):
+    return get_store().list_objects(limit, offset)
+
+
+@router.get("/catalog/{object_id}", response_model=dict,
+            summary="Precomputed impact metrics of a catalogued NEO",
+            description="""
+                Returns the low / nominal / high scenarios of a catalogued object (minimum,
+                central and maximum diameter, velocity and density) with their inputs and
+                the metrics of ImpactMetrics.summarize, straight from the scenario store.
+                Metrics are null where a threshold is not reached.
+                """)
+def get_catalog_object(object_id: str):
+    obj = get_store().get(object_id)
+    if obj is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown object {object_id!r}")
+    return obj
@@ -1,6 +1,86 @@
-from fastapi import APIRouter 
+from fastapi import APIRouter, HTTPException, Response, status
+from models.impact_models import HazardGridRequest, HazardGridResponse, HazardTileRequest
+from services.casualty_service import max_damage_radius
+from services.impact_metrics import Target
+from services.telemetry import span
+from services.worker_pool import get_process_pool, is_process_mode, take_array
 
 router = APIRouter(
     prefix="/effects",
     tags=["effects"]
-)
\ No newline at end of file
+)
+
+
+def get_hazard_grid(payload: HazardGridRequest):
+    # services.hazard_field needs the population rasters: imported on first use
+    from services.hazard_field import HAZARD_MAX_TILES, hazard_grid
+    radius_m = payload.radius_m
+    if radius_m is None:
+        with span("impact.damage_radii"):
+            radius_m = max_damage_radius(payload.energy, payload.burst_altitude_m > 0, payload.burst_altitude_m, Target())
+    if radius_m <= 0:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="No damage radius for this energy; pass radius_m")
+
+    grid = hazard_grid(payload.lon, payload.lat, payload.energy, payload.burst_altitude_m, radius_m)
+    if grid is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Impact point outside the population grid")
+    if len(grid.tile_rows) * len(grid.tile_cols) > HAZARD_MAX_TILES:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Hazard grid exceeds {HAZARD_MAX_TILES} tiles; reduce radius_m")
+    return grid
+
+
+@router.post("/hazard_grid", response_model=HazardGridResponse,
+             summary="Tiling of the hazard field of an impact",
+             description="""
+                Returns the population-grid window covered by the hazard field of an impact
+                (by default out to its largest damage radius) and the range of tiles to fetch
+                from /impacts/effects/hazard_tile. Tiles are aligned to the GHS-POP raster,
+                whose CRS and transform are returned.
+                """)
+def get_grid(payload: HazardGridRequest):
+    grid = get_hazard_grid(payload)
+    w = grid.window
+    return HazardGridResponse(
+        radius_m=grid.radius_m,
+        crs=grid.crs,
+        transform=list(grid.transform)[:6],
+        tile_size=grid.tile_size,
+        window={"col_off": int(w.col_off), "row_off": int(w.row_off),
+                "width": int(w.width), "height": int(w.height)},
+        tile_rows=[grid.tile_rows[0], grid.tile_rows[-1]],
+        tile_cols=[grid.tile_cols[0], grid.tile_cols[-1]],
+    )
+
+
+@router.post("/hazard_tile",
+             summary="One tile of a thermal or overpressure hazard field",
+             description="""
+                Returns the thermal fluence (J/m^2) or overpressure (kPa) over one tile of the
+                hazard grid, either as a grayscale + alpha PNG on a log scale between
+                `vmin` and `vmax`, or as zlib-compressed little-endian float32 (`f32`, NaN
+                outside the hazard radius). The X-Tile-Window header gives the pixel window
+                (col_off,row_off,width,height) of the tile, which is clipped at the hazard window.
+                """,
+             responses={200: {"content": {"image/png": {}, "application/octet-stream": {}}}})
+def get_tile(payload: HazardTileRequest):
+    from services.hazard_field import PNG_RANGES, encode_f32, encode_png, hazard_tile, hazard_tile_shared
+    grid = get_hazard_grid(payload)
+    with span("impact.hazard_tile", field=payload.field):
+        if is_process_mode():
+            ref = get_process_pool().submit(hazard_tile_shared, grid, payload.field,
+                                            payload.tile_row, payload.tile_col).result()
+            values = None if ref is None else take_array(ref)
+        else:
+            values = hazard_tile(grid, payload.field, payload.tile_row, payload.tile_col)
+    if values is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tile outside the hazard grid")
+
+    w = grid.tile_window(payload.tile_row, payload.tile_col)
+    headers = {"X-Tile-Window": f"{int(w.col_off)},{int(w.row_off)},{int(w.width)},{int(w.height)}"}
+    if payload.format == "f32":
+        return Response(encode_f32(values), media_type="application/octet-stream", headers=headers)
+    vmin, vmax = PNG_RANGES[payload.field]
+    return Response(encode_png(values, payload.vmin or vmin, payload.vmax or vmax),
+                    media_type="image/png", headers=headers)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter 
 from models.impact_models import KineticEnergyResponse, ImpactRequest,FireballResponse, FireballRequest,ThermalExposureAtDistanceRequest,ThermalExposureAtDistanceResponse 
 from services.impact_metrics import ImpactMetrics, Asteroid, Atmosphere,joules_to_megatons
+from services.telemetry import span
 
 router = APIRouter(
     prefix="/energy",
@@ -11,7 +12,8 @@ router = APIRouter(
             summary="Calculate kinetic energy") 
 def kinetic_energy(payload: ImpactRequest):
     asteroid = Asteroid(payload.diameter_m,payload.velocity_mps,payload.density_kgm3)
-    k_energy = ImpactMetrics.kinetic_energy(asteroid)
+    with span("impact.kinetic_energy"):
+        k_energy = ImpactMetrics.kinetic_energy(asteroid)
     k_energy_mt = joules_to_megatons(k_energy)
     return KineticEnergyResponse(
         energy = k_energy,
@@ -21,7 +23,8 @@ def kinetic_energy(payload: ImpactRequest):
 @router.post("/fireball", response_model=FireballResponse,
              summary="Calculate fireball")
 def fireball_radius(payload: FireballRequest):
-    fireball_rad = ImpactMetrics.fireball_radius(payload.energy)
+    with span("impact.fireball_radius"):
+        fireball_rad = ImpactMetrics.fireball_radius(payload.energy)
     return FireballResponse(
         fireball = fireball_rad 
         
@@ -31,7 +34,8 @@ def fireball_radius(payload: FireballRequest):
              summary="Calculate exposure") 
 def thermal_exposure_at_distance(payload: ThermalExposureAtDistanceRequest):
     atmosfera = Atmosphere(payload.k_atenuacion,payload.burst_altitude_m)
-    thermal_exp = ImpactMetrics.thermal_exposure_at_distance(payload.energy,payload.horizontal_distance_m,atmosfera,payload.eta)
+    with span("impact.thermal_exposure"):
+        thermal_exp = ImpactMetrics.thermal_exposure_at_distance(payload.energy,payload.horizontal_distance_m,atmosfera,payload.eta)
     return ThermalExposureAtDistanceResponse(
         thermal_exposure = thermal_exp
     )
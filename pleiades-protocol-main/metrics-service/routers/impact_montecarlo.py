@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, status
+from models.impact_models import MonteCarloRequest, MonteCarloResponse, DistributionModel
+from services.impact_metrics import Target
+from services.montecarlo import Distribution, UncertainImpact, run_montecarlo
+from services.telemetry import span
+
+router = APIRouter(
+    tags=["montecarlo"]
+)
+
+
+def to_distribution(model: DistributionModel) -> Distribution:
+    return Distribution(model.kind, model.a, model.b)
+
+
+@router.post("/montecarlo", response_model=MonteCarloResponse,
+             summary="Monte Carlo uncertainty of impact metrics",
+             description="""
+                Samples the asteroid parameters and burst altitude from the given
+                distributions and returns mean and percentiles of energy, isobar radii
+                (airburst) or crater diameter and Mw (ground impact), and thermal fluence.
+                An airburst at a fixed altitude of 0 is evaluated as a ground impact, as in
+                the single-scenario metrics; a random burst altitude must be positive
+                (fixed or uniform above 0, or lognormal). Use `seed` for reproducible results.
+                """)
+def montecarlo(payload: MonteCarloRequest):
+    impact = UncertainImpact(
+        diameter_m=to_distribution(payload.diameter_m),
+        velocity_mps=to_distribution(payload.velocity_mps),
+        density_kgm3=to_distribution(payload.density_kgm3),
+        porosity=to_distribution(payload.porosity),
+        burst_altitude_m=to_distribution(payload.burst_altitude_m),
+        shape_factor=payload.shape_factor,
+        is_airburst=payload.is_airburst,
+        target=Target(payload.target_density_kgm3, payload.water_depth_m),
+    )
+    try:
+        with span("impact.montecarlo"):
+            result = run_montecarlo(impact, payload.n_samples, payload.seed, payload.percentiles)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+    return MonteCarloResponse(**result)
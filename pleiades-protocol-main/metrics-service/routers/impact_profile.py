@@ -0,0 +1,52 @@
+import numpy as np
+from fastapi import APIRouter, HTTPException, status
+from models.impact_models import ProfileRequest, ProfileResponse
+from services.impact_metrics_vec import ImpactMetricsVec
+from services.radial_profiles import PROFILE_MAX_POINTS, get_profile_tables
+from services.serialization import NegotiatedResponse
+from services.telemetry import span
+
+router = APIRouter(
+    tags=["profile"]
+)
+
+
+@router.post("/profile", response_model=ProfileResponse,
+             summary="Radial overpressure and thermal profiles",
+             description="""
+                Returns the ground overpressure and thermal fluence sampled at `n_points`
+                log-spaced distances between `r_min_m` and `r_max_m`.
+                Curves are interpolated from precomputed scaled-distance tables;
+                `max_rel_error` is the measured error bound of those tables
+                (0 with `exact`, which evaluates the formulas directly).
+                """)
+def profile(payload: ProfileRequest):
+    if payload.r_max_m <= payload.r_min_m:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="r_max_m must be greater than r_min_m")
+    if payload.n_points > PROFILE_MAX_POINTS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"n_points must be at most {PROFILE_MAX_POINTS}")
+
+    r = np.geomspace(payload.r_min_m, payload.r_max_m, payload.n_points)
+    if payload.exact:
+        with span("impact.profile", method="exact"):
+            curves = {
+                "overpressure_kpa": ImpactMetricsVec.overpressure_collins_airburst(
+                    payload.energy, payload.burst_altitude_m, r) / 1000.0,
+                "thermal_fluence_Jm2": ImpactMetricsVec.corrected_exposure(payload.energy, r),
+            }
+        max_rel_error = {"overpressure": 0.0, "thermal": 0.0}
+    else:
+        tables = get_profile_tables()
+        with span("impact.profile", method="tables"):
+            curves = tables.profile(payload.energy, payload.burst_altitude_m, r)
+        max_rel_error = tables.max_rel_error
+
+    # The curves go out as arrays, past pydantic: the payload is ProfileResponse
+    return NegotiatedResponse({
+        "r_m": r,
+        "overpressure_kpa": curves["overpressure_kpa"],
+        "thermal_fluence_Jm2": curves["thermal_fluence_Jm2"],
+        "max_rel_error": max_rel_error,
+    })
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
+from models.impact_models import SweepRequest
+from services.sweep import AXES, SWEEP_MAX_POINTS, SweepSpec, axis_values, iter_arrow, iter_ndjson, pa
+
+router = APIRouter(
+    tags=["sweep"]
+)
+
+
+@router.post("/sweep",
+             summary="Stream impact metrics over a parameter grid",
+             description="""
+                Evaluates every combination of the axis values (diameter x velocity x density
+                x porosity x burst altitude, last axis varying fastest) in vectorized batches
+                and streams one record per scenario as it is computed: NDJSON by default, or an
+                Arrow IPC stream with `format="arrow"` (requires pyarrow on the server).
+                Metrics are those of ImpactMetrics.summarize; null / NaN where a threshold is
+                not reached. An airburst with every burst altitude 0 (the default) is
+                evaluated as a ground impact, as in summarize; burst altitudes mixing 0 and
+                positive values are rejected.
+                """,
+             responses={200: {"content": {"application/x-ndjson": {},
+                                          "application/vnd.apache.arrow.stream": {}}}})
+def sweep(payload: SweepRequest):
+    try:
+        spec = SweepSpec(
+            axes={name: axis_values(**getattr(payload, name).model_dump()) for name in AXES},
+            shape_factor=payload.shape_factor,
+            is_airburst=payload.is_airburst,
+            target_density_kgm3=payload.target_density_kgm3,
+            water_depth_m=payload.water_depth_m,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+    # Checked before streaming: once the body starts the status code can no longer change
+    if spec.size > SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Sweep has {spec.size} points; the maximum is {SWEEP_MAX_POINTS}")
+
+    if payload.format == "arrow":
+        if pa is None:
+            raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                                detail="Arrow output requires pyarrow on the server")
+        return StreamingResponse(iter_arrow(spec), media_type="application/vnd.apache.arrow.stream",
+                                 headers={"X-Sweep-Points": str(spec.size)})
+    return StreamingResponse(iter_ndjson(spec), media_type="application/x-ndjson",
+                             headers={"X-Sweep-Points": str(spec.size)})
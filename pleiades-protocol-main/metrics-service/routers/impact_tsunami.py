@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, status
+from models.impact_models import TsunamiExposureRequest, TsunamiExposureResponse
+from services.population_datasets import coastal_index
+from services.telemetry import span
+
+# services.coastal_index is imported inside the handler, with the index itself (rasterio/pyproj).
+
+router = APIRouter(
+    tags=["tsunami"]
+)
+
+
+@router.post("/tsunami_exposure", response_model=TsunamiExposureResponse,
+             summary="Coastal population exposed to an ocean impact tsunami",
+             description="""
+                Finds every coastline cell of the coastal index within reach of the impact
+                (the distance at which the wave height falls below the lowest band, at most
+                `max_range_km`), evaluates tsunami_wave_height_coast at each cell's
+                great-circle distance and returns the coastal population by wave-height
+                band. Requires the index built with `python -m services.coastal_index`.
+                Coordinates are in WGS84.
+                """)
+def tsunami_exposure(payload: TsunamiExposureRequest):
+    from services.coastal_index import TSUNAMI_MAX_RANGE_KM
+    from services.coastal_index import tsunami_exposure as exposure
+    index = coastal_index.load()
+    if index is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Coastal index not built (python -m services.coastal_index)")
+    with span("tsunami.exposure"):
+        result = exposure(index, payload.lon, payload.lat, payload.energy, payload.water_depth_m,
+                          tuple(payload.bands_m), payload.max_range_km or TSUNAMI_MAX_RANGE_KM)
+    return TsunamiExposureResponse(lat=payload.lat, lon=payload.lon, energy_joules=payload.energy,
+                                   water_depth_m=payload.water_depth_m, **result)
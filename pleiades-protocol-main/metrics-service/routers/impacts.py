@@ -1,14 +1,20 @@
-from fastapi import APIRouter 
-from routers import impact_energy,impact_effects 
+from fastapi import APIRouter, Depends
+from routers import impact_energy,impact_effects,impact_montecarlo,impact_casualty,impact_profile,impact_sweep,impact_catalog,impact_tsunami 
+
+from services.serialization import NEGOTIATED_RESPONSES, NegotiatedResponse, negotiate
 
 router = APIRouter(
     prefix="/impacts",
-
+    dependencies=[Depends(negotiate)],
+    default_response_class=NegotiatedResponse,
+    responses=NEGOTIATED_RESPONSES,
 )
 
 router.include_router(impact_energy.router)
 router.include_router(impact_effects.router)
-
-
-
-
+router.include_router(impact_montecarlo.router)
+router.include_router(impact_casualty.router)
+router.include_router(impact_profile.router)
+router.include_router(impact_sweep.router)
+router.include_router(impact_catalog.router)
+router.include_router(impact_tsunami.router)
@@ -1,18 +1,37 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
 
-from services.population_service import estimate_population
+from services.population_dispatcher import Overloaded, population_dispatcher
+from services.serialization import NEGOTIATED_RESPONSES, NegotiatedResponse, Table, negotiate
+from services.worker_pool import broadcast, is_process_mode
+
+# services.population_service is imported inside the handlers: it loads rasterio/GDAL and
+# pyproj, which the service only pays for once population data is first requested.
 
 router = APIRouter(
     prefix="/population",
-    tags=["population"]
+    tags=["population"],
+    dependencies=[Depends(negotiate)],
+    default_response_class=NegotiatedResponse,
+    responses=NEGOTIATED_RESPONSES,
 )
 
+async def dispatch(key: tuple, fn: callable, *args):
+    ''' Run a population computation on the dispatcher, mapping overload to 503. '''
+    try:
+        return await population_dispatcher.submit(key, fn, *args)
+    except Overloaded as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc),
+                            headers={"Retry-After": str(exc.retry_after_s)})
+
+
 # --- Models ---
 class PopulationRequest(BaseModel):
     lat: float
     lon: float
     radius_m: float
+    exact: bool = Field(False, description="Bypass the result cache and compute the exact circle")
 
 class PopulationResponse(BaseModel):
     lat: float
@@ -20,6 +39,45 @@ class PopulationResponse(BaseModel):
     radius_m: float
     population_estimate: float
 
+class PopulationBatchRequest(BaseModel):
+    circles: list[PopulationRequest] = Field(..., min_length=1, max_length=1000)
+
+class PopulationBatchResponse(BaseModel):
+    results: list[PopulationResponse]
+
+class CorridorPoint(BaseModel):
+    lat: float
+    lon: float
+
+class CorridorRequest(BaseModel):
+    path: list[CorridorPoint] = Field(..., min_length=1, max_length=10000,
+                                      description="Polyline vertices (or the points themselves) in WGS84")
+    radius_m: float = Field(..., gt=0)
+    samples: int | None = Field(None, ge=1, le=10000,
+                                description="Points equally spaced along the polyline; omit to use the vertices")
+
+class CorridorSample(BaseModel):
+    lat: float
+    lon: float
+    distance_m: float
+    population_estimate: float
+
+class CorridorResponse(BaseModel):
+    radius_m: float
+    length_m: float
+    results: list[CorridorSample]
+
+class RiskAtRequest(BaseModel):
+    lat: float
+    lon: float
+    radius_m: float
+
+class RiskAtResponse(BaseModel):
+    lat: float
+    lon: float
+    map_radius_m: float
+    population_at_risk: float
+
 
 @router.post("/estimate", response_model=PopulationResponse,
             summary="Estimate population within a circle",
@@ -27,13 +85,154 @@ class PopulationResponse(BaseModel):
                 Returns the estimated population within a circle defined by
                 latitude/longitude/radius in meters.
                 Coordinates are in WGS84.
+                Results are cached: a circle whose center is in the same raster pixel
+                and whose radius is within 0.1% of a cached one gets the cached estimate;
+                set `exact` to bypass the cache.
+                Answers 503 with Retry-After when the service is saturated.
                 """
             )
-def population(payload: PopulationRequest):
-    pop_est = estimate_population(payload.lon, payload.lat, payload.radius_m)
+async def population(payload: PopulationRequest):
+    from services.population_service import estimate_population_cached
+    pop_est = await dispatch(("estimate", payload.lon, payload.lat, payload.radius_m, payload.exact),
+                             estimate_population_cached, payload.lon, payload.lat, payload.radius_m,
+                             not payload.exact)
     return PopulationResponse(
         lat=payload.lat,
         lon=payload.lon,
         radius_m=payload.radius_m,
         population_estimate=pop_est,
-    )
\ No newline at end of file
+    )
+
+
+@router.post("/estimate_batch", response_model=PopulationBatchResponse,
+            summary="Estimate population within many circles",
+            description="""
+                Returns the estimated population within each circle of the batch.
+                Overlapping circles (e.g. the damage rings of one impact point)
+                share a single raster read, so prefer this endpoint over many
+                calls to /population/estimate.
+                Coordinates are in WGS84.
+                Answers 503 with Retry-After when the service is saturated.
+                """
+            )
+async def population_batch(payload: PopulationBatchRequest):
+    from services.population_service import estimate_population_many
+    points = tuple((c.lon, c.lat) for c in payload.circles)
+    radii = tuple(c.radius_m for c in payload.circles)
+    pop_ests = await dispatch(("batch", points, radii), estimate_population_many, list(points), list(radii))
+    # Built as columns, past pydantic: the payload is PopulationBatchResponse
+    return NegotiatedResponse({
+        "results": Table(lat=[c.lat for c in payload.circles], lon=[p[0] for p in points],
+                         radius_m=radii, population_estimate=np.asarray(pop_ests, dtype="float64")),
+    })
+
+
+@router.post("/corridor", response_model=CorridorResponse,
+            summary="Estimate population along an impact corridor",
+            description="""
+                Returns the estimated population within `radius_m` of points along a
+                corridor of possible impact points: `samples` points equally spaced along
+                the polyline `path` (following geodesics), or the vertices of `path`
+                themselves when `samples` is omitted.
+                Consecutive circles are swept incrementally, so the cost grows with the
+                corridor length rather than with the number of points. Swept circles are
+                centred on the population pixel containing each point.
+                Answers 503 with Retry-After when the service is saturated.
+                """
+            )
+async def population_corridor(payload: CorridorRequest):
+    from services.corridor import polyline_distances, sample_polyline
+    from services.population_service import estimate_population_corridor
+    lons = [p.lon for p in payload.path]
+    lats = [p.lat for p in payload.path]
+    if payload.samples is not None:
+        lons, lats, dist = sample_polyline(lons, lats, payload.samples)
+    else:
+        dist = polyline_distances(np.asarray(lons, dtype="float64"), np.asarray(lats, dtype="float64"))
+    lons, lats = tuple(float(v) for v in lons), tuple(float(v) for v in lats)
+    pop_ests = await dispatch(("corridor", lons, lats, payload.radius_m),
+                              estimate_population_corridor, list(lons), list(lats), payload.radius_m)
+    # Built as columns, past pydantic: the payload is CorridorResponse
+    return NegotiatedResponse({
+        "radius_m": payload.radius_m,
+        "length_m": float(dist[-1]),
+        "results": Table(lat=lats, lon=lons, distance_m=np.asarray(dist, dtype="float64"),
+                         population_estimate=np.asarray(pop_ests, dtype="float64")),
+    })
+
+
+@router.get("/cache", response_model=dict,
+            summary="Population result cache statistics",
+            description="""
+                Statistics of the population result cache. With WORKER_MODE=process every
+                worker process has its own cache: the totals over the workers are returned,
+                with each worker's statistics under `workers`.
+                """
+            )
+def population_cache_stats():
+    from services.population_service import cache_stats
+    if not is_process_mode():
+        return cache_stats()
+    from services.population_cache import merge_stats
+    try:
+        per_worker = broadcast(cache_stats)
+    except TimeoutError as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    return {**merge_stats(list(per_worker.values())), "workers": {str(pid): s for pid, s in per_worker.items()}}
+
+
+@router.get("/queue", response_model=dict,
+            summary="Population executor queue statistics")
+def population_queue_stats():
+    return population_dispatcher.stats()
+
+
+@router.get("/risk_maps", response_model=dict,
+            summary="Precomputed population-at-risk maps",
+            description="""
+                Lists the population-at-risk maps built with `python -m services.risk_map`
+                (the population within a radius of every pixel), with their most populated
+                impact points, at least one radius apart.
+                """
+            )
+def risk_maps(hotspots: int = 10):
+    from services.population_datasets import risk_maps as risk_map_store
+    store = risk_map_store.load()
+    if store is None:
+        return {"maps": []}
+    return {"maps": [
+        {
+            "radius_m": radius,
+            "resolution_m": m.index["resolution_m"],
+            "hotspots": m.index["hotspots"][:max(0, hotspots)],
+        }
+        for radius, m in sorted(store.maps.items())
+    ]}
+
+
+@router.post("/risk_at", response_model=RiskAtResponse,
+            summary="Population at risk from a precomputed map",
+            description="""
+                Reads the population within `radius_m` of a point from the risk map built
+                for that radius: one pixel read instead of a circle query. The value is that
+                of the map pixel containing the point. Answers 404 when no map was built
+                for the radius or the point is outside the map.
+                """
+            )
+def risk_at(payload: RiskAtRequest):
+    from services.population_datasets import risk_maps as risk_map_store
+    store = risk_map_store.load()
+    risk_map = store.get(payload.radius_m) if store is not None else None
+    if risk_map is None:
+        available = sorted(store.maps) if store is not None else []
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"No risk map for radius {payload.radius_m:g} m; built radii: {available}")
+    value = risk_map.value_at(payload.lon, payload.lat)
+    if value is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Point outside the risk map")
+    return RiskAtResponse(
+        lat=payload.lat,
+        lon=payload.lon,
+        map_radius_m=risk_map.radius_m,
+        population_at_risk=value,
+    )
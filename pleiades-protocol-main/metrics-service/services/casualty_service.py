@@ -0,0 +1,100 @@
+import math
+
+from services.impact_metrics import Asteroid, ImpactMetrics, Target, joules_to_megatons
+from services.impact_metrics_vec import ImpactMetricsVec
+from services.telemetry import span
+
+
+def damage_radii(E_joules: float, is_airburst: bool, burst_altitude_m: float | None,
+                 target: Target) -> dict[str, dict[str, tuple[float, float | None]]]:
+    ''' Radius of every damage threshold of an impact, grouped by hazard.
+
+        Overpressure isobars are given for airbursts, the crater rim for ground impacts,
+        and thermal-fluence radii for both (see ImpactMetrics.summarize).
+
+        Returns:
+            dict: hazard -> {threshold name: (threshold value, radius in m or None)}
+    '''
+    radii = {}
+    if is_airburst and burst_altitude_m:
+        thresholds = ImpactMetrics.damage_thresholds_kpa()
+        isobars = ImpactMetricsVec.radius_for_overpressure_airburst(
+            E_joules, burst_altitude_m, list(thresholds.values()))
+        radii["overpressure"] = {
+            key: (kpa, None if math.isnan(R) else float(R))
+            for (key, kpa), R in zip(thresholds.items(), isobars)
+        }
+    else:
+        D = ImpactMetrics.crater_diameter_simple(E_joules, target)
+        radii["crater"] = {"crater": (D, D / 2.0)}
+
+    thresholds = ImpactMetrics.thermal_thresholds_Jm2()
+    fluence = ImpactMetricsVec.radius_for_thermal_exposure(E_joules, list(thresholds.values()))
+    radii["thermal"] = {
+        key: (phi, None if math.isnan(R) else float(R))
+        for (key, phi), R in zip(thresholds.items(), fluence)
+    }
+    return radii
+
+
+def max_damage_radius(E_joules: float, is_airburst: bool, burst_altitude_m: float | None,
+                      target: Target) -> float:
+    ''' Largest damage radius (m) of any hazard, 0 if no threshold is reached. '''
+    radii = damage_radii(E_joules, is_airburst, burst_altitude_m, target)
+    return max((R for hazard in radii.values() for _, R in hazard.values() if R), default=0.0)
+
+
+def estimate_casualties(lon: float, lat: float, asteroid: Asteroid, is_airburst: bool,
+                        burst_altitude_m: float | None, target: Target) -> dict:
+    ''' Population exposed to each damage band of an impact.
+
+        All damage radii are computed first and the population of every circle is obtained
+        from a single read of the largest window (estimate_population_rings). Within each
+        hazard the circles are nested, so each band is the annulus between its radius and the
+        radius of the next more severe threshold, and the bands of a hazard add up to the
+        population inside its outermost radius.
+
+        Args:
+            lon (float): Longitude of the impact point in WGS84
+            lat (float): Latitude of the impact point in WGS84
+            asteroid (Asteroid): Impactor parameters
+            is_airburst (bool): Airburst (isobars) or ground impact (crater)
+            burst_altitude_m (float | None): Burst altitude for airbursts
+            target (Target): Ground properties
+
+        Returns:
+            dict: Energy, per-band populations and total exposed population
+    '''
+    with span("impact.kinetic_energy"):
+        E = ImpactMetrics.kinetic_energy(asteroid)
+    with span("impact.damage_radii"):
+        radii = damage_radii(E, is_airburst, burst_altitude_m, target)
+
+    from services.population_service import estimate_population_rings  # loads the raster stack on first use
+
+    circles = sorted({R for hazard in radii.values() for _, R in hazard.values() if R})
+    with span("population.rings"):
+        populations = dict(zip(circles, estimate_population_rings(lon, lat, circles)))
+
+    bands = []
+    for hazard, thresholds in radii.items():
+        # Most severe (smallest radius) first, so each band starts where the previous ends
+        inner_R, inner_pop = 0.0, 0.0
+        for name, (value, R) in sorted(thresholds.items(), key=lambda t: t[1][1] or 0.0):
+            if not R:
+                bands.append({"hazard": hazard, "threshold": name, "threshold_value": value,
+                              "inner_radius_km": None, "outer_radius_km": None, "population": 0})
+                continue
+            pop = max(populations[R] - inner_pop, 0.0)
+            bands.append({"hazard": hazard, "threshold": name, "threshold_value": value,
+                          "inner_radius_km": inner_R / 1000.0, "outer_radius_km": R / 1000.0,
+                          "population": int(round(pop))})
+            inner_R, inner_pop = R, populations[R]
+
+    return {
+        "energy_joules": E,
+        "yield_megatons": joules_to_megatons(E),
+        "bands": bands,
+        "total_exposed_population": int(round(populations[circles[-1]])) if circles else 0,
+        "max_radius_km": circles[-1] / 1000.0 if circles else 0.0,
+    }
@@ -0,0 +1,204 @@
+from dataclasses import dataclass
+
+import numpy as np
+import rasterio
+
+
+@dataclass
+class CircleCoverage:
+    ''' Exact fractional coverage of a circle over a north-up raster window.
+
+        Pixels fully inside the circle are stored as one column span per row
+        (full_lo <= col < full_hi); only the pixels cut by the circumference are
+        stored individually with their covered fraction, so the extra memory is
+        O(perimeter) instead of O(area).
+    '''
+    shape: tuple[int, int]
+    rows: np.ndarray       # window rows touched by the circle
+    full_lo: np.ndarray    # first fully covered column of each row
+    full_hi: np.ndarray    # one past the last fully covered column of each row
+    edge_rows: np.ndarray
+    edge_cols: np.ndarray
+    edge_frac: np.ndarray  # covered fraction (0..1] of each edge pixel
+
+    @property
+    def pixel_count(self) -> int:
+        ''' Number of pixels with non-zero coverage. '''
+        return int(np.sum(self.full_hi - self.full_lo)) + len(self.edge_frac)
+
+    def weighted_sum(self, values: np.ndarray) -> float:
+        ''' Sum of values weighted by covered fraction.
+
+            Args:
+                values (np.ndarray): Window values with shape == self.shape, nodata already zeroed
+
+            Returns:
+                float: Sum over the circle
+        '''
+        return span_sum(values, self.rows, self.full_lo, self.full_hi) + \
+            float(np.dot(values[self.edge_rows, self.edge_cols].astype("float64"), self.edge_frac))
+
+    def to_mask(self) -> np.ndarray:
+        ''' Materialize the coverage as a dense float32 mask of covered fractions. '''
+        mask = np.zeros(self.shape, dtype="float32")
+        for row, lo, hi in zip(self.rows, self.full_lo, self.full_hi):
+            mask[row, lo:hi] = 1.0
+        mask[self.edge_rows, self.edge_cols] = self.edge_frac
+        return mask
+
+
+def circle_coverage(cx: float, cy: float, radius_m: float,
+                    window_transform: rasterio.Affine, shape: tuple[int, int]) -> CircleCoverage:
+    ''' Compute the exact covered fraction of every window pixel touched by a circle.
+
+        Args:
+            cx (float): Circle center x in the raster CRS
+            cy (float): Circle center y in the raster CRS
+            radius_m (float): Radius in raster CRS units (meters)
+            window_transform (rasterio.Affine): Affine transform of the window (north-up)
+            shape (tuple[int, int]): Window (rows, cols)
+
+        Returns:
+            CircleCoverage: Row spans of full pixels and fractions of edge pixels
+    '''
+    nrows, ncols = shape
+    px, py = window_transform.a, window_transform.e
+    x0, y0 = window_transform.c, window_transform.f
+    r = float(radius_m)
+
+    # Vertical extent of every row relative to the center
+    row_edges = y0 + np.arange(nrows + 1) * py - cy
+    ylo = np.minimum(row_edges[:-1], row_edges[1:])
+    yhi = np.maximum(row_edges[:-1], row_edges[1:])
+    near = np.where((ylo <= 0) & (yhi >= 0), 0.0, np.minimum(np.abs(ylo), np.abs(yhi)))
+    far = np.maximum(np.abs(ylo), np.abs(yhi))
+
+    rows = np.nonzero(near < r)[0]
+    h_max = np.sqrt(r ** 2 - near[rows] ** 2)             # widest chord inside the row
+    h_min = np.sqrt(np.maximum(r ** 2 - far[rows] ** 2, 0))
+    h_min = np.where(far[rows] < r, h_min, -np.inf)       # no full pixels if the row crosses the top/bottom
+
+    # Column spans in pixel units: touched [t_lo, t_hi) and fully covered [f_lo, f_hi)
+    u = (cx - x0) / px
+    t_lo = np.clip(np.floor(u - h_max / px), 0, ncols).astype("int64")
+    t_hi = np.clip(np.ceil(u + h_max / px), 0, ncols).astype("int64")
+    with np.errstate(invalid="ignore"):
+        f_lo = np.clip(np.ceil(u - h_min / px), t_lo, t_hi)
+        f_hi = np.clip(np.floor(u + h_min / px), t_lo, t_hi)
+    f_lo = np.where(np.isfinite(f_lo), f_lo, t_hi).astype("int64")
+    f_hi = np.where(np.isfinite(f_hi), f_hi, t_hi).astype("int64")
+    f_hi = np.maximum(f_hi, f_lo)
+
+    # Edge pixels: [t_lo, f_lo) on the left, [f_hi, t_hi) on the right
+    seg_rows = np.concatenate([rows, rows])
+    seg_start = np.concatenate([t_lo, f_hi])
+    seg_len = np.concatenate([f_lo - t_lo, t_hi - f_hi])
+    edge_rows, edge_cols = _expand_segments(seg_rows, seg_start, seg_len)
+
+    # Exact area of circle ∩ pixel, relative to the center
+    ex0 = x0 + edge_cols * px - cx
+    ex1 = ex0 + px
+    ey0 = row_edges[edge_rows]
+    ey1 = row_edges[edge_rows + 1]
+    area = _rect_area(np.minimum(ex0, ex1), np.maximum(ex0, ex1),
+                      np.minimum(ey0, ey1), np.maximum(ey0, ey1), r)
+    edge_frac = np.clip(area / abs(px * py), 0.0, 1.0)
+
+    keep = edge_frac > 0
+    return CircleCoverage(
+        shape=(nrows, ncols),
+        rows=rows,
+        full_lo=f_lo,
+        full_hi=f_hi,
+        edge_rows=edge_rows[keep],
+        edge_cols=edge_cols[keep],
+        edge_frac=edge_frac[keep],
+    )
+
+
+def get_circle_window(src, x: float, y: float, radius_m: float) -> rasterio.windows.Window | None:
+    ''' Get the raster window covering the circle bounds, clipped to the raster extent.
+
+        src is any dataset-like object exposing index(), height and width.
+
+        Returns:
+            rasterio.windows.Window: The window, or None if the circle falls outside the raster
+    '''
+    # Circle bounds in raster indices
+    minx, miny, maxx, maxy = x - radius_m, y - radius_m, x + radius_m, y + radius_m
+    row_min, col_min = src.index(minx, maxy)
+    row_max, col_max = src.index(maxx, miny)
+
+    # Limits adjustment
+    row_min, col_min = max(0, row_min), max(0, col_min)
+    row_max, col_max = min(src.height - 1, row_max), min(src.width - 1, col_max)
+
+    nrows, ncols = row_max - row_min + 1, col_max - col_min + 1
+    if nrows <= 0 or ncols <= 0:
+        return None
+    return rasterio.windows.Window(col_min, row_min, ncols, nrows)
+
+
+def span_sum(values: np.ndarray, rows: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> float:
+    ''' Sum values[row, lo:hi] over all rows in one vectorized reduction. '''
+    nonempty = hi > lo
+    if not np.any(nonempty):
+        return 0.0
+    ncols = values.shape[1]
+    starts = rows[nonempty] * ncols + lo[nonempty]
+    ends = rows[nonempty] * ncols + hi[nonempty]
+    flat = values.reshape(-1)
+    idx = np.empty(2 * len(starts), dtype="int64")
+    idx[0::2], idx[1::2] = starts, ends
+    if idx[-1] == flat.size:
+        idx = idx[:-1]
+    return float(np.add.reduceat(flat, idx, dtype="float64")[0::2].sum())
+
+
+def _expand_segments(seg_rows: np.ndarray, seg_start: np.ndarray,
+                     seg_len: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    ''' Expand (row, start, length) column segments into per-pixel (rows, cols). '''
+    seg_len = np.maximum(seg_len, 0)
+    total = int(seg_len.sum())
+    offsets = np.repeat(np.cumsum(seg_len) - seg_len, seg_len)
+    cols = np.repeat(seg_start, seg_len) + np.arange(total) - offsets
+    return np.repeat(seg_rows, seg_len), cols
+
+
+def _antiderivative(x: np.ndarray, r: float) -> np.ndarray:
+    ''' F(x) = integral of sqrt(r^2 - t^2) dt, for x clipped to [-r, r]. '''
+    x = np.clip(x, -r, r)
+    return 0.5 * (x * np.sqrt(r ** 2 - x ** 2) + r ** 2 * np.arcsin(x / r))
+
+
+def _half_plane_area(b: np.ndarray, r: float) -> np.ndarray:
+    ''' Area of the circle with y >= b. '''
+    return 2.0 * (_antiderivative(r, r) - _antiderivative(b, r))
+
+
+def _corner_area(a: np.ndarray, b: np.ndarray, r: float) -> np.ndarray:
+    ''' Area of the circle with x >= a and y >= b, for a, b >= 0. '''
+    a, b = np.minimum(a, r), np.minimum(b, r)
+    xb = np.sqrt(r ** 2 - b ** 2)
+    area = _antiderivative(xb, r) - _antiderivative(a, r) - b * (xb - a)
+    return np.where(a < xb, area, 0.0)
+
+
+def _quadrant_area(a: np.ndarray, b: np.ndarray, r: float) -> np.ndarray:
+    ''' Area of the circle with x >= a and y >= b, any sign (reflected onto _corner_area). '''
+    a, b = np.clip(a, -r, r), np.clip(b, -r, r)
+    pa, pb = np.abs(a), np.abs(b)
+    corner = _corner_area(pa, pb, r)
+    return np.select(
+        [(a >= 0) & (b >= 0), (a < 0) & (b >= 0), (a >= 0) & (b < 0)],
+        [corner,
+         _half_plane_area(b, r) - corner,
+         _half_plane_area(a, r) - corner],
+        np.pi * r ** 2 - _half_plane_area(pa, r) - _half_plane_area(pb, r) + corner,
+    )
+
+
+def _rect_area(x0: np.ndarray, x1: np.ndarray, y0: np.ndarray, y1: np.ndarray, r: float) -> np.ndarray:
+    ''' Area of the circle (centered at the origin) inside [x0, x1] x [y0, y1]. '''
+    return (_quadrant_area(x0, y0, r) - _quadrant_area(x1, y0, r)
+            - _quadrant_area(x0, y1, r) + _quadrant_area(x1, y1, r))
@@ -0,0 +1,228 @@
+''' Coastal exposure index: coastline cells with their population, bucketed for range queries.
+
+    Coast cells are the land cells of a land/water mask within band_cells cells of water.
+    Each keeps its WGS84 position and the GHS-POP population inside it (the population grid
+    is summed onto the mask grid), and cells are sorted into 1-degree lon/lat buckets, so a
+    query only scans the buckets around the impact. tsunami_exposure() then evaluates
+    tsunami_wave_height_coast for every coast cell in range in one vectorized call and sums
+    the population by wave-height band. Distances are great-circle distances from the
+    impact; land shadowing and bathymetry are ignored, as in the formula itself.
+
+    Build offline (any mask grid; 1 km matches the coarse population raster) with:
+
+        python -m services.coastal_index data/land_mask.tif data/GHS_POP_E2025_GLOBE_R2023A_54009_1000_V1_0.tif data/coastal_index
+'''
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import pyproj
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.warp import reproject
+
+from services.impact_metrics import R_EARTH
+from services.impact_metrics_vec import ImpactMetricsVec
+
+# --- CONFIG ---
+TSUNAMI_MAX_RANGE_KM = float(os.getenv("TSUNAMI_MAX_RANGE_KM", "5000"))  # farthest coast considered
+WAVE_BANDS_M = (0.5, 1.0, 2.0, 5.0, 10.0)  # default wave-height band lower bounds
+INDEX_FILE = "index.json"
+BUCKET_DEG = 1
+LON_BUCKETS, LAT_BUCKETS = 360 // BUCKET_DEG, 180 // BUCKET_DEG
+
+
+def build_coastal_index(mask_path: str, population_path: str, out_dir: str, water_value: float = 0,
+                        band_cells: int = 1, block_rows: int = 1024) -> dict:
+    ''' Extract the coast cells of a land/water mask and their population.
+
+        Args:
+            mask_path (str): Land/water raster; pixels equal to water_value are water
+            population_path (str): Population GeoTIFF (GHS-POP), summed onto the mask grid
+            out_dir (str): Output directory (created if missing)
+            water_value (float): Mask value of water pixels
+            band_cells (int): Land cells within this many cells of water are coast
+            block_rows (int): Mask rows processed at a time
+
+        Returns:
+            dict: The index written to out_dir/index.json
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    lons, lats, pops = [], [], []
+    with rasterio.open(mask_path) as mask, rasterio.open(population_path) as pop:
+        to_wgs84 = pyproj.Transformer.from_crs(mask.crs, "EPSG:4326", always_xy=True).transform
+        for row0 in range(0, mask.height, block_rows):
+            rows = min(block_rows, mask.height - row0)
+            # A halo of band_cells rows, so water just outside the block is seen
+            h0, h1 = max(0, row0 - band_cells), min(mask.height, row0 + rows + band_cells)
+            water = mask.read(1, window=rasterio.windows.Window(0, h0, mask.width, h1 - h0)) == water_value
+            near = water
+            for _ in range(band_cells):
+                near = _dilate(near)
+            coast = (near & ~water)[row0 - h0:row0 - h0 + rows]
+            if not coast.any():
+                continue
+
+            window = rasterio.windows.Window(0, row0, mask.width, rows)
+            population = np.zeros((rows, mask.width), dtype="float32")
+            reproject(rasterio.band(pop, 1), population, src_nodata=pop.nodata,
+                      dst_transform=mask.window_transform(window), dst_crs=mask.crs, dst_nodata=0,
+                      resampling=Resampling.sum)
+            r, c = np.nonzero(coast)
+            x, y = mask.transform * (c + 0.5, row0 + r + 0.5)
+            lon, lat = to_wgs84(x, y)
+            lons.append(np.asarray(lon, dtype="float32"))
+            lats.append(np.asarray(lat, dtype="float32"))
+            pops.append(np.maximum(population[r, c], 0))
+
+        lon = np.concatenate(lons) if lons else np.zeros(0, dtype="float32")
+        lat = np.concatenate(lats) if lats else np.zeros(0, dtype="float32")
+        population = np.concatenate(pops) if pops else np.zeros(0, dtype="float32")
+        order = np.argsort(_bucket_of(lon, lat), kind="stable")
+        lon, lat, population = lon[order], lat[order], population[order]
+        offsets = np.searchsorted(_bucket_of(lon, lat), np.arange(LON_BUCKETS * LAT_BUCKETS + 1))
+        for name, values in (("lon", lon), ("lat", lat), ("population", population), ("offsets", offsets)):
+            np.save(os.path.join(out_dir, f"{name}.npy"), values)
+
+        index = {
+            "mask": os.path.basename(mask_path),
+            "population": os.path.basename(population_path),
+            "resolution": list(mask.res),
+            "band_cells": band_cells,
+            "bucket_deg": BUCKET_DEG,
+            "cells": int(len(lon)),
+            "total_population": float(population.sum(dtype="float64")),
+        }
+    with open(os.path.join(out_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f)
+    return index
+
+
+def _dilate(mask: np.ndarray) -> np.ndarray:
+    ''' One step of 4-neighbour binary dilation. '''
+    out = mask.copy()
+    out[1:] |= mask[:-1]
+    out[:-1] |= mask[1:]
+    out[:, 1:] |= mask[:, :-1]
+    out[:, :-1] |= mask[:, 1:]
+    return out
+
+
+def _bucket_of(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    lat_b = np.clip(np.floor((np.asarray(lat, dtype="float64") + 90.0) / BUCKET_DEG), 0, LAT_BUCKETS - 1)
+    lon_b = np.floor((np.asarray(lon, dtype="float64") + 180.0) / BUCKET_DEG).astype("int64") % LON_BUCKETS
+    return lat_b.astype("int64") * LON_BUCKETS + lon_b
+
+
+class CoastalIndex:
+    ''' Read side of the coastal index: memory-mapped cell arrays and their bucket offsets. '''
+
+    def __init__(self, out_dir: str):
+        with open(os.path.join(out_dir, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        self.out_dir = out_dir
+        self.lon, self.lat, self.population, self.offsets = (
+            np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ("lon", "lat", "population", "offsets"))
+
+    @classmethod
+    def open_if_built(cls, out_dir: str) -> "CoastalIndex | None":
+        ''' Open the index in out_dir, or return None if it has not been built. '''
+        if not os.path.exists(os.path.join(out_dir, INDEX_FILE)):
+            return None
+        return cls(out_dir)
+
+    def cells_within(self, lon: float, lat: float, range_km: float) -> tuple[np.ndarray, np.ndarray]:
+        ''' Coast cells within range_km (great circle) of a point.
+
+            Returns:
+                tuple[np.ndarray, np.ndarray]: Population and distance (km) of every cell in range
+        '''
+        d = min(range_km * 1000.0 / R_EARTH, math.pi)  # angular radius
+        dlat = math.degrees(d)
+        lat_lo = int(np.clip(math.floor((lat - dlat + 90.0) / BUCKET_DEG), 0, LAT_BUCKETS - 1))
+        lat_hi = int(np.clip(math.floor((lat + dlat + 90.0) / BUCKET_DEG), 0, LAT_BUCKETS - 1))
+        # Widest longitude extent of the spherical cap; all longitudes if it reaches a pole
+        cos_lat = math.cos(math.radians(lat))
+        if math.sin(d) >= cos_lat or lat_lo == 0 or lat_hi == LAT_BUCKETS - 1:
+            lon_runs = [(0, LON_BUCKETS - 1)]
+        else:
+            dlon = math.degrees(math.asin(math.sin(d) / cos_lat))
+            first = math.floor((lon - dlon + 180.0) / BUCKET_DEG)
+            last = math.floor((lon + dlon + 180.0) / BUCKET_DEG)
+            if last - first + 1 >= LON_BUCKETS:
+                lon_runs = [(0, LON_BUCKETS - 1)]
+            elif first % LON_BUCKETS <= last % LON_BUCKETS:
+                lon_runs = [(first % LON_BUCKETS, last % LON_BUCKETS)]
+            else:  # across the antimeridian
+                lon_runs = [(first % LON_BUCKETS, LON_BUCKETS - 1), (0, last % LON_BUCKETS)]
+
+        slices = [slice(int(self.offsets[row * LON_BUCKETS + a]), int(self.offsets[row * LON_BUCKETS + b + 1]))
+                  for row in range(lat_lo, lat_hi + 1) for a, b in lon_runs]
+        idx = np.concatenate([np.arange(s.start, s.stop) for s in slices]) if slices else np.zeros(0, dtype="int64")
+        cell_lon = np.radians(np.asarray(self.lon[idx], dtype="float64"))
+        cell_lat = np.radians(np.asarray(self.lat[idx], dtype="float64"))
+        lon0, lat0 = math.radians(lon), math.radians(lat)
+        # Haversine
+        a = np.sin((cell_lat - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(cell_lat) * np.sin((cell_lon - lon0) / 2) ** 2
+        dist_km = 2.0 * R_EARTH / 1000.0 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        keep = dist_km <= range_km
+        return np.asarray(self.population[idx[keep]], dtype="float64"), dist_km[keep]
+
+
+def wave_range_km(energy: float, depth_m: float, min_height_m: float, max_range_km: float = TSUNAMI_MAX_RANGE_KM) -> float:
+    ''' Distance at which the coastal wave height falls below min_height_m (at most max_range_km). '''
+    ranges = np.geomspace(1.0, max_range_km, 512)
+    below = np.nonzero(ImpactMetricsVec.tsunami_wave_height_coast(energy, depth_m, ranges) < min_height_m)[0]
+    return float(ranges[below[0]]) if len(below) else float(max_range_km)
+
+
+def tsunami_exposure(index: CoastalIndex, lon: float, lat: float, energy: float, depth_m: float,
+                     bands_m: tuple = WAVE_BANDS_M, max_range_km: float = TSUNAMI_MAX_RANGE_KM) -> dict:
+    ''' Coastal population exposed to an ocean impact, by wave-height band.
+
+        Args:
+            index (CoastalIndex): Coastal index
+            lon (float): Impact longitude in WGS84
+            lat (float): Impact latitude in WGS84
+            energy (float): Impact energy (J)
+            depth_m (float): Water depth at the impact point
+            bands_m (tuple): Increasing lower bounds of the wave-height bands (m)
+            max_range_km (float): Farthest coast considered
+
+        Returns:
+            dict: Search radius, cells and population in range, and population per band
+    '''
+    bands = np.asarray(sorted(bands_m), dtype="float64")
+    range_km = wave_range_km(energy, depth_m, float(bands[0]), max_range_km)
+    population, dist_km = index.cells_within(lon, lat, range_km)
+    height = ImpactMetricsVec.tsunami_wave_height_coast(energy, depth_m, dist_km)
+    band = np.searchsorted(bands, height, side="right") - 1  # -1: below the lowest band
+    exposed = band >= 0
+    band_population = np.bincount(band[exposed], weights=population[exposed], minlength=len(bands))
+    band_cells = np.bincount(band[exposed], minlength=len(bands))
+    return {
+        "search_radius_km": range_km,
+        "coast_cells": int(len(dist_km)),
+        "max_wave_height_m": float(height.max()) if len(height) else 0.0,
+        "exposed_population": float(band_population.sum()),
+        "bands": [
+            {"min_height_m": float(lo), "max_height_m": float(bands[i + 1]) if i + 1 < len(bands) else None,
+             "population": float(band_population[i]), "coast_cells": int(band_cells[i])}
+            for i, lo in enumerate(bands)
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the coastal exposure index of a land/water mask")
+    parser.add_argument("mask", help="land/water raster")
+    parser.add_argument("population", help="population GeoTIFF")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--water-value", type=float, default=0, help="mask value of water pixels")
+    parser.add_argument("--band-cells", type=int, default=1, help="land cells within this many cells of water are coast")
+    args = parser.parse_args()
+    built = build_coastal_index(args.mask, args.population, args.out_dir, args.water_value, args.band_cells)
+    print(f"{built['cells']} coast cells, population {built['total_population']:.0f}")
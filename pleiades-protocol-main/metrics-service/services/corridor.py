@@ -0,0 +1,154 @@
+''' Population along an impact corridor: circles centred on points sampled along a polyline.
+
+    Consecutive circles of a corridor overlap almost entirely, so the sweep keeps the sum of
+    the previous circle and only adds the full row spans entering the next circle and
+    subtracts the spans leaving it; the edge pixels (O(perimeter)) are weighted anew at every
+    step. Every circle is centred on the pixel containing its point, so all circles share one
+    coverage pattern shifted by whole pixels and the entering / leaving spans are exact.
+    The pixels read per step are those swept by the circle, so the cost of a corridor grows
+    with its length rather than with the number of points times the circle area.
+'''
+import math
+
+import numpy as np
+import rasterio
+from pyproj import Geod
+
+from services.circle_coverage import _expand_segments, circle_coverage
+from services.raster_pool import read_population
+
+_GEOD = Geod(ellps="WGS84")
+
+
+def polyline_distances(lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+    ''' Geodesic distance (m) from the first vertex to every vertex of a polyline. '''
+    if len(lons) < 2:
+        return np.zeros(len(lons))
+    _, _, seg_len = _GEOD.inv(lons[:-1], lats[:-1], lons[1:], lats[1:])
+    return np.concatenate([[0.0], np.cumsum(np.atleast_1d(seg_len))])
+
+
+def sample_polyline(lons: list[float], lats: list[float], samples: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ''' Equally spaced points along a polyline, following the geodesic between vertices.
+
+        Args:
+            lons (list[float]): Vertex longitudes in WGS84
+            lats (list[float]): Vertex latitudes in WGS84
+            samples (int): Number of points, the first and last vertices included
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: Longitude, latitude and distance along
+            the polyline (m) of every point
+    '''
+    lons, lats = np.asarray(lons, dtype="float64"), np.asarray(lats, dtype="float64")
+    cum = polyline_distances(lons, lats)
+    dist = np.linspace(0.0, cum[-1], samples)
+    if len(lons) < 2:
+        return np.repeat(lons, samples), np.repeat(lats, samples), dist
+    az, _, _ = _GEOD.inv(lons[:-1], lats[:-1], lons[1:], lats[1:])
+    seg = np.clip(np.searchsorted(cum, dist, side="right") - 1, 0, len(lons) - 2)
+    out_lons, out_lats, _ = _GEOD.fwd(lons[seg], lats[seg], np.atleast_1d(az)[seg], dist - cum[seg])
+    return np.atleast_1d(out_lons), np.atleast_1d(out_lats), dist
+
+
+class DiskKernel:
+    ''' Coverage of a circle centred on a pixel centre, as offsets from that pixel.
+
+        lo / hi hold the fully covered column span of every row offset -r_px..r_px (empty
+        rows have lo == hi); the edge pixels keep their exact covered fraction.
+    '''
+
+    def __init__(self, radius_m: float, res_m: float):
+        r = int(math.ceil(radius_m / res_m))
+        size = 2 * r + 1
+        half = (r + 0.5) * res_m
+        cov = circle_coverage(0.0, 0.0, radius_m, rasterio.Affine(res_m, 0.0, -half, 0.0, -res_m, half), (size, size))
+        self.r_px = r
+        self.lo = np.zeros(size, dtype="int64")
+        self.hi = np.zeros(size, dtype="int64")
+        self.lo[cov.rows] = cov.full_lo - r
+        self.hi[cov.rows] = cov.full_hi - r
+        self.edge_rows = cov.edge_rows - r
+        self.edge_cols = cov.edge_cols - r
+        self.edge_frac = cov.edge_frac
+
+    def spans(self, rows: np.ndarray, row: int, col: int) -> tuple[np.ndarray, np.ndarray]:
+        ''' Full column span [lo, hi) on each of rows of the circle centred on (row, col); (0, 0) off the circle. '''
+        d = rows - row
+        inside = np.abs(d) <= self.r_px
+        k = np.clip(d + self.r_px, 0, 2 * self.r_px)
+        return np.where(inside, col + self.lo[k], 0), np.where(inside, col + self.hi[k], 0)
+
+
+def _spans_total(data: np.ndarray, rows: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> float:
+    # Gathers only the span pixels: span_sum's reduceat also walks the gaps between spans,
+    # which here run across the whole corridor window
+    r, c = _expand_segments(rows, lo, hi - lo)
+    return float(data[r, c].sum(dtype="float64"))
+
+
+def sweep_sums(data: np.ndarray, rows: np.ndarray, cols: np.ndarray, kernel: DiskKernel) -> np.ndarray:
+    ''' Circle sums at consecutive centres, each full-span sum updated from the previous one.
+
+        Args:
+            data (np.ndarray): Population window, nodata zeroed, holding every circle whole
+                               (centres at least kernel.r_px pixels from its border)
+            rows (np.ndarray): Centre rows in the window
+            cols (np.ndarray): Centre columns in the window
+            kernel (DiskKernel): Coverage of the circle
+
+        Returns:
+            np.ndarray: Population of each circle
+    '''
+    r = kernel.r_px
+    sums = np.empty(len(rows))
+    full = 0.0
+    prev = None
+    for i, (row, col) in enumerate(zip(rows.tolist(), cols.tolist())):
+        if prev is None:
+            offsets = np.arange(-r, r + 1)
+            full = _spans_total(data, row + offsets, col + kernel.lo, col + kernel.hi)
+        elif (row, col) != prev:
+            # [a1, b1) \ [a0, b0) enters, [a0, b0) \ [a1, b1) leaves; rows off a circle have
+            # the empty span (0, 0), which leaves the whole span of the other circle
+            band = np.arange(min(prev[0], row) - r, max(prev[0], row) + r + 1)
+            a0, b0 = kernel.spans(band, *prev)
+            a1, b1 = kernel.spans(band, row, col)
+            both = np.concatenate([band, band])
+            full += _spans_total(data, both, np.concatenate([a1, np.maximum(a1, b0)]),
+                                np.concatenate([np.minimum(b1, a0), b1]))
+            full -= _spans_total(data, both, np.concatenate([a0, np.maximum(a0, b1)]),
+                                np.concatenate([np.minimum(b0, a1), b0]))
+        edges = data[row + kernel.edge_rows, col + kernel.edge_cols].astype("float64")
+        sums[i] = full + float(np.dot(edges, kernel.edge_frac))
+        prev = (row, col)
+    return sums
+
+
+def corridor_chunks(rows: np.ndarray, cols: np.ndarray, r_px: int, max_pixels: int) -> list[tuple[int, int]]:
+    ''' Split consecutive centres into [start, stop) runs whose padded bounding window stays under max_pixels. '''
+    chunks, start = [], 0
+    rmin = rmax = int(rows[0])
+    cmin = cmax = int(cols[0])
+    for i in range(1, len(rows)):
+        nrmin, nrmax = min(rmin, int(rows[i])), max(rmax, int(rows[i]))
+        ncmin, ncmax = min(cmin, int(cols[i])), max(cmax, int(cols[i]))
+        if (nrmax - nrmin + 2 * r_px + 1) * (ncmax - ncmin + 2 * r_px + 1) > max_pixels:
+            chunks.append((start, i))
+            start = i
+            nrmin = nrmax = int(rows[i])
+            ncmin = ncmax = int(cols[i])
+        rmin, rmax, cmin, cmax = nrmin, nrmax, ncmin, ncmax
+    chunks.append((start, len(rows)))
+    return chunks
+
+
+def read_padded(src, row_off: int, col_off: int, height: int, width: int) -> np.ndarray:
+    ''' Read a window that may extend past the raster, with zeros outside it and for nodata. '''
+    data = np.zeros((height, width), dtype="float32")
+    r0, c0 = max(row_off, 0), max(col_off, 0)
+    r1, c1 = min(row_off + height, src.height), min(col_off + width, src.width)
+    if r1 > r0 and c1 > c0:
+        window = rasterio.windows.Window(c0, r0, c1 - c0, r1 - r0)
+        data[r0 - row_off:r1 - row_off, c0 - col_off:c1 - col_off] = read_population(src, window)
+    return data
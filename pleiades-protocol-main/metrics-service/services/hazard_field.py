@@ -0,0 +1,163 @@
+''' Thermal fluence and overpressure rasters on the population grid.
+
+    Hazard fields are computed on the pixel grid of the GHS-POP raster that population_service
+    selects for the same radius, so a hazard tile and the population under it line up pixel
+    for pixel. Distances are measured in the projected (Mollweide) plane, as for the
+    population circles. The grid is cut in HAZARD_TILE_SIZE tiles aligned to the raster
+    origin and every tile is computed on its own, so a continental-scale field is never held
+    in memory at once.
+'''
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+import rasterio
+
+from services.circle_coverage import get_circle_window
+from services.impact_metrics_vec import ImpactMetricsVec
+from services.population_service import select_raster_and_transform
+from services.worker_pool import SharedArray, share_array
+
+HAZARD_TILE_SIZE = int(os.getenv("HAZARD_TILE_SIZE", "256"))  # pixels per tile edge
+HAZARD_MAX_TILES = int(os.getenv("HAZARD_MAX_TILES", "4096"))  # per hazard grid
+
+FIELDS = ("thermal", "overpressure")
+# Default PNG color scale: log10 range mapped to 1..255 (0 = below range, transparent)
+PNG_RANGES = {
+    "thermal": (1e4, 1e7),       # J/m^2
+    "overpressure": (1.0, 1e3),  # kPa
+}
+
+
+@dataclass
+class HazardGrid:
+    ''' Tiles of the population grid covered by an impact's hazard radius. '''
+    lon: float
+    lat: float
+    energy: float
+    burst_altitude_m: float
+    radius_m: float
+    x: float                  # impact point in the raster CRS
+    y: float
+    crs: str
+    transform: rasterio.Affine
+    window: rasterio.windows.Window
+    tile_size: int
+
+    @property
+    def tile_rows(self) -> range:
+        return range(int(self.window.row_off) // self.tile_size,
+                     (int(self.window.row_off + self.window.height) - 1) // self.tile_size + 1)
+
+    @property
+    def tile_cols(self) -> range:
+        return range(int(self.window.col_off) // self.tile_size,
+                     (int(self.window.col_off + self.window.width) - 1) // self.tile_size + 1)
+
+    def tile_window(self, tile_row: int, tile_col: int) -> rasterio.windows.Window | None:
+        ''' Pixel window of a tile, clipped to the hazard window (None if outside). '''
+        tile = rasterio.windows.Window(tile_col * self.tile_size, tile_row * self.tile_size,
+                                       self.tile_size, self.tile_size)
+        try:
+            return tile.intersection(self.window)
+        except rasterio.errors.WindowError:
+            return None
+
+
+def hazard_grid(lon: float, lat: float, energy: float, burst_altitude_m: float,
+                radius_m: float, tile_size: int = HAZARD_TILE_SIZE) -> HazardGrid | None:
+    ''' Locate the hazard window of an impact on the population grid.
+
+        Args:
+            lon (float): Longitude of the impact point in WGS84
+            lat (float): Latitude of the impact point in WGS84
+            energy (float): Impact energy (J)
+            burst_altitude_m (float): Burst altitude (0 for a ground impact)
+            radius_m (float): Extent of the field around the impact point
+            tile_size (int): Tile edge in pixels
+
+        Returns:
+            HazardGrid: The grid, or None if the circle falls outside the raster
+    '''
+    src, proj_to_raster = select_raster_and_transform(radius_m)
+    x, y = proj_to_raster(lon, lat)
+    window = get_circle_window(src, x, y, radius_m)
+    if window is None:
+        return None
+    crs = src.crs if isinstance(src.crs, str) else src.crs.to_wkt()
+    return HazardGrid(lon, lat, energy, burst_altitude_m, radius_m, float(x), float(y),
+                      crs, src.transform, window, tile_size)
+
+
+def hazard_tile(grid: HazardGrid, field: str, tile_row: int, tile_col: int) -> np.ndarray | None:
+    ''' Evaluate one hazard field over one tile.
+
+        Args:
+            grid (HazardGrid): Grid returned by hazard_grid
+            field (str): "thermal" (fluence, J/m^2) or "overpressure" (kPa)
+            tile_row (int): Tile row in the raster tiling
+            tile_col (int): Tile column in the raster tiling
+
+        Returns:
+            np.ndarray: float32 values of the tile (clipped to the hazard window), NaN
+                outside the hazard radius, or None if the tile is outside the grid
+    '''
+    window = grid.tile_window(tile_row, tile_col)
+    if window is None:
+        return None
+
+    # Distance from the impact point to every pixel center of the tile
+    t = rasterio.windows.transform(window, grid.transform)
+    xs = t.c + (np.arange(window.width) + 0.5) * t.a
+    ys = t.f + (np.arange(window.height) + 0.5) * t.e
+    r = np.hypot(xs[None, :] - grid.x, ys[:, None] - grid.y)
+
+    if field == "thermal":
+        values = ImpactMetricsVec.corrected_exposure(grid.energy, r)
+    elif field == "overpressure":
+        values = ImpactMetricsVec.overpressure_collins_airburst(grid.energy, grid.burst_altitude_m, r) / 1000.0
+    else:
+        raise ValueError(f"Unknown hazard field: {field}")
+
+    values = values.astype("float32")
+    values[r > grid.radius_m] = np.nan
+    return values
+
+
+def hazard_tile_shared(grid: HazardGrid, field: str, tile_row: int, tile_col: int) -> SharedArray | None:
+    ''' hazard_tile for a worker process: the tile comes back through shared memory (see worker_pool.take_array). '''
+    values = hazard_tile(grid, field, tile_row, tile_col)
+    return None if values is None else share_array(values)
+
+
+def encode_f32(values: np.ndarray) -> bytes:
+    ''' Compact binary tile: zlib-compressed little-endian float32, row major. '''
+    return zlib.compress(values.astype("<f4").tobytes(), 6)
+
+
+def encode_png(values: np.ndarray, vmin: float, vmax: float) -> bytes:
+    ''' 8-bit grayscale + alpha PNG, log10 scale from vmin (1) to vmax (255).
+
+        Pixels below vmin or outside the hazard radius (NaN) are fully transparent; values
+        above vmax, including the infinite fluence at ground zero, are drawn at vmax.
+    '''
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = (np.log10(values) - np.log10(vmin)) / (np.log10(vmax) - np.log10(vmin))
+    visible = ~np.isnan(scaled) & (scaled >= 0)
+    gray = np.where(visible, 1 + np.clip(scaled, 0, 1) * 254, 0).astype("uint8")
+    alpha = np.where(visible, 255, 0).astype("uint8")
+
+    height, width = values.shape
+    pixels = np.empty((height, 1 + 2 * width), dtype="uint8")
+    pixels[:, 0] = 0  # filter type None on every scanline
+    pixels[:, 1::2] = gray
+    pixels[:, 2::2] = alpha
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 4, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(pixels.tobytes(), 6)) + chunk(b"IEND", b""))
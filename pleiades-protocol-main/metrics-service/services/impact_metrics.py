@@ -169,7 +169,7 @@ class ImpactMetrics:
     @staticmethod
     def corrected_exposure(E_joules: float, r_m: float, eta: float = 3e-3) -> float:
         Rf = ImpactMetrics.fireball_radius(E_joules)
-        phi0 = ImpactMetrics.thermal_exposure_at_distance(E_joules, r_m, eta)
+        phi0 = ImpactMetrics.thermal_exposure_at_distance(E_joules, r_m, Atmosphere(), eta)
         f = ImpactMetrics.horizon_fraction(r_m, Rf)
         return f * phi0
 
@@ -291,6 +291,17 @@ class ImpactMetrics:
             "structural_damage": psi_to_kpa(10.0)    # ~10 psi (orientativo)
         }
 
+    # ---- Umbrales de daño térmico (para bandas de fluencia) ----
+    @staticmethod
+    def thermal_thresholds_Jm2() -> Dict[str, float]:
+        # 1 cal/cm^2 = 41.84 kJ/m^2; valores orientativos para pulsos de ~1 Mt
+        return {
+            "first_degree_burns": 3.0 * 41_840.0,    # ~3 cal/cm^2
+            "second_degree_burns": 5.0 * 41_840.0,   # ~5 cal/cm^2
+            "third_degree_burns": 8.0 * 41_840.0,    # ~8 cal/cm^2
+            "clothing_ignition": 25.0 * 41_840.0     # ~25 cal/cm^2
+        }
+
     # ---- “Runner” principal para un escenario ----
     @staticmethod
     def summarize(asteroid: Asteroid, scenario: ImpactScenario, target: Target, atm: Atmosphere) -> Dict[str, Any]:
@@ -326,12 +337,15 @@ class ImpactMetrics:
 
         if scenario.is_airburst and atm.burst_altitude_m:
             # Isóbaras para 1/3/5 psi
+            # Todos los umbrales de una vez con la inversión vectorizada (ver impact_metrics_vec)
+            from services.impact_metrics_vec import ImpactMetricsVec
             thresholds = ImpactMetrics.damage_thresholds_kpa()
-            isobars = {}
-            for key, kpa in thresholds.items():
-                R = ImpactMetrics.radius_for_overpressure_airburst(E, atm.burst_altitude_m, kpa)
-                isobars[key] = None if R is None else R / 1000.0
-            out["overpressure_isobars_km"] = isobars
+            radii = ImpactMetricsVec.radius_for_overpressure_airburst(
+                E, atm.burst_altitude_m, list(thresholds.values()))
+            out["overpressure_isobars_km"] = {
+                key: None if math.isnan(R) else float(R) / 1000.0
+                for key, R in zip(thresholds, radii)
+            }
 
         else:
             # Impacto en suelo: cráter + Mw
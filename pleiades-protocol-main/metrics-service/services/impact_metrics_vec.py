@@ -0,0 +1,273 @@
+from typing import Dict, Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from services.impact_metrics import (
+    ImpactMetrics, J_PER_KT, J_PER_MT, R_EARTH, SIGMA, T_STAR, GRAVITY, RHO_TARGET,
+)
+
+SAMPLE_R_KM = [1, 5, 10, 20, 50, 100]  # mismas distancias que summarize
+
+
+# =======================
+# Métricas vectorizadas
+# =======================
+class ImpactMetricsVec:
+    """
+    Versión NumPy de ImpactMetrics: mismas fórmulas, pero cada argumento puede ser
+    un escalar o un array y se aplica broadcasting (p.ej. energías (N,1) x distancias (1,M)).
+    Los resultados coinciden con la versión escalar salvo redondeo de coma flotante.
+    """
+
+    # ---- Energía ----
+    @staticmethod
+    def kinetic_energy(diameter_m: ArrayLike, velocity_mps: ArrayLike, density_kgm3: ArrayLike,
+                       shape_factor: ArrayLike = 1.0, porosity: ArrayLike = 0.0) -> np.ndarray:
+        """
+        Energia cinética (J).
+        """
+        r = np.asarray(diameter_m, dtype="float64") / 2.0
+        volume = (4.0 / 3.0) * np.pi * (r ** 3) * shape_factor
+        density_effective = np.asarray(density_kgm3, dtype="float64") * (1.0 - np.asarray(porosity))
+        mass = volume * density_effective
+        return 0.5 * mass * (np.asarray(velocity_mps, dtype="float64") ** 2)
+
+    @staticmethod
+    def kinetic_energy_megatons(diameter_m: ArrayLike, velocity_mps: ArrayLike, density_kgm3: ArrayLike,
+                                shape_factor: ArrayLike = 1.0, porosity: ArrayLike = 0.0) -> np.ndarray:
+        E = ImpactMetricsVec.kinetic_energy(diameter_m, velocity_mps, density_kgm3, shape_factor, porosity)
+        return E / J_PER_MT
+
+    # ---- Bola de fuego / térmico ----
+    @staticmethod
+    def fireball_radius(E_joules: ArrayLike) -> np.ndarray:
+        return 0.002 * np.cbrt(np.asarray(E_joules, dtype="float64"))
+
+    @staticmethod
+    def thermal_exposure_at_distance(E_joules: ArrayLike, horizontal_distance_m: ArrayLike,
+                                     k_atenuacion: ArrayLike = 0.1, burst_altitude_m: ArrayLike = 0.0,
+                                     eta: ArrayLike = 3e-3) -> np.ndarray:
+        """
+        Exposición térmica (J/m^2); burst_altitude_m = 0 es explosión en superficie
+        (media esfera, sin atenuación ni horizonte), igual que la versión escalar.
+        """
+        E = np.asarray(E_joules, dtype="float64")
+        r = np.asarray(horizontal_distance_m, dtype="float64")
+        h = np.nan_to_num(np.asarray(burst_altitude_m, dtype="float64"))  # None -> nan -> 0
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Explosión en el suelo: media esfera
+            ground = eta * E / (2.0 * np.pi * r ** 2)
+
+            # Explosión aérea con correcciones geométricas, atenuación y horizonte
+            distance = np.sqrt(r ** 2 + h ** 2)
+            cos_theta = np.clip(h / distance, 0.0, 1.0)
+            G = 0.5 + 0.5 * (h / (h + r))
+            tau = np.exp(-k_atenuacion * (distance / (h + 1.0)))
+            frac_visible = ImpactMetricsVec.horizon_fraction(r, ImpactMetricsVec.fireball_radius(E))
+            air = eta * E * cos_theta * tau * G * frac_visible / (4.0 * np.pi * distance ** 2)
+
+        out = np.where(h == 0, ground, air)
+        return np.where(r <= 0, np.inf, out)
+
+    @staticmethod
+    def horizon_fraction(r_m: ArrayLike, Rf: ArrayLike) -> np.ndarray:
+        """
+        Corrección geométrica por curvatura: fracción visible de la bola de fuego.
+        """
+        r = np.asarray(r_m, dtype="float64")
+        Rf = np.asarray(Rf, dtype="float64")
+        h = (1.0 - np.cos(r / R_EARTH)) * R_EARTH
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = h / Rf
+            G = np.arccos(np.clip(ratio, -1.0, 1.0))
+            f = np.clip((2.0 / np.pi) * (G - ratio * np.sin(G)), 0.0, 1.0)
+        return np.where(h >= Rf, 0.0, f)
+
+    @staticmethod
+    def corrected_exposure(E_joules: ArrayLike, r_m: ArrayLike, eta: ArrayLike = 3e-3) -> np.ndarray:
+        Rf = ImpactMetricsVec.fireball_radius(E_joules)
+        phi0 = ImpactMetricsVec.thermal_exposure_at_distance(E_joules, r_m, eta=eta)
+        return ImpactMetricsVec.horizon_fraction(r_m, Rf) * phi0
+
+    @staticmethod
+    def thermal_duration_tau(E_joules: ArrayLike, eta: ArrayLike = 3e-3, T_star: ArrayLike = T_STAR) -> np.ndarray:
+        """
+        Duración característica del pulso térmico (s).
+        """
+        E = np.asarray(E_joules, dtype="float64")
+        Rf = ImpactMetricsVec.fireball_radius(E)
+        denom = 2.0 * np.pi * (Rf ** 2) * SIGMA * (np.asarray(T_star, dtype="float64") ** 4)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denom <= 0, 0.0, (eta * E) / denom)
+
+    # ---- Sobrepresión (airburst) ----
+    @staticmethod
+    def overpressure_collins_airburst(E_joules: ArrayLike, burst_altitude_m: ArrayLike,
+                                      r_m: ArrayLike) -> np.ndarray:
+        """
+        Sobrepresión (Pa) en el suelo; tramo cercano exponencial y tramo lejano (Mach).
+        """
+        E_kt = np.asarray(E_joules, dtype="float64") / J_PER_KT
+        h = np.asarray(burst_altitude_m, dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            scale = np.where(E_kt > 0, np.cbrt(E_kt), 1.0)
+            r1 = np.asarray(r_m, dtype="float64") / scale
+            h1 = np.where(h > 0, h / scale, 1e-6)
+
+            # Región cercana
+            p0 = 3.14e11 * (h1 ** -2.6)
+            beta = 34.87 * (h1 ** -1.73)
+
+            # Radio de transición a reflexión Mach
+            denom = 550.0 - h1
+            rm1 = np.where(denom <= 0, 1e12, 550.0 * (h1 ** 1.2) / (1.2 * denom))
+
+            near = p0 * np.exp(-beta * r1)
+            PX, RX = 75_000.0, 290.0
+            far = PX * (RX / (4.0 * r1)) * (1.0 + 3.0 * ((r1 / RX) ** 1.3))
+            p = np.where(r1 <= rm1, near, far)
+        return np.maximum(0.0, p)
+
+    @staticmethod
+    def radius_for_overpressure_airburst(E_joules: ArrayLike, burst_altitude_m: ArrayLike,
+                                         p_threshold_kpa: ArrayLike,
+                                         R_min: float = 10.0, R_max: float = 1_000_000.0,
+                                         newton_steps: int = 8) -> np.ndarray:
+        """
+        Inversión de overpressure_collins_airburst: primer radio (m) en [R_min, R_max] donde
+        la sobrepresión baja a p_threshold_kpa. NaN donde la versión escalar devuelve None
+        (p(R_min) < umbral) y R_max si el umbral no se alcanza dentro del rango.
+
+        En variable escalada r1 = r / E_kt^(1/3):
+          - tramo cercano p0*exp(-beta*r1): se invierte en forma cerrada, r1 = ln(p0/p)/beta
+          - tramo lejano PX*(RX/(4 r1) + 0.75*(r1/RX)^0.3): decrece hasta su mínimo en
+            R1_MIN y luego crece, así que sólo puede cruzar el umbral antes de R1_MIN;
+            ahí se resuelve con unos pasos de Newton acotados al intervalo.
+        """
+        E_kt = np.asarray(E_joules, dtype="float64") / J_PER_KT
+        h = np.asarray(burst_altitude_m, dtype="float64")
+        target = np.asarray(p_threshold_kpa, dtype="float64") * 1_000.0
+        PX, RX = 75_000.0, 290.0
+        far = lambda r1: PX * (RX / (4.0 * r1) + 0.75 * (r1 / RX) ** 0.3)
+        far_prime = lambda r1: PX * (-RX / (4.0 * r1 ** 2) + 0.225 * r1 ** -0.7 * RX ** -0.3)
+        R1_MIN = RX * 0.9 ** (-1.0 / 1.3)  # mínimo del tramo lejano
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            scale = np.where(E_kt > 0, np.cbrt(E_kt), 1.0)
+            h1 = np.where(h > 0, h / scale, 1e-6)
+            p0 = 3.14e11 * (h1 ** -2.6)
+            beta = 34.87 * (h1 ** -1.73)
+            denom = 550.0 - h1
+            rm1 = np.where(denom <= 0, 1e12, 550.0 * (h1 ** 1.2) / (1.2 * denom))
+            s1 = R_min / scale
+
+            # Tramo cercano: forma cerrada
+            r_near = np.log(p0 / target) / beta
+            near_hit = (s1 <= rm1) & (r_near <= rm1)
+
+            # Tramo lejano: desde el inicio del tramo (o R_min) hasta el mínimo
+            a = np.maximum(s1, rm1)
+            at_start = far(a) <= target
+            bracketed = (a < R1_MIN) & (far(R1_MIN) <= target)
+            # Arranque en la raíz del término 1/r, que queda a la izquierda del cruce: el tramo
+            # es convexo y decreciente hasta R1_MIN, así que Newton converge de forma monótona
+            r1 = np.clip(np.maximum(a, PX * RX / (4.0 * target)), a, R1_MIN)
+            r1 = np.broadcast_to(r1, np.broadcast_shapes(a.shape, target.shape)).copy()
+            for _ in range(newton_steps):
+                r1 = np.clip(r1 - (far(r1) - target) / far_prime(r1), a, R1_MIN)
+
+            r1_hit = np.where(near_hit, r_near,
+                              np.where(at_start, a, np.where(bracketed, r1, np.inf)))
+            R = np.minimum(r1_hit * scale, R_max)
+
+        p_min = ImpactMetricsVec.overpressure_collins_airburst(E_joules, burst_altitude_m, R_min)
+        return np.where(p_min < target, np.nan, R)
+
+    @staticmethod
+    def radius_for_thermal_exposure(E_joules: ArrayLike, phi_threshold_Jm2: ArrayLike,
+                                    R_min: float = 1.0, R_max: float = 10_000_000.0,
+                                    points_per_decade: int = 200) -> np.ndarray:
+        """
+        Inversión de corrected_exposure: radio (m) donde la fluencia baja a phi_threshold_Jm2.
+        La fluencia decrece con la distancia (1/r^2 por la fracción de horizonte), así que se
+        evalúa en una malla logarítmica de radios y se interpola en log-log entre los dos
+        puntos que rodean el umbral. NaN si ni en R_min se alcanza el umbral.
+        """
+        E = np.asarray(E_joules, dtype="float64")[..., None]
+        phi_t = np.asarray(phi_threshold_Jm2, dtype="float64")[..., None]
+        n = int(points_per_decade * np.log10(R_max / R_min)) + 1
+        r = np.geomspace(R_min, R_max, n)
+        phi = ImpactMetricsVec.corrected_exposure(E, r)
+        phi = np.broadcast_to(phi, np.broadcast_shapes(phi.shape, phi_t.shape))
+
+        # Número de puntos de la malla por encima del umbral = índice del cruce
+        k = np.sum(phi >= phi_t, axis=-1, keepdims=True)
+        lo = np.clip(k - 1, 0, n - 2)
+        r0, r1 = r[lo], r[lo + 1]
+        p0 = np.take_along_axis(phi, lo, axis=-1)
+        p1 = np.take_along_axis(phi, lo + 1, axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.log(p0 / phi_t) / np.log(p0 / p1)
+            R = np.where(p1 > 0, r0 * (r1 / r0) ** np.clip(t, 0.0, 1.0), r0)
+        R = np.where(k >= n, R_max, R)
+        return np.where(k == 0, np.nan, R)[..., 0]
+
+    # ---- Cráter ----
+    @staticmethod
+    def crater_diameter_simple(E_joules: ArrayLike, target_density_kgm3: ArrayLike = RHO_TARGET) -> np.ndarray:
+        k = 1.8e-3
+        rho_i_over_rho_t = 3000.0 / np.maximum(np.asarray(target_density_kgm3, dtype="float64"), 1.0)
+        D = k * (GRAVITY ** -0.17) * (rho_i_over_rho_t ** 0.11) * (np.asarray(E_joules, dtype="float64") ** 0.29)
+        return np.maximum(0.0, D)
+
+    # ---- Magnitud sísmica (Mw) ----
+    @staticmethod
+    def seismic_magnitude_Mw(E_joules: ArrayLike, coupling: ArrayLike = 1e-4) -> np.ndarray:
+        E_s = np.maximum(1.0, coupling * np.asarray(E_joules, dtype="float64"))
+        return (np.log10(E_s) - 4.8) / 1.5
+
+    # ---- Tsunami ----
+    @staticmethod
+    def tsunami_wave_height_coast(E_joules: ArrayLike, depth_m: ArrayLike, range_km: ArrayLike = 100.0) -> np.ndarray:
+        depth = np.asarray(depth_m, dtype="float64")
+        c = 0.012
+        h = c * (np.asarray(E_joules, dtype="float64") ** 0.25) / (
+            np.maximum(depth, 1.0) ** 0.5 * np.maximum(np.asarray(range_km, dtype="float64"), 1.0) ** 0.75)
+        return np.where(depth <= 0, 0.0, np.maximum(0.0, h))
+
+    # ---- Resumen por lotes ----
+    @staticmethod
+    def summarize_batch(diameter_m: ArrayLike, velocity_mps: ArrayLike, density_kgm3: ArrayLike,
+                        porosity: ArrayLike = 0.0, burst_altitude_m: ArrayLike = 0.0,
+                        shape_factor: float = 1.0, is_airburst: bool = True,
+                        target_density_kgm3: float = RHO_TARGET,
+                        water_depth_m: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        Métricas de ImpactMetrics.summarize para N escenarios a la vez, como un array
+        (N,) por métrica: energía, fluencia térmica a SAMPLE_R_KM, isóbaras (airburst)
+        o cráter, Mw y tsunami (impacto en suelo). NaN donde no se alcanza el umbral.
+        """
+        E = ImpactMetricsVec.kinetic_energy(diameter_m, velocity_mps, density_kgm3, shape_factor, porosity)
+        E = np.atleast_1d(E)
+        out = {"energy_joules": E, "yield_megatons": E / J_PER_MT}
+
+        # Térmico a las distancias de ejemplo de summarize
+        fluence = ImpactMetricsVec.corrected_exposure(E[:, None], np.array(SAMPLE_R_KM)[None, :] * 1000.0)
+        for i, rk in enumerate(SAMPLE_R_KM):
+            out[f"thermal_fluence_Jm2_{rk}km"] = fluence[:, i]
+
+        if is_airburst:
+            h = np.broadcast_to(np.asarray(burst_altitude_m, dtype="float64"), E.shape)
+            thresholds = ImpactMetrics.damage_thresholds_kpa()
+            radii = ImpactMetricsVec.radius_for_overpressure_airburst(
+                E[:, None], h[:, None], np.array(list(thresholds.values()))[None, :])
+            for i, key in enumerate(thresholds):
+                out[f"isobar_{key}_km"] = radii[:, i] / 1000.0
+        else:
+            out["crater_diameter_m"] = ImpactMetricsVec.crater_diameter_simple(E, target_density_kgm3)
+            out["seismic_Mw"] = ImpactMetricsVec.seismic_magnitude_Mw(E)
+            if water_depth_m and water_depth_m > 0:
+                out["tsunami_H_100km_m"] = ImpactMetricsVec.tsunami_wave_height_coast(E, water_depth_m, 100.0)
+        return out
@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.impact_metrics import Target
+from services.impact_metrics_vec import ImpactMetricsVec
+
+# =======================
+# Configuración
+# =======================
+MONTECARLO_WORKERS = int(os.getenv("MONTECARLO_WORKERS", str(os.cpu_count() or 1)))
+MONTECARLO_CHUNK = int(os.getenv("MONTECARLO_CHUNK", "250000"))  # muestras por lote vectorizado
+MONTECARLO_MAX_SAMPLES = int(os.getenv("MONTECARLO_MAX_SAMPLES", "5000000"))
+
+
+# =======================
+# Distribuciones de entrada
+# =======================
+@dataclass
+class Distribution:
+    """
+    kind: "fixed" (a), "uniform" (a=min, b=max), "normal" (a=media, b=desviación)
+    o "lognormal" (a=mediana, b=desviación de ln).
+    """
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        if self.kind == "fixed":
+            return np.full(n, self.a)
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b, n)
+        if self.kind == "normal":
+            return rng.normal(self.a, self.b, n)
+        if self.kind == "lognormal":
+            return rng.lognormal(np.log(self.a), self.b, n)
+        raise ValueError(f"Unknown distribution kind: {self.kind}")
+
+    def is_positive(self) -> bool:
+        """ True si toda muestra es > 0 ("normal" puede dar cualquier valor). """
+        if self.kind == "fixed":
+            return self.a > 0
+        if self.kind == "uniform":
+            return min(self.a, self.b) > 0
+        return self.kind == "lognormal" and self.a > 0
+
+
+@dataclass
+class UncertainImpact:
+    """
+    Escenario con incertidumbre: los parámetros de Asteroid (y la altura de explosión)
+    son distribuciones; Target y el tipo de escenario son fijos.
+    """
+    diameter_m: Distribution
+    velocity_mps: Distribution
+    density_kgm3: Distribution
+    porosity: Distribution = field(default_factory=Distribution)
+    burst_altitude_m: Distribution = field(default_factory=Distribution)
+    shape_factor: float = 1.0
+    is_airburst: bool = True
+    target: Target = field(default_factory=Target)
+
+
+# =======================
+# Evaluación por lotes
+# =======================
+def evaluate_batch(impact: UncertainImpact, n: int, seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """
+    Muestrea n escenarios y evalúa las métricas de summarize de forma vectorizada.
+    Devuelve un array (float32) por métrica; NaN donde el umbral no se alcanza.
+    """
+    rng = np.random.default_rng(seed)
+    d = np.maximum(impact.diameter_m.sample(rng, n), 0.0)
+    v = np.maximum(impact.velocity_mps.sample(rng, n), 0.0)
+    rho = np.maximum(impact.density_kgm3.sample(rng, n), 0.0)
+    por = np.clip(impact.porosity.sample(rng, n), 0.0, 0.99)
+
+    h = np.maximum(impact.burst_altitude_m.sample(rng, n), 0.0) if impact.is_airburst else 0.0
+
+    out = ImpactMetricsVec.summarize_batch(d, v, rho, por, h, impact.shape_factor, impact.is_airburst,
+                                           impact.target.density_kgm3, impact.target.water_depth_m)
+    return {k: np.asarray(val, dtype="float32") for k, val in out.items()}
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    Pool de procesos compartido, creado al primer uso. Se usa "spawn" para que los
+    hijos no hereden hilos ni descriptores (rasters, sockets) del servidor.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(MONTECARLO_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def run_montecarlo(impact: UncertainImpact, n_samples: int, seed: Optional[int] = None,
+                   percentiles: List[float] = (5.0, 50.0, 95.0)) -> Dict[str, object]:
+    """
+    Monte Carlo sobre un escenario con incertidumbre.
+
+    Las muestras se reparten en lotes de MONTECARLO_CHUNK con semillas derivadas de `seed`
+    (SeedSequence.spawn), así que el resultado es reproducible sea cual sea el número de
+    procesos. Con más de un lote, los lotes se evalúan en el pool de procesos.
+
+    Como en ImpactMetrics.summarize, un airburst con altura fija 0 se evalúa como impacto
+    en suelo (cráter y Mw). Si la altura es aleatoria debe ser siempre positiva: las
+    isóbaras no están definidas a altura 0.
+    """
+    if n_samples <= 0 or n_samples > MONTECARLO_MAX_SAMPLES:
+        raise ValueError(f"n_samples must be in [1, {MONTECARLO_MAX_SAMPLES}]")
+    if impact.is_airburst:
+        altitude = impact.burst_altitude_m
+        if altitude.kind == "fixed" and altitude.a <= 0:
+            impact = replace(impact, is_airburst=False)
+        elif not altitude.is_positive():
+            raise ValueError("burst_altitude_m must be positive for an airburst: use a fixed or "
+                             "uniform distribution above 0, or a lognormal one")
+
+    sizes = [MONTECARLO_CHUNK] * (n_samples // MONTECARLO_CHUNK)
+    if n_samples % MONTECARLO_CHUNK:
+        sizes.append(n_samples % MONTECARLO_CHUNK)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if len(sizes) == 1 or MONTECARLO_WORKERS <= 1:
+        batches = [evaluate_batch(impact, n, s) for n, s in zip(sizes, seeds)]
+    else:
+        pool = get_pool()
+        batches = list(pool.map(evaluate_batch, [impact] * len(sizes), sizes, seeds))
+
+    metrics = {}
+    for key in batches[0]:
+        values = np.concatenate([b[key] for b in batches]).astype("float64")
+        finite = np.isfinite(values)
+        valid = values[finite]
+        metrics[key] = {
+            "mean": float(valid.mean()) if valid.size else None,
+            "percentiles": {
+                f"p{q:g}": float(v) for q, v in zip(percentiles, np.percentile(valid, percentiles))
+            } if valid.size else {f"p{q:g}": None for q in percentiles},
+            "valid_fraction": float(finite.mean()),
+        }
+
+    return {"n_samples": n_samples, "seed": seed, "metrics": metrics}
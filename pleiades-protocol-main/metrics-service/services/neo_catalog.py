@@ -0,0 +1,276 @@
+"""
+Almacén local de escenarios de un catálogo de NEOs.
+
+Cada objeto del catálogo (CSV con rangos de diámetro, velocidad y densidad) se expande en
+tres escenarios: "low" (mínimos), "nominal" (media geométrica del diámetro y punto medio de
+velocidad y densidad) y "high" (máximos). Sus métricas se calculan en bloque con
+ImpactMetricsVec.summarize_batch y se guardan en SQLite.
+
+Cada escenario lleva una clave: el hash de sus entradas y de la huella del modelo, es decir
+las constantes (J_PER_MT, T_STAR, YIELD_STRENGTH, umbrales...) y el código de las fórmulas
+que usa su régimen (airburst o impacto en suelo). Al volver a ingerir el catálogo sólo se
+recalculan los escenarios cuya clave ha cambiado: objetos nuevos o editados, o todos los de
+un régimen cuyas constantes o fórmulas han cambiado. Los objetos retirados del catálogo se
+borran.
+
+    python -m services.neo_catalog data/neo_store.sqlite catalog/neo_sample.csv
+"""
+import argparse
+import csv
+import hashlib
+import inspect
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import types
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services import impact_metrics
+from services.impact_metrics import ImpactMetrics, RHO_TARGET
+from services.impact_metrics_vec import SAMPLE_R_KM, ImpactMetricsVec
+
+# =======================
+# Configuración
+# =======================
+NEO_CATALOG_PATH = os.getenv("NEO_CATALOG_PATH", "catalog/neo_sample.csv")  # catálogo ingerido al abrir
+NEO_STORE_PATH = os.getenv("NEO_STORE_PATH", "data/neo_store.sqlite")
+
+CASES = ("low", "nominal", "high")
+CONSTANTS = ("J_PER_MT", "J_PER_KT", "KPA_PER_PSI", "R_EARTH", "SIGMA", "T_STAR", "GRAVITY",
+             "RHO_TARGET", "YIELD_STRENGTH")
+
+# Fórmulas de cada régimen (las que summarize_batch llega a evaluar)
+_COMMON = (ImpactMetricsVec.kinetic_energy, ImpactMetricsVec.fireball_radius,
+           ImpactMetricsVec.thermal_exposure_at_distance, ImpactMetricsVec.horizon_fraction,
+           ImpactMetricsVec.corrected_exposure, ImpactMetricsVec.summarize_batch)
+FORMULAS = {
+    "airburst": _COMMON + (ImpactMetricsVec.overpressure_collins_airburst,
+                           ImpactMetricsVec.radius_for_overpressure_airburst),
+    "ground": _COMMON + (ImpactMetricsVec.crater_diameter_simple, ImpactMetricsVec.seismic_magnitude_Mw,
+                         ImpactMetricsVec.tsunami_wave_height_coast),
+}
+
+
+def _global_names(code: types.CodeType) -> set:
+    """ Nombres globales y atributos que usa un código, incluidos sus lambdas y comprensiones. """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _global_names(const)
+    return names
+
+
+def model_fingerprint(regime: str) -> str:
+    """
+    Huella del modelo de un régimen: las constantes que usan sus fórmulas, distancias y
+    umbrales de summarize y el código fuente de las fórmulas. Cambia cuando cambia
+    cualquiera de ellos (y sólo en el régimen que los usa).
+    """
+    used = set().union(*(_global_names(fn.__code__) for fn in FORMULAS[regime]))
+    state = {
+        "constants": {name: getattr(impact_metrics, name) for name in CONSTANTS if name in used},
+        "sample_r_km": SAMPLE_R_KM,
+        "thermal_thresholds_Jm2": ImpactMetrics.thermal_thresholds_Jm2(),
+        "formulas": [inspect.getsource(fn) for fn in FORMULAS[regime]],
+    }
+    if regime == "airburst":
+        state["damage_thresholds_kpa"] = ImpactMetrics.damage_thresholds_kpa()
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+
+def scenario_key(inputs: Dict[str, float], fingerprint: str) -> str:
+    """ Clave de un escenario: hash de sus entradas y de la huella del modelo. """
+    text = json.dumps(inputs, sort_keys=True) + "|" + fingerprint
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def read_catalog(path: str) -> List[Dict]:
+    """
+    Lee el catálogo CSV: id, name, diameter_min_m, diameter_max_m, velocity_min_kms,
+    velocity_max_kms, density_min_kgm3, density_max_kgm3 y burst_altitude_m (vacío para un
+    impacto en suelo). Un máximo vacío se toma igual al mínimo.
+    """
+    objects = []
+    with open(path, newline="") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                obj = {"id": row["id"].strip(), "name": (row.get("name") or "").strip()}
+                for field, unit in (("diameter", "m"), ("velocity", "kms"), ("density", "kgm3")):
+                    lo = float(row[f"{field}_min_{unit}"])
+                    hi = float(row.get(f"{field}_max_{unit}") or lo)
+                    if not 0 < lo <= hi:
+                        raise ValueError(f"{field} range must satisfy 0 < min <= max")
+                    obj[field] = (lo, hi)
+                altitude = (row.get("burst_altitude_m") or "").strip()
+                obj["burst_altitude_m"] = float(altitude) if altitude else None
+            except (KeyError, ValueError) as exc:
+                raise ValueError(f"{path}:{line}: {exc}") from exc
+            if not obj["id"]:
+                raise ValueError(f"{path}:{line}: empty id")
+            objects.append(obj)
+    return objects
+
+
+def expand_cases(obj: Dict) -> Dict[str, Dict[str, float]]:
+    """ Entradas de los escenarios low / nominal / high de un objeto (velocidad en m/s). """
+    (d0, d1), (v0, v1), (rho0, rho1) = obj["diameter"], obj["velocity"], obj["density"]
+    picks = {
+        "low": (d0, v0, rho0),
+        "nominal": (math.sqrt(d0 * d1), 0.5 * (v0 + v1), 0.5 * (rho0 + rho1)),
+        "high": (d1, v1, rho1),
+    }
+    airburst = obj["burst_altitude_m"] is not None
+    return {
+        case: {
+            "diameter_m": d, "velocity_mps": v * 1000.0, "density_kgm3": rho,
+            "porosity": 0.0, "shape_factor": 1.0, "is_airburst": airburst,
+            "burst_altitude_m": obj["burst_altitude_m"] if airburst else 0.0,
+            "target_density_kgm3": RHO_TARGET,
+        }
+        for case, (d, v, rho) in picks.items()
+    }
+
+
+def _json_value(value: float) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class NeoScenarioStore:
+    """
+    Escenarios precalculados de un catálogo de NEOs en un fichero SQLite (una conexión por
+    hilo, como SqliteCacheBackend).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS objects "
+                         "(id TEXT PRIMARY KEY, name TEXT, source TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS scenarios "
+                         "(object_id TEXT NOT NULL, case_name TEXT NOT NULL, key TEXT NOT NULL, "
+                         "regime TEXT NOT NULL, inputs TEXT NOT NULL, metrics TEXT NOT NULL, "
+                         "computed_at REAL NOT NULL, PRIMARY KEY (object_id, case_name))")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30.0)
+        return conn
+
+    def ingest(self, catalog_path: str) -> Dict[str, float]:
+        """
+        Sincroniza el almacén con un catálogo: calcula los escenarios cuya clave no está
+        guardada, conserva el resto y borra los objetos que ya no están en el catálogo.
+        Devuelve cuántos objetos y escenarios se han calculado, reutilizado y borrado.
+        """
+        start = time.perf_counter()
+        objects = read_catalog(catalog_path)
+        fingerprints = {regime: model_fingerprint(regime) for regime in FORMULAS}
+        conn = self._connect()
+        stored = {(oid, case): key for oid, case, key in
+                  conn.execute("SELECT object_id, case_name, key FROM scenarios")}
+
+        pending = {"airburst": [], "ground": []}  # (object_id, case, key, inputs)
+        wanted = set()
+        for obj in objects:
+            for case, inputs in expand_cases(obj).items():
+                regime = "airburst" if inputs["is_airburst"] else "ground"
+                key = scenario_key(inputs, fingerprints[regime])
+                wanted.add((obj["id"], case))
+                if stored.get((obj["id"], case)) != key:
+                    pending[regime].append((obj["id"], case, key, inputs))
+
+        rows = []
+        now = time.time()
+        for regime, items in pending.items():
+            if not items:
+                continue
+            metrics = self._summarize(regime, [inputs for _, _, _, inputs in items])
+            for i, (oid, case, key, inputs) in enumerate(items):
+                values = {name: _json_value(column[i]) for name, column in metrics.items()}
+                rows.append((oid, case, key, regime, json.dumps(inputs), json.dumps(values), now))
+
+        stale = [pair for pair in stored if pair not in wanted]
+        source = os.path.abspath(catalog_path)
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO objects VALUES (?, ?, ?)",
+                             [(obj["id"], obj["name"], source) for obj in objects])
+            conn.executemany("INSERT OR REPLACE INTO scenarios VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany("DELETE FROM scenarios WHERE object_id = ? AND case_name = ?", stale)
+            conn.execute("DELETE FROM objects WHERE id NOT IN (SELECT object_id FROM scenarios)")
+        return {
+            "objects": len(objects),
+            "computed": len(rows),
+            "reused": len(wanted) - len(rows),
+            "deleted": len(stale),
+            "seconds": time.perf_counter() - start,
+        }
+
+    @staticmethod
+    def _summarize(regime: str, inputs: List[Dict[str, float]]) -> Dict[str, np.ndarray]:
+        """ Métricas de un lote de escenarios del mismo régimen, en una llamada vectorizada. """
+        column = lambda name: np.array([x[name] for x in inputs], dtype="float64")
+        return ImpactMetricsVec.summarize_batch(
+            column("diameter_m"), column("velocity_mps"), column("density_kgm3"), column("porosity"),
+            column("burst_altitude_m"), 1.0, regime == "airburst", RHO_TARGET, None)
+
+    def get(self, object_id: str) -> Optional[Dict]:
+        """ Un objeto con sus escenarios, o None si no está en el almacén. """
+        conn = self._connect()
+        obj = conn.execute("SELECT id, name FROM objects WHERE id = ?", (object_id,)).fetchone()
+        if obj is None:
+            return None
+        scenarios = {
+            case: {"regime": regime, "inputs": json.loads(inputs), "metrics": json.loads(metrics),
+                   "computed_at": computed_at}
+            for case, regime, inputs, metrics, computed_at in conn.execute(
+                "SELECT case_name, regime, inputs, metrics, computed_at FROM scenarios WHERE object_id = ?",
+                (object_id,))
+        }
+        return {"id": obj[0], "name": obj[1],
+                "scenarios": {case: scenarios[case] for case in CASES if case in scenarios}}
+
+    def list_objects(self, limit: int = 100, offset: int = 0) -> Dict:
+        """ Página de objetos (id y nombre) y el total. """
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+        items = [{"id": oid, "name": name} for oid, name in conn.execute(
+            "SELECT id, name FROM objects ORDER BY id LIMIT ? OFFSET ?", (limit, offset))]
+        return {"total": total, "objects": items}
+
+
+_store: Optional[NeoScenarioStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> NeoScenarioStore:
+    """
+    Almacén de NEO_STORE_PATH, abierto en el primer uso y sincronizado con
+    NEO_CATALOG_PATH (sólo se calcula lo que ha cambiado desde la última ingesta).
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = NeoScenarioStore(NEO_STORE_PATH)
+                if os.path.exists(NEO_CATALOG_PATH):
+                    store.ingest(NEO_CATALOG_PATH)
+                _store = store
+    return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a NEO catalog into the scenario store")
+    parser.add_argument("store", help="SQLite store path")
+    parser.add_argument("catalog", help="catalog CSV")
+    args = parser.parse_args()
+    print(json.dumps(NeoScenarioStore(args.store).ingest(args.catalog)))
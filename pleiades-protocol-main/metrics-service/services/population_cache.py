@@ -0,0 +1,151 @@
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+METERS_PER_DEGREE = 111_320.0
+RADIUS_KEY_REL = 1e-3  # radii within 0.1% share a cache key
+
+
+def quantize_circle(lon: float, lat: float, radius_m: float, quantum_m: float,
+                    radius_rel: float = RADIUS_KEY_REL) -> tuple[int, int, int]:
+    ''' Cache key of a circle: its center snapped to a grid of quantum_m meters and its
+        radius to a relative grid of radius_rel.
+
+        Only the key is quantized; the estimate stored under it is that of the circle
+        requested first. The relative radius grid never maps a positive radius to zero.
+
+        Returns:
+            tuple[int, int, int]: Integer cache key
+    '''
+    dlat = quantum_m / METERS_PER_DEGREE
+    qlat = round(lat / dlat)
+    dlon = dlat / max(math.cos(math.radians(qlat * dlat)), 1e-6)
+    qlon = round(lon / dlon)
+    qr = round(math.log(radius_m) / math.log1p(radius_rel)) if radius_m > 0 else None
+    return qlon, qlat, qr
+
+
+class SqliteCacheBackend:
+    ''' Population results stored in a local SQLite file, shared by all worker processes. '''
+
+    def __init__(self, path: str, ttl_s: float):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS population_cache "
+                         "(key TEXT PRIMARY KEY, value REAL NOT NULL, expires REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5.0)
+        return conn
+
+    def get(self, key: str) -> float | None:
+        row = self._connect().execute(
+            "SELECT value FROM population_cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: float) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO population_cache VALUES (?, ?, ?)",
+                         (key, value, time.time() + self.ttl_s))
+
+    def purge_expired(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM population_cache WHERE expires <= ?", (time.time(),)).rowcount
+
+
+class PopulationCache:
+    ''' Thread-safe LRU + TTL cache of population estimates, optionally backed by SQLite.
+
+        Lookups go to the in-process LRU first, then to the shared backend; values computed
+        on a miss are written to both.
+    '''
+
+    def __init__(self, max_entries: int, ttl_s: float, backend: SqliteCacheBackend | None = None):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: tuple) -> float | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+        if self.backend is not None:
+            value = self.backend.get(repr(key))
+            if value is not None:
+                self._put(key, value)
+                with self._lock:
+                    self.backend_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: tuple, value: float) -> None:
+        self._put(key, value)
+        if self.backend is not None:
+            self.backend.set(repr(key), value)
+
+    def _put(self, key: tuple, value: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "shared_backend": None if self.backend is None else self.backend.path,
+                "hits": self.hits,
+                "backend_hits": self.backend_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def merge_stats(stats: list[dict]) -> dict:
+    ''' Totals of the PopulationCache.stats() of several worker processes. '''
+    merged = {key: sum(s[key] for s in stats)
+              for key in ("entries", "hits", "backend_hits", "misses", "evictions", "expirations")}
+    merged["max_entries_per_worker"] = stats[0]["max_entries"] if stats else 0
+    merged["ttl_s"] = stats[0]["ttl_s"] if stats else None
+    merged["shared_backend"] = stats[0]["shared_backend"] if stats else None
+    return merged
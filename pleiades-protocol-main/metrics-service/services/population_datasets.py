@@ -0,0 +1,179 @@
+''' Population datasets (rasters, prefix-sum tables, pyramid), opened on first use.
+
+    Nothing is opened, and neither rasterio nor pyproj is imported, until a dataset is first
+    needed, so importing the service (and serving the impact endpoints) does not pay the
+    GDAL start-up cost. warm_up() opens everything ahead of traffic; the app runs it in a
+    background thread at startup (POPULATION_WARMUP) and /ready reports its progress.
+
+    A required dataset that cannot be opened raises DatasetUnavailable (answered with 503)
+    at the request that needed it, instead of being silently replaced by None. It is retried
+    on the next use, so data that appears later is picked up without a restart.
+'''
+import os
+import threading
+import time
+
+# --- CONFIG ---
+RASTER_HIGHRES_PATH = os.getenv("RASTER_HIGHRES_PATH", "data/GHS_POP_E2025_GLOBE_R2023A_54009_100_V1_0.tif") # 100 m
+RASTER_LOWRES_PATH = os.getenv("RASTER_LOWRES_PATH", "data/GHS_POP_E2025_GLOBE_R2023A_54009_1000_V1_0.tif")  # 1 km
+GDAL_CACHEMAX_MB = int(os.getenv("GDAL_CACHEMAX_MB", "512"))  # GDAL block cache shared by all threads
+PREFIX_HIGHRES_DIR = os.getenv("PREFIX_HIGHRES_DIR", "data/prefix_100")  # built with `python -m services.summed_area`
+PREFIX_LOWRES_DIR = os.getenv("PREFIX_LOWRES_DIR", "data/prefix_1000")
+PYRAMID_DIR = os.getenv("PYRAMID_DIR", "data/pyramid")  # built with `python -m services.population_pyramid`
+RISK_MAP_DIR = os.getenv("RISK_MAP_DIR", "data/risk_maps")  # built with `python -m services.risk_map`
+COASTAL_INDEX_DIR = os.getenv("COASTAL_INDEX_DIR", "data/coastal_index")  # built with `python -m services.coastal_index`
+POPULATION_WARMUP = os.getenv("POPULATION_WARMUP", "1") == "1"  # open every dataset at startup
+
+
+class DatasetUnavailable(OSError):
+    ''' A required population dataset could not be opened. '''
+
+
+_UNSET = object()
+
+
+class LazyDataset:
+    ''' A dataset opened by opener(path) on first load() (thread-safe).
+
+        Optional datasets (indexes) load as None when they have not been built. Load time
+        and the last error are kept for the readiness report.
+    '''
+
+    def __init__(self, name: str, path: str, opener: callable, required: bool = False):
+        self.name = name
+        self.path = path
+        self.opener = opener
+        self.required = required
+        self.error: str | None = None
+        self.load_ms: float | None = None
+        self._value = _UNSET
+        self._lock = threading.Lock()
+
+    def load(self):
+        ''' The opened dataset (None for an optional dataset that is not built).
+
+            Raises:
+                DatasetUnavailable: If the dataset exists (or is required) but cannot be opened
+        '''
+        value = self._value
+        if value is _UNSET:
+            with self._lock:
+                if self._value is _UNSET:
+                    start = time.perf_counter()
+                    try:
+                        self._value = self.opener(self.path)
+                    except Exception as exc:
+                        self.error = f"{type(exc).__name__}: {exc}"
+                        raise DatasetUnavailable(f"Population dataset {self.name} unavailable: {self.error}") from exc
+                    self.error = None
+                    self.load_ms = 1000.0 * (time.perf_counter() - start)
+                value = self._value
+        return value
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not _UNSET
+
+    def status(self) -> dict:
+        if self.loaded:
+            state = "loaded" if self._value is not None else "not_built"
+        else:
+            state = "error" if self.error else "not_loaded"
+        return {"path": self.path, "required": self.required, "state": state,
+                "load_ms": self.load_ms, "error": self.error}
+
+
+_gdal_configured = False
+
+
+def _open_raster(path: str):
+    global _gdal_configured
+    from services.raster_pool import RasterPool, configure_gdal_cache
+    if not _gdal_configured:
+        configure_gdal_cache(GDAL_CACHEMAX_MB)  # before the first dataset is opened
+        _gdal_configured = True
+    pool = RasterPool(path)
+    pool.get()  # open the calling thread's handle now, so a missing file fails here
+    return pool
+
+
+def _open_prefix_index(path: str):
+    from services.summed_area import PrefixSumIndex
+    return PrefixSumIndex.open_if_built(path)
+
+
+def _open_pyramid(path: str):
+    from services.population_pyramid import PopulationPyramid
+    return PopulationPyramid.open_if_built(path)
+
+
+def _open_risk_maps(path: str):
+    from services.risk_map import RiskMapStore
+    return RiskMapStore.open_if_built(path)
+
+
+def _open_coastal_index(path: str):
+    from services.coastal_index import CoastalIndex
+    return CoastalIndex.open_if_built(path)
+
+
+# --- per-thread raster handles (see services.raster_pool) ---
+raster_high = LazyDataset("raster_100m", RASTER_HIGHRES_PATH, _open_raster, required=True)
+raster_low = LazyDataset("raster_1km", RASTER_LOWRES_PATH, _open_raster, required=True)
+# --- row-prefix-sum tables, used instead of the rasters when built ---
+prefix_high = LazyDataset("prefix_100m", PREFIX_HIGHRES_DIR, _open_prefix_index)
+prefix_low = LazyDataset("prefix_1km", PREFIX_LOWRES_DIR, _open_prefix_index)
+# --- population pyramid, replaces the two-raster threshold when built ---
+pyramid = LazyDataset("pyramid", PYRAMID_DIR, _open_pyramid)
+# --- precomputed population-at-risk maps, one per radius ---
+risk_maps = LazyDataset("risk_maps", RISK_MAP_DIR, _open_risk_maps)
+# --- coastline cells and their population, for tsunami exposure ---
+coastal_index = LazyDataset("coastal_index", COASTAL_INDEX_DIR, _open_coastal_index)
+
+DATASETS = (raster_high, raster_low, prefix_high, prefix_low, pyramid, risk_maps, coastal_index)
+
+_warmup = {"state": "pending" if POPULATION_WARMUP else "disabled", "seconds": None}
+
+
+def _touch_raster(pool) -> None:
+    # Read the header, the overview list and one pixel, so the first query finds the
+    # directory structures and the decoder already in GDAL's and the OS's caches
+    src, proj_to_raster = pool.get()
+    _ = src.transform, src.crs, src.nodata
+    if hasattr(src, "overviews"):
+        src.overviews(1)
+    import rasterio
+    src.read(1, window=rasterio.windows.Window(src.width // 2, src.height // 2, 1, 1))
+    proj_to_raster(0.0, 0.0)
+
+
+def warm_up() -> dict:
+    ''' Open every dataset and pre-touch the rasters; errors are recorded, not raised.
+
+        Returns:
+            dict: Dataset name -> status
+    '''
+    _warmup["state"] = "running"
+    start = time.perf_counter()
+    for dataset in DATASETS:
+        try:
+            value = dataset.load()
+            if value is not None and dataset in (raster_high, raster_low):
+                _touch_raster(value)
+        except OSError as exc:
+            dataset.error = dataset.error or f"{type(exc).__name__}: {exc}"
+    _warmup["seconds"] = time.perf_counter() - start
+    _warmup["state"] = "done"
+    return {dataset.name: dataset.status() for dataset in DATASETS}
+
+
+def readiness() -> tuple[bool, dict]:
+    ''' Whether the service can take population traffic, and the state of each dataset.
+
+        Ready once warm-up has finished (or immediately if it is disabled) and no required
+        dataset failed to open.
+    '''
+    datasets = {dataset.name: dataset.status() for dataset in DATASETS}
+    failed = [name for name, status in datasets.items() if status["required"] and status["state"] == "error"]
+    ready = _warmup["state"] in ("done", "disabled") and not failed
+    return ready, {"ready": ready, "warmup": dict(_warmup), "datasets": datasets}
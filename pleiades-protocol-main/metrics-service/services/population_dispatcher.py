@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import math
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from services.worker_pool import WORKER_PROCESSES, get_process_pool, is_process_mode
+
+
+# --- CONFIG ---
+POPULATION_WORKERS = int(os.getenv("POPULATION_WORKERS", "8"))  # threads running population queries (thread mode)
+POPULATION_MAX_PENDING = int(os.getenv("POPULATION_MAX_PENDING", "64"))  # running + queued before 503
+
+
+class Overloaded(Exception):
+    ''' Raised when the dispatcher is full; retry_after_s is a hint for the Retry-After header. '''
+
+    def __init__(self, retry_after_s: int):
+        super().__init__(f"Population service overloaded, retry in {retry_after_s} s")
+        self.retry_after_s = retry_after_s
+
+
+def run_timed(fn: callable, args: tuple) -> tuple:
+    ''' Run fn(*args) and return (result, start, end) wall-clock times.
+
+        Module-level so it can be sent to a process pool; time.time() because the
+        monotonic clocks of different processes are not comparable everywhere.
+    '''
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+class PopulationDispatcher:
+    ''' Runs blocking population work off the event loop with admission control.
+
+        Work goes to a dedicated executor (a thread pool, or the worker process pool of
+        services.worker_pool) instead of Starlette's shared threadpool. At most max_pending
+        calls are running or queued; beyond that submit() raises Overloaded immediately
+        rather than letting requests pile up. Calls with the same key that arrive while one
+        is in flight share its result instead of being computed again.
+
+        submit() must be called from the event loop thread: the in-flight table and all
+        counters are only touched there (completion callbacks run on the loop too).
+    '''
+
+    def __init__(self, executor: Executor, workers: int, max_pending: int):
+        self.executor = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        self.pending = 0
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self._wait_s = 0.0
+        self._service_s = 0.0
+
+    async def submit(self, key: tuple, fn: callable, *args):
+        ''' Run fn(*args) on the executor, sharing the result with identical in-flight calls.
+
+            Args:
+                key (tuple): Identity of the call for coalescing (hashable)
+                fn (callable): Blocking function to run (module-level in process mode)
+                *args: Arguments of fn
+
+            Returns:
+                The result of fn(*args)
+
+            Raises:
+                Overloaded: If max_pending calls are already running or queued
+        '''
+        future = self._inflight.get(key)
+        if future is None:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise Overloaded(self.retry_after_s())
+
+            self.pending += 1
+            self.submitted += 1
+            queued_at = time.time()
+            loop = asyncio.get_running_loop()
+            if isinstance(self.executor, ProcessPoolExecutor):
+                timed = loop.run_in_executor(self.executor, run_timed, fn, args)
+            else:
+                # Run in a copy of the request context so telemetry spans reach the request
+                timed = loop.run_in_executor(self.executor, contextvars.copy_context().run, run_timed, fn, args)
+            future = loop.create_future()
+            timed.add_done_callback(lambda f: self._done(key, queued_at, f, future))
+            self._inflight[key] = future
+        else:
+            self.coalesced += 1
+        # shield: a client disconnecting must not cancel the result other callers wait on
+        return await asyncio.shield(future)
+
+    def _done(self, key: tuple, queued_at: float, timed: asyncio.Future, future: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        self.pending -= 1
+        if timed.cancelled():
+            future.cancel()
+            return
+        exc = timed.exception()
+        if exc is not None:
+            self.failed += 1
+            future.set_exception(exc)
+            return
+        result, started, ended = timed.result()
+        self.completed += 1
+        self._wait_s += max(started - queued_at, 0.0)
+        self._service_s += ended - started
+        future.set_result(result)
+
+    def retry_after_s(self) -> int:
+        ''' Seconds until the current backlog should have drained, from the mean service time. '''
+        mean_s = self._service_s / self.completed if self.completed else 1.0
+        return max(1, math.ceil(self.pending * mean_s / max(self.workers, 1)))
+
+    def stats(self) -> dict:
+        running = min(self.pending, self.workers)
+        return {
+            "executor": "process" if is_process_mode() else "thread",
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "running": running,
+            "queued": self.pending - running,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "mean_queue_wait_ms": 1000.0 * self._wait_s / self.completed if self.completed else 0.0,
+            "mean_service_ms": 1000.0 * self._service_s / self.completed if self.completed else 0.0,
+        }
+
+
+if is_process_mode():
+    population_dispatcher = PopulationDispatcher(get_process_pool(), WORKER_PROCESSES, POPULATION_MAX_PENDING)
+else:
+    population_dispatcher = PopulationDispatcher(
+        ThreadPoolExecutor(POPULATION_WORKERS, thread_name_prefix="population"),
+        POPULATION_WORKERS,
+        POPULATION_MAX_PENDING,
+    )
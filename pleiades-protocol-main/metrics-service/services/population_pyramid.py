@@ -0,0 +1,192 @@
+''' Multi-resolution population pyramid with per-query level selection.
+
+    Levels are built by summing LEVEL_RATIO x LEVEL_RATIO blocks of the level below, starting
+    from the 100 m raster (100 m -> 1 km -> 10 km -> 100 km), so every coarse pixel is the exact
+    population of the fine pixels it covers. A query starts at the finest level whose circle
+    window fits in half the pixel budget, sums the interior there, and refines only the pixels
+    cut by the circumference at successively finer levels while the budget allows.
+
+    Build offline with:
+
+        python -m services.population_pyramid data/GHS_POP_E2025_GLOBE_R2023A_54009_100_V1_0.tif data/pyramid
+'''
+import argparse
+import json
+import os
+
+import numpy as np
+import rasterio
+
+from services.circle_coverage import circle_coverage, get_circle_window, span_sum
+from services.raster_pool import RasterPool, read_population
+
+LEVEL_RATIO = 10           # resolution ratio between consecutive levels
+LEVEL_COUNT = 4            # 100 m, 1 km, 10 km, 100 km
+BAND_ROWS = 8              # coarse rows merged into one read when refining the edge
+BUILD_BLOCK_PIXELS = 1 << 24  # source pixels per block while building
+INDEX_FILE = "pyramid.json"
+
+
+def build_pyramid(base_path: str, out_dir: str, levels: int = LEVEL_COUNT,
+                  ratio: int = LEVEL_RATIO) -> dict:
+    ''' Build the coarse levels of the pyramid from the base raster.
+
+        Args:
+            base_path (str): Finest population raster (level 0, used in place)
+            out_dir (str): Output directory for the aggregated levels
+            levels (int): Total number of levels, including the base
+            ratio (int): Aggregation factor between consecutive levels
+
+        Returns:
+            dict: The index written to out_dir/pyramid.json
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    paths = [os.path.abspath(base_path)]
+    with rasterio.open(base_path) as base:
+        base_res = base.res[0]
+
+    for level in range(1, levels):
+        res = base_res * ratio ** level
+        path = os.path.join(out_dir, f"level_{int(res)}m.tif")
+        _aggregate(paths[-1], path, ratio)
+        paths.append(os.path.abspath(path))
+
+    index = {"ratio": ratio, "levels": paths}
+    with open(os.path.join(out_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f)
+    return index
+
+
+def _aggregate(src_path: str, dst_path: str, ratio: int) -> None:
+    ''' Write src summed over ratio x ratio blocks (nodata counted as 0), block of rows at a time. '''
+    with rasterio.open(src_path) as src:
+        width, height = -(-src.width // ratio), -(-src.height // ratio)
+        profile = {
+            "driver": "GTiff", "width": width, "height": height, "count": 1, "dtype": "float64",
+            "crs": src.crs, "transform": src.transform * rasterio.Affine.scale(ratio),
+            "tiled": True, "blockxsize": 256, "blockysize": 256, "compress": "deflate",
+        }
+        rows_per_block = max(1, BUILD_BLOCK_PIXELS // (width * ratio * ratio))
+        with rasterio.open(dst_path, "w", **profile) as dst:
+            for row in range(0, height, rows_per_block):
+                nrows = min(rows_per_block, height - row)
+                window = rasterio.windows.Window(0, row * ratio, width * ratio, nrows * ratio)
+                data = src.read(1, window=window, boundless=True, fill_value=0).astype("float64")
+                if src.nodata is not None:
+                    data[data == src.nodata] = 0
+                block = data.reshape(nrows, ratio, width, ratio).sum(axis=(1, 3))
+                dst.write(block, 1, window=rasterio.windows.Window(0, row, width, nrows))
+
+
+class PopulationPyramid:
+    ''' Query side of the pyramid: one RasterPool per level. '''
+
+    def __init__(self, out_dir: str):
+        with open(os.path.join(out_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.ratio = index["ratio"]
+        self.pools = [RasterPool(path) for path in index["levels"]]
+
+    @classmethod
+    def open_if_built(cls, out_dir: str) -> "PopulationPyramid | None":
+        ''' Open the pyramid in out_dir, or return None if it has not been built. '''
+        if not os.path.exists(os.path.join(out_dir, INDEX_FILE)):
+            return None
+        return cls(out_dir)
+
+    def select_level(self, radius_m: float, pixel_budget: int) -> int:
+        ''' Finest level whose circle window fits in half the budget (the rest refines the edge). '''
+        base_res = self.pools[0].get()[0].res[0]
+        for level in range(len(self.pools)):
+            side = 2.0 * radius_m / (base_res * self.ratio ** level) + 1
+            if side * side <= pixel_budget / 2:
+                return level
+        return len(self.pools) - 1
+
+    def circle_sum(self, lon: float, lat: float, radius_m: float, pixel_budget: int) -> tuple[float, int]:
+        ''' Population inside a circle, reading at most ~pixel_budget pixels.
+
+            Args:
+                lon (float): Longitude of circle center in WGS84
+                lat (float): Latitude of circle center in WGS84
+                radius_m (float): Radius of circle in meters
+                pixel_budget (int): Target number of pixels read across all levels
+
+            Returns:
+                tuple[float, int]: Population within the circle and pixels actually read
+        '''
+        level = self.select_level(radius_m, pixel_budget)
+        src, proj_to_raster = self.pools[level].get()
+        x, y = proj_to_raster(lon, lat)
+        window = get_circle_window(src, x, y, radius_m)
+        if window is None:
+            return 0.0, 0
+
+        total, used = 0.0, 0
+        regions = [(window, None)]
+        while True:
+            src = self.pools[level].get()[0]
+            edge_rows, edge_cols, edge_frac, edge_vals = [], [], [], []
+            for window, member in regions:
+                data = read_population(src, window)
+                used += data.size
+                cov = circle_coverage(x, y, radius_m, src.window_transform(window), data.shape)
+                keep = slice(None)
+                if member is None:
+                    total += span_sum(data, cov.rows, cov.full_lo, cov.full_hi)
+                else:
+                    full = cov.to_mask() == 1.0
+                    total += float(data[full & member].sum(dtype="float64"))
+                    keep = member[cov.edge_rows, cov.edge_cols] & (cov.edge_frac < 1.0)
+                edge_rows.append(cov.edge_rows[keep] + window.row_off)
+                edge_cols.append(cov.edge_cols[keep] + window.col_off)
+                edge_frac.append(cov.edge_frac[keep])
+                edge_vals.append(data[cov.edge_rows[keep], cov.edge_cols[keep]])
+            rows, cols = np.concatenate(edge_rows), np.concatenate(edge_cols)
+            frac, vals = np.concatenate(edge_frac), np.concatenate(edge_vals)
+
+            # Refine the edge at the next finer level while it fits in the budget
+            if level > 0 and len(rows) > 0 and used + len(rows) * self.ratio ** 2 <= pixel_budget:
+                fine = self.pools[level - 1].get()[0]
+                fine_regions = _edge_regions(rows, cols, self.ratio, fine.height, fine.width)
+                if used + sum(w.width * w.height for w, _ in fine_regions) <= pixel_budget:
+                    level, regions = level - 1, fine_regions
+                    continue
+            total += float(np.dot(vals.astype("float64"), frac))
+            return total, used
+
+
+def _edge_regions(rows: np.ndarray, cols: np.ndarray, ratio: int,
+                  height: int, width: int) -> list[tuple[rasterio.windows.Window, np.ndarray]]:
+    ''' Group coarse edge cells into fine-level windows, one per contiguous arc within
+        each band of BAND_ROWS coarse rows, with a mask of the fine pixels to refine.
+    '''
+    band = rows // BAND_ROWS
+    order = np.lexsort((cols, band))
+    rows, cols, band = rows[order], cols[order], band[order]
+    # A new region starts at every band change or column gap along the arc
+    split = np.nonzero((np.diff(band) != 0) | (np.diff(cols) > 1))[0] + 1
+
+    regions = []
+    for r, c in zip(np.split(rows, split), np.split(cols, split)):
+        r0, c0 = int(r.min()), int(c.min())
+        cells = np.zeros((int(r.max()) - r0 + 1, int(c.max()) - c0 + 1), dtype=bool)
+        cells[r - r0, c - c0] = True
+        member = np.repeat(np.repeat(cells, ratio, axis=0), ratio, axis=1)
+        row_off, col_off = r0 * ratio, c0 * ratio
+        h = min(member.shape[0], height - row_off)
+        w = min(member.shape[1], width - col_off)
+        if h > 0 and w > 0:
+            regions.append((rasterio.windows.Window(col_off, row_off, w, h), member[:h, :w]))
+    return regions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the population pyramid from the 100 m raster")
+    parser.add_argument("base", help="finest population GeoTIFF")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--levels", type=int, default=LEVEL_COUNT)
+    parser.add_argument("--ratio", type=int, default=LEVEL_RATIO)
+    args = parser.parse_args()
+    built = build_pyramid(args.base, args.out_dir, args.levels, args.ratio)
+    print("\n".join(built["levels"]))
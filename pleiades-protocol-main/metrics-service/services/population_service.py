@@ -1,36 +1,58 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import rasterio
 import numpy as np
-import shapely.geometry as geometry
-from shapely.ops import transform as shapely_transform
-import pyproj
-from rasterio.features import rasterize
+
+from services.circle_coverage import circle_coverage, get_circle_window
+from services.corridor import DiskKernel, corridor_chunks, read_padded, sweep_sums
+from services.impact_metrics_vec import ImpactMetricsVec
+from services.population_cache import PopulationCache, SqliteCacheBackend, quantize_circle
+from services.population_datasets import prefix_high, prefix_low, pyramid, raster_high, raster_low
+from services.raster_pool import read_population
+from services.summed_area import PrefixSumIndex
+from services.telemetry import pixel_bucket, span
+from services.vulnerability import OVERPRESSURE_FATALITY, THERMAL_FATALITY, VulnerabilityCurve
 
 
 # --- CONFIG ---
-RASTER_HIGHRES_PATH = "data/GHS_POP_E2025_GLOBE_R2023A_54009_100_V1_0.tif" # 100 m
-RASTER_LOWRES_PATH = "data/GHS_POP_E2025_GLOBE_R2023A_54009_1000_V1_0.tif"  # 1 km
-SUPERRES = 4  # Supersampling factor for edges, the greater the more precise but slower
-THRESHOLD_SUPERRES = 1200000  #threshold to disable superres (1,200 km)
+# Dataset paths are configured in services.population_datasets
 THRESHOLD_RADIUS_M = 100000  #threshold to switch between resolutions (100 km)
+PYRAMID_PIXEL_BUDGET = int(os.getenv("PYRAMID_PIXEL_BUDGET", "2000000"))  # max pixels read per query
+POPULATION_CACHE_SIZE = int(os.getenv("POPULATION_CACHE_SIZE", "10000"))  # cached results per worker, 0 disables
+POPULATION_CACHE_TTL_S = float(os.getenv("POPULATION_CACHE_TTL_S", "3600"))
+POPULATION_CACHE_PATH = os.getenv("POPULATION_CACHE_PATH", "")  # SQLite file shared by workers, empty = per worker only
+POPULATION_CACHE_QUANTUM_PX = float(os.getenv("POPULATION_CACHE_QUANTUM_PX", "1"))  # key grid, in raster pixels
+CASUALTY_BLOCK_ROWS = int(os.getenv("CASUALTY_BLOCK_ROWS", "256"))  # raster rows reduced per task
+CASUALTY_THREADS = int(os.getenv("CASUALTY_THREADS", "4"))  # threads reducing row blocks, 1 = inline
+CORRIDOR_CHUNK_PIXELS = int(os.getenv("CORRIDOR_CHUNK_PIXELS", "16000000"))  # max pixels of one corridor window read
+
+# --- result cache keyed on quantized circles ---
+population_cache = PopulationCache(
+    POPULATION_CACHE_SIZE,
+    POPULATION_CACHE_TTL_S,
+    SqliteCacheBackend(POPULATION_CACHE_PATH, POPULATION_CACHE_TTL_S) if POPULATION_CACHE_PATH else None,
+)
+
+
+def cache_stats() -> dict:
+    ''' Statistics of this process's result cache (module-level, to run in worker processes). '''
+    return population_cache.stats()
+
+
+# --- row-block reducers of the expected-casualty integral (NumPy releases the GIL) ---
+casualty_executor = ThreadPoolExecutor(CASUALTY_THREADS, thread_name_prefix="casualty") if CASUALTY_THREADS > 1 else None
 
-# --- load rasters in memory ---
-try:
-    src_high = rasterio.open(RASTER_HIGHRES_PATH)
-    src_low = rasterio.open(RASTER_LOWRES_PATH)
-    proj_to_raster_high = pyproj.Transformer.from_crs("EPSG:4326", src_high.crs, always_xy=True).transform
-    proj_to_raster_low = pyproj.Transformer.from_crs("EPSG:4326", src_low.crs, always_xy=True).transform    
-except IOError: 
-    src_high = None 
-    src_low = None 
-    proj_to_raster_high = None 
-    proj_to_raster_low = None 
-    
 
 
 
 def estimate_population(lon: float, lat: float, radius_m: float) -> int:
     ''' Estimate population within a circle defined by (lon, lat) center and radius in meters. 
-        Uses supersampling to improve edge accuracy.
+        Edge pixels are weighted by the exact fraction of their area inside the circle.
+        If the prefix-sum tables of the selected resolution are built, the interior is
+        summed with O(rows) table lookups instead of reading the raster window.
+        Otherwise, if the population pyramid is built, the level is chosen per query so
+        that at most PYRAMID_PIXEL_BUDGET pixels are read.
     
         Returns a population estimate.
         
@@ -43,81 +65,351 @@ def estimate_population(lon: float, lat: float, radius_m: float) -> int:
             int: Estimated population within the circle
     '''
 
+    index = select_prefix_index(radius_m)
+    if index is not None:
+        with span("population.prefix_sum", level=f"{index.transform.a:g}m"):
+            return int(round(index.circle_sum(lon, lat, radius_m)))
+    levels = pyramid.load()
+    if levels is not None:
+        with span("population.pyramid_sum"):
+            return int(round(levels.circle_sum(lon, lat, radius_m, PYRAMID_PIXEL_BUDGET)[0]))
+
     # Select raster and projection based on radius
     src, proj_to_raster = select_raster_and_transform(radius_m)
-    nodata = src.nodata
+    level = f"{src.res[0]:g}m"
 
-    # Get circle in raster CRS
-    circle = get_proyected_circle(lon, lat, radius_m, proj_to_raster)
+    with span("population.project", level=level):
+        # Get circle center in raster CRS
+        x, y = proj_to_raster(lon, lat)
+        window = get_circle_window(src, x, y, radius_m)
+    if window is None:
+        return 0
+    with span("population.read", level=level) as s:
+        data = read_population(src, window)
+        s.label(pixels=pixel_bucket(data.size))
+    with span("population.mask", level=level, pixels=pixel_bucket(data.size)):
+        coverage = circle_coverage(x, y, radius_m, src.window_transform(window), data.shape)
+    with span("population.sum", level=level, pixels=pixel_bucket(data.size)):
+        return int(round(coverage.weighted_sum(data)))
 
-    # Circle bounds in raster indices
-    minx, miny, maxx, maxy = circle.bounds
-    row_min, col_min = src.index(minx, maxy)
-    row_max, col_max = src.index(maxx, miny)
 
-    # Limits adjustment
-    row_min, col_min = max(0, row_min), max(0, col_min)
-    row_max, col_max = min(src.height - 1, row_max), min(src.width - 1, col_max)
+def estimate_population_cached(lon: float, lat: float, radius_m: float, use_cache: bool = True) -> int:
+    ''' estimate_population behind the result cache.
 
-    nrows, ncols = row_max - row_min + 1, col_max - col_min + 1
-    if nrows <= 0 or ncols <= 0:
-        return 0
+        The cache key snaps the center to a grid of POPULATION_CACHE_QUANTUM_PX pixels of the
+        raster the radius selects, and the radius to 0.1% steps; the estimate itself is always
+        computed for the requested circle. Requests falling under the same key get the
+        estimate of the first one, which differs from theirs by at most the population of a
+        half-pixel shift and a 0.1% radius change.
 
-    window = rasterio.windows.Window(col_min, row_min, ncols, nrows)
-    data = src.read(1, window=window, boundless=True)
-    window_transform = src.window_transform(window)
-
-    # Rasterize the circle to the window grid
-    # Supersampling: create a finer grid, rasterize, and reduce
-    if SUPERRES > 1 and radius_m < THRESHOLD_SUPERRES:
-        highres_shape = (nrows * SUPERRES, ncols * SUPERRES)
-        mask_hr = rasterize(
-            [(geometry.mapping(circle), 1)],
-            out_shape=highres_shape,
-            transform=window_transform * rasterio.Affine.scale(1 / SUPERRES),
-            fill=0,
-            dtype="float32",
-        )
-        # Reduce: average SUPERRES×SUPERRES blocks to get fraction [0..1]
-        mask = mask_hr.reshape(nrows, SUPERRES, ncols, SUPERRES).mean(axis=(1, 3))
-    else:
-        mask = rasterize(
-            [(geometry.mapping(circle), 1)],
-            out_shape=(nrows, ncols),
-            transform=window_transform,
-            fill=0,
-            dtype="float32",
-        )
-
-    # Multiply raster values by mask (covered fraction)
-    valid = (nodata is None) or (data != nodata)
-    pop_est = int(np.sum(data[valid] * mask[valid]).round())
+        Args:
+            lon (float): Longitude of circle center in WGS84
+            lat (float): Latitude of circle center in WGS84
+            radius_m (float): Radius of circle in meters
+            use_cache (bool): False to bypass the cache and get the exact estimate
 
+        Returns:
+            int: Estimated population within the circle
+    '''
+    if not use_cache or not population_cache.enabled:
+        return estimate_population(lon, lat, radius_m)
+
+    quantum_m = get_resolution_m(radius_m) * POPULATION_CACHE_QUANTUM_PX
+    key = (quantum_m,) + quantize_circle(lon, lat, radius_m, quantum_m)
+    cached = population_cache.get(key)
+    if cached is not None:
+        return int(cached)
+
+    pop_est = estimate_population(lon, lat, radius_m)
+    population_cache.set(key, pop_est)
     return pop_est
 
 
-def select_raster_and_transform(radius_m: float) -> tuple[rasterio.io.DatasetReader, callable]:
-    if radius_m > THRESHOLD_RADIUS_M:
-        return src_low, proj_to_raster_low
-    else:
-        return src_high, proj_to_raster_high
-    
+def estimate_population_many(points: list[tuple[float, float]], radii: list[float]) -> list[int]:
+    ''' Estimate population for many circles at once, one circle per (point, radius) pair.
+
+        As in estimate_population, a circle whose resolution has prefix-sum tables built is
+        summed from the tables, and otherwise from the pyramid if it is built. The remaining
+        circles are grouped by the raster their radius selects, all centers of a group are
+        projected in one call, and circles whose windows overlap (e.g. the damage rings of one
+        impact point) share a single window read.
 
-def get_proyected_circle(lon: float, lat: float, radius_m: float,
-                         proj_to_raster: callable) -> geometry.Polygon:
-    ''' Get a shapely circle in the raster CRS from lon, lat and radius in meters.
-    
         Args:
-            lon (float): Longitude of circle center in WGS84
-            lat (float): Latitude of circle center in WGS84
-            radius_m (float): Radius of circle in meters
-            proj_to_raster (callable): Function to project from WGS84 to raster CRS
+            points (list[tuple[float, float]]): (lon, lat) circle centers in WGS84
+            radii (list[float]): Radius of each circle in meters
 
         Returns:
-            shapely.geometry.Circle: The projected circle in the raster CRS
+            list[int]: Estimated population within each circle, in input order
     '''
-    # Proyected point to CRS raster
-    pt = geometry.Point(lon, lat)
-    pt_proj = shapely_transform(proj_to_raster, pt)
-    circle = pt_proj.buffer(radius_m)
-    return circle
+    if len(points) != len(radii):
+        raise ValueError("points and radii must have the same length")
+
+    results = [0] * len(points)
+    levels = pyramid.load()
+
+    # Circles answered from the prefix-sum tables or the pyramid; the others grouped by raster
+    indexed, pyramid_idx, groups = {}, [], {}
+    for i, radius_m in enumerate(radii):
+        index = select_prefix_index(radius_m)
+        if index is not None:
+            indexed.setdefault(index, []).append(i)
+        elif levels is not None:
+            pyramid_idx.append(i)
+        else:
+            src, proj_to_raster = select_raster_and_transform(radius_m)
+            groups.setdefault(src, (proj_to_raster, []))[1].append(i)
+
+    for index, idx in indexed.items():
+        with span("population.prefix_sum", level=f"{index.transform.a:g}m"):
+            for i in idx:
+                results[i] = int(round(index.circle_sum(points[i][0], points[i][1], radii[i])))
+    if pyramid_idx:
+        with span("population.pyramid_sum"):
+            for i in pyramid_idx:
+                results[i] = int(round(levels.circle_sum(points[i][0], points[i][1], radii[i], PYRAMID_PIXEL_BUDGET)[0]))
+
+    for src, (proj_to_raster, idx) in groups.items():
+        # Project every center of the group at once
+        lons = np.array([points[i][0] for i in idx], dtype="float64")
+        lats = np.array([points[i][1] for i in idx], dtype="float64")
+        xs, ys = proj_to_raster(lons, lats)
+
+        centers, windows = {}, {}
+        for i, x, y in zip(idx, np.atleast_1d(xs), np.atleast_1d(ys)):
+            centers[i] = (float(x), float(y))
+            window = get_circle_window(src, x, y, radii[i])
+            if window is not None:
+                windows[i] = window
+
+        # One read per cluster of overlapping windows
+        for cluster in _cluster_windows(windows):
+            merged = rasterio.windows.union(*[windows[i] for i in cluster])
+            data = read_population(src, merged)
+            for i in cluster:
+                window = windows[i]
+                r0, c0 = window.row_off - merged.row_off, window.col_off - merged.col_off
+                sub = data[r0:r0 + window.height, c0:c0 + window.width]
+                coverage = circle_coverage(*centers[i], radii[i], src.window_transform(window), sub.shape)
+                results[i] = int(round(coverage.weighted_sum(sub)))
+
+    return results
+
+
+def estimate_population_rings(lon: float, lat: float, radii: list[float]) -> list[float]:
+    ''' Population within several concentric circles (e.g. the damage radii of one impact).
+
+        The window of the largest circle is read once, from the raster its radius selects,
+        and every smaller circle is weighted on a sub-slice of that same array, so the whole
+        set costs one read. With prefix-sum tables or the pyramid built, each circle is a
+        table / pyramid lookup instead.
+        Populations are returned unrounded so that annulus bands can be taken as differences.
+
+        Args:
+            lon (float): Longitude of the common center in WGS84
+            lat (float): Latitude of the common center in WGS84
+            radii (list[float]): Radius of each circle in meters
+
+        Returns:
+            list[float]: Population within each circle, in input order
+    '''
+    if not radii:
+        return []
+    largest = max(radii)
+
+    index = select_prefix_index(largest)
+    if index is not None:
+        return [index.circle_sum(lon, lat, r) if r > 0 else 0.0 for r in radii]
+    levels = pyramid.load()
+    if levels is not None:
+        return [levels.circle_sum(lon, lat, r, PYRAMID_PIXEL_BUDGET)[0] if r > 0 else 0.0 for r in radii]
+
+    src, proj_to_raster = select_raster_and_transform(largest)
+    x, y = proj_to_raster(lon, lat)
+    outer = get_circle_window(src, x, y, largest)
+    if outer is None:
+        return [0.0] * len(radii)
+    data = read_population(src, outer)
+
+    results = []
+    for radius_m in radii:
+        window = get_circle_window(src, x, y, radius_m) if radius_m > 0 else None
+        if window is None:
+            results.append(0.0)
+            continue
+        r0, c0 = window.row_off - outer.row_off, window.col_off - outer.col_off
+        sub = data[r0:r0 + window.height, c0:c0 + window.width]
+        coverage = circle_coverage(x, y, radius_m, src.window_transform(window), sub.shape)
+        results.append(coverage.weighted_sum(sub))
+    return results
+
+
+def estimate_population_corridor(lons: list[float], lats: list[float], radius_m: float) -> list[float]:
+    ''' Population within radius_m of each point of a corridor (consecutive points close together).
+
+        With the prefix-sum tables of the selected resolution built, every circle is a table
+        lookup; otherwise, with the population pyramid built, a pyramid lookup reading at
+        most PYRAMID_PIXEL_BUDGET pixels. Without either, the corridor is read in windows of
+        at most CORRIDOR_CHUNK_PIXELS from the raster the radius selects, and the circles are
+        swept along it, each sum updated from the previous one (see services.corridor). Swept circles are centred on
+        the pixel containing their point.
+        Populations are returned unrounded.
+
+        Args:
+            lons (list[float]): Longitudes of the points in WGS84, in corridor order
+            lats (list[float]): Latitudes of the points in WGS84
+            radius_m (float): Radius of every circle in meters
+
+        Returns:
+            list[float]: Population within each circle, in input order
+    '''
+    if len(lons) != len(lats):
+        raise ValueError("lons and lats must have the same length")
+    if not lons:
+        return []
+
+    index = select_prefix_index(radius_m)
+    if index is not None:
+        with span("population.prefix_sum", level=f"{index.transform.a:g}m"):
+            return [index.circle_sum(lon, lat, radius_m) for lon, lat in zip(lons, lats)]
+
+    levels = pyramid.load()
+    if levels is not None:
+        with span("population.pyramid_sum"):
+            return [levels.circle_sum(lon, lat, radius_m, PYRAMID_PIXEL_BUDGET)[0] for lon, lat in zip(lons, lats)]
+
+    src, proj_to_raster = select_raster_and_transform(radius_m)
+    level = f"{src.res[0]:g}m"
+    kernel = DiskKernel(radius_m, src.res[0])
+    r = kernel.r_px
+    with span("population.project", level=level):
+        xs, ys = proj_to_raster(np.asarray(lons, dtype="float64"), np.asarray(lats, dtype="float64"))
+        t = src.transform
+        cols = np.floor((np.atleast_1d(xs) - t.c) / t.a).astype("int64")
+        rows = np.floor((np.atleast_1d(ys) - t.f) / t.e).astype("int64")
+
+    results = np.zeros(len(lons))
+    for start, stop in corridor_chunks(rows, cols, r, CORRIDOR_CHUNK_PIXELS):
+        row0, col0 = int(rows[start:stop].min()) - r, int(cols[start:stop].min()) - r
+        height = int(rows[start:stop].max()) + r + 1 - row0
+        width = int(cols[start:stop].max()) + r + 1 - col0
+        with span("population.read", level=level) as s:
+            data = read_padded(src, row0, col0, height, width)
+            s.label(pixels=pixel_bucket(data.size))
+        with span("population.corridor_sweep", level=level):
+            results[start:stop] = sweep_sums(data, rows[start:stop] - row0, cols[start:stop] - col0, kernel)
+    return results.tolist()
+
+
+def estimate_expected_casualties(lon: float, lat: float, radius_m: float, energy: float,
+                                 burst_altitude_m: float = 0.0,
+                                 overpressure_curve: VulnerabilityCurve = OVERPRESSURE_FATALITY,
+                                 thermal_curve: VulnerabilityCurve = THERMAL_FATALITY) -> dict:
+    ''' Expected casualties of an impact: sum over the pixels of a circle of
+        population x P(overpressure, fluence).
+
+        Every pixel is evaluated at its distance from the impact point (in the raster CRS,
+        like the population circles), and the two hazards are combined as independent
+        causes: P = 1 - (1 - P_overpressure) * (1 - P_thermal). Edge pixels are weighted by
+        their coverage as in estimate_population. The window is reduced in blocks of
+        CASUALTY_BLOCK_ROWS rows, in parallel on casualty_executor, so only one block per
+        thread is in memory at a time.
+
+        Args:
+            lon (float): Longitude of the impact point in WGS84
+            lat (float): Latitude of the impact point in WGS84
+            radius_m (float): Radius of the integration circle in meters
+            energy (float): Impact energy (J)
+            burst_altitude_m (float): Burst altitude (0 for a ground impact)
+            overpressure_curve (VulnerabilityCurve): P(overpressure in kPa)
+            thermal_curve (VulnerabilityCurve): P(fluence in J/m^2)
+
+        Returns:
+            dict: Population in the circle and expected casualties, combined and per hazard
+    '''
+    src, proj_to_raster = select_raster_and_transform(radius_m)
+    x, y = proj_to_raster(lon, lat)
+    window = get_circle_window(src, x, y, radius_m)
+
+    blocks = []
+    if window is not None:
+        row_end = window.row_off + window.height
+        blocks = [
+            rasterio.windows.Window(window.col_off, row, window.width, min(CASUALTY_BLOCK_ROWS, row_end - row))
+            for row in range(window.row_off, row_end, CASUALTY_BLOCK_ROWS)
+        ]
+
+    def reduce_block(block: rasterio.windows.Window) -> np.ndarray:
+        src = select_raster_and_transform(radius_m)[0]  # the calling thread's handle
+        transform = src.window_transform(block)
+        data = read_population(src, block)
+        pop = data * circle_coverage(x, y, radius_m, transform, data.shape).to_mask()
+
+        xs = transform.c + (np.arange(block.width) + 0.5) * transform.a
+        ys = transform.f + (np.arange(block.height) + 0.5) * transform.e
+        r = np.hypot(xs[None, :] - x, ys[:, None] - y)
+        p_over = overpressure_curve(ImpactMetricsVec.overpressure_collins_airburst(energy, burst_altitude_m, r) / 1000.0)
+        p_thermal = thermal_curve(ImpactMetricsVec.corrected_exposure(energy, r))
+        p_any = 1.0 - (1.0 - p_over) * (1.0 - p_thermal)
+        return np.array([pop.sum(dtype="float64"), np.vdot(pop, p_any), np.vdot(pop, p_over), np.vdot(pop, p_thermal)])
+
+    mapper = casualty_executor.map if casualty_executor is not None and len(blocks) > 1 else map
+    totals = np.sum(list(mapper(reduce_block, blocks)), axis=0) if blocks else np.zeros(4)
+
+    return {
+        "population": int(round(totals[0])),
+        "expected_casualties": float(totals[1]),
+        "expected_casualties_overpressure": float(totals[2]),
+        "expected_casualties_thermal": float(totals[3]),
+        "pixels": int(window.width * window.height) if window is not None else 0,
+    }
+
+
+def _cluster_windows(windows: dict[int, rasterio.windows.Window]) -> list[list[int]]:
+    ''' Group window keys into clusters of transitively intersecting windows. '''
+    keys = sorted(windows, key=lambda k: windows[k].col_off)
+    parent = {k: k for k in keys}
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    # Sweep by column offset: only windows that start before the current one ends can overlap
+    for n, a in enumerate(keys):
+        wa = windows[a]
+        for b in keys[n + 1:]:
+            wb = windows[b]
+            if wb.col_off >= wa.col_off + wa.width:
+                break
+            if wb.row_off < wa.row_off + wa.height and wa.row_off < wb.row_off + wb.height:
+                parent[find(b)] = find(a)
+
+    clusters = {}
+    for k in keys:
+        clusters.setdefault(find(k), []).append(k)
+    return list(clusters.values())
+
+
+def select_raster_and_transform(radius_m: float) -> tuple[rasterio.io.DatasetReader, callable]:
+    ''' Get the calling thread's dataset and projection for the resolution suited to radius_m. '''
+    if radius_m > THRESHOLD_RADIUS_M:
+        return raster_low.load().get()
+    else:
+        return raster_high.load().get()
+
+
+def select_prefix_index(radius_m: float) -> PrefixSumIndex | None:
+    ''' Get the prefix-sum tables for the resolution suited to radius_m, if they are built. '''
+    if radius_m > THRESHOLD_RADIUS_M:
+        return prefix_low.load()
+    else:
+        return prefix_high.load()
+
+
+def get_resolution_m(radius_m: float) -> float:
+    ''' Pixel size (m) of the population grid used for a circle of radius_m. '''
+    index = select_prefix_index(radius_m)
+    if index is not None:
+        return index.transform.a
+    return select_raster_and_transform(radius_m)[0].res[0]
@@ -0,0 +1,229 @@
+"""
+Tablas precalculadas para perfiles radiales (sobrepresión y fluencia térmica).
+
+Sobrepresión: overpressure_collins_airburst sólo depende de las variables escaladas
+r1 = r / E_kt^(1/3) y h1 = h / E_kt^(1/3), así que una tabla en (h1, r1) sirve para
+cualquier energía. Se guardan por separado el tramo cercano (2D, en log h1 x log r1),
+y el tramo lejano (1D, sólo depende de r1); la curva es discontinua en la transición a
+Mach rm1(h1), así que rm1 se calcula exacto en cada consulta y no se interpola a través
+del salto.
+
+Térmico: corrected_exposure = eta*E/(2*pi*r^2) * horizon_fraction(r, Rf). La parte 1/r^2
+es exacta; se tabula sólo la fracción de horizonte en (log E, log s), con
+s = r / sqrt(2*R_EARTH*Rf), eje en el que el corte por horizonte cae casi en el mismo
+sitio para todas las energías. Cerca del corte f ~ (1 - s^2)^(3/2), así que se tabula
+f^(2/3), que es casi lineal ahí.
+
+Fuera de las mallas se evalúa la fórmula exacta (ImpactMetricsVec).
+
+Las tablas se construyen al primer uso (o con el CLI) y se guardan en PROFILE_TABLES_PATH.
+El error máximo frente a la evaluación exacta se mide al construirlas y se guarda con ellas:
+
+    python -m services.radial_profiles data/profile_tables.npz
+"""
+import argparse
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from services.impact_metrics import J_PER_KT, R_EARTH
+from services.impact_metrics_vec import ImpactMetricsVec
+
+# =======================
+# Configuración
+# =======================
+PROFILE_TABLES_PATH = os.getenv("PROFILE_TABLES_PATH", "data/profile_tables.npz")
+PROFILE_MAX_POINTS = int(os.getenv("PROFILE_MAX_POINTS", "4096"))
+
+# Mallas (log10). r1, h1 en m/kt^(1/3); E en J; s adimensional
+LOG_R1 = (-3.0, 6.0, 200)    # min, max, puntos por década
+LOG_H1 = (-2.0, 4.0, 100)
+LOG_E = (9.0, 25.0, 20)
+LOG_S = (-4.0, 0.5, 200)
+P_FLOOR = 1e-30              # Pa; evita log(0) en el tramo cercano
+
+
+def _axis(spec) -> np.ndarray:
+    lo, hi, per_decade = spec
+    return np.linspace(lo, hi, int(round((hi - lo) * per_decade)) + 1)
+
+
+def _mach_radius_scaled(h1: np.ndarray) -> np.ndarray:
+    # Mismas constantes que overpressure_collins_airburst
+    denom = 550.0 - h1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denom <= 0, 1e12, 550.0 * (h1 ** 1.2) / (1.2 * np.where(denom <= 0, 1.0, denom)))
+
+
+def _near_scaled(h1: np.ndarray, r1: np.ndarray) -> np.ndarray:
+    p0 = 3.14e11 * (h1 ** -2.6)
+    beta = 34.87 * (h1 ** -1.73)
+    return p0 * np.exp(-beta * r1)
+
+
+def _far_scaled(r1: np.ndarray) -> np.ndarray:
+    PX, RX = 75_000.0, 290.0
+    return PX * (RX / (4.0 * r1)) * (1.0 + 3.0 * ((r1 / RX) ** 1.3))
+
+
+def _interp_rows(table: np.ndarray, axis: np.ndarray, x: float) -> np.ndarray:
+    """ Interpola linealmente una fila de `table` en la posición x del eje (con saturación). """
+    t = np.clip((x - axis[0]) / (axis[1] - axis[0]), 0.0, len(axis) - 1.0)
+    i = min(int(t), len(axis) - 2)
+    w = t - i
+    return (1.0 - w) * table[i] + w * table[i + 1]
+
+
+class ProfileTables:
+    """
+    Tablas de perfiles radiales. profile() devuelve curvas completas interpolando en las
+    tablas: una interpolación de fila por escenario y un np.interp por curva.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.log_r1 = arrays["log_r1"]
+        self.log_h1 = arrays["log_h1"]
+        self.log_e = arrays["log_e"]
+        self.log_s = arrays["log_s"]
+        self.near = arrays["near"]           # log10 p cercano, (h1, r1)
+        self.far = arrays["far"]             # log10 p lejano, (r1,)
+        self.horizon = arrays["horizon"]     # fracción de horizonte ^ (2/3), (E, s)
+        self.max_rel_error = {
+            "overpressure": float(arrays["err_overpressure"]),
+            "thermal": float(arrays["err_thermal"]),
+        }
+
+    @classmethod
+    def build(cls) -> "ProfileTables":
+        log_r1, log_h1 = _axis(LOG_R1), _axis(LOG_H1)
+        log_e, log_s = _axis(LOG_E), _axis(LOG_S)
+        r1, h1 = 10.0 ** log_r1, 10.0 ** log_h1
+
+        with np.errstate(over="ignore", under="ignore"):
+            near = np.log10(np.maximum(_near_scaled(h1[:, None], r1[None, :]), P_FLOOR))
+        far = np.log10(_far_scaled(r1))
+
+        E = 10.0 ** log_e[:, None]
+        Rf = ImpactMetricsVec.fireball_radius(E)
+        r = 10.0 ** log_s[None, :] * np.sqrt(2.0 * R_EARTH * Rf)
+        horizon = ImpactMetricsVec.horizon_fraction(r, Rf) ** (2.0 / 3.0)
+
+        tables = cls({
+            "log_r1": log_r1, "log_h1": log_h1, "log_e": log_e, "log_s": log_s,
+            "near": near.astype("float32"), "far": far.astype("float32"),
+            "horizon": horizon.astype("float32"),
+            "err_overpressure": np.inf, "err_thermal": np.inf,
+        })
+        tables.max_rel_error = tables.measure_error()
+        return tables
+
+    @classmethod
+    def load(cls, path: str) -> "ProfileTables":
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, log_r1=self.log_r1, log_h1=self.log_h1, log_e=self.log_e, log_s=self.log_s,
+                 near=self.near, far=self.far, horizon=self.horizon,
+                 err_overpressure=self.max_rel_error["overpressure"],
+                 err_thermal=self.max_rel_error["thermal"])
+
+    # ---- Consulta ----
+    def overpressure(self, E_joules: float, burst_altitude_m: float, r_m: np.ndarray) -> np.ndarray:
+        """ Sobrepresión (Pa) en los radios r_m, equivalente a overpressure_collins_airburst. """
+        E_kt = E_joules / J_PER_KT
+        scale = E_kt ** (1.0 / 3.0) if E_kt > 0 else 1.0
+        h1 = burst_altitude_m / scale if burst_altitude_m > 0 else 1e-6
+        x = np.log10(np.asarray(r_m, dtype="float64") / scale)
+
+        lh = np.log10(h1)
+        near = np.interp(x, self.log_r1, _interp_rows(self.near, self.log_h1, lh))
+        far = np.interp(x, self.log_r1, self.far)
+        # El salto en rm1 se resuelve con rm1 exacto, no interpolado
+        rm1 = _mach_radius_scaled(np.float64(h1))
+        p = np.where(x <= np.log10(rm1), 10.0 ** near, 10.0 ** far)
+
+        outside = (x < self.log_r1[0]) | (x > self.log_r1[-1])
+        if not self.log_h1[0] <= lh <= self.log_h1[-1]:
+            outside[...] = True
+        if outside.any():
+            p[outside] = ImpactMetricsVec.overpressure_collins_airburst(
+                E_joules, burst_altitude_m, np.asarray(r_m, dtype="float64")[outside])
+        return p
+
+    def thermal_exposure(self, E_joules: float, r_m: np.ndarray, eta: float = 3e-3) -> np.ndarray:
+        """ Fluencia (J/m^2) en los radios r_m, equivalente a corrected_exposure. """
+        r = np.asarray(r_m, dtype="float64")
+        Rf = float(ImpactMetricsVec.fireball_radius(E_joules))
+        s = np.log10(r / np.sqrt(2.0 * R_EARTH * Rf))
+        log_e = np.log10(E_joules)
+        if not self.log_e[0] <= log_e <= self.log_e[-1]:
+            return ImpactMetricsVec.corrected_exposure(E_joules, r, eta)
+        row = _interp_rows(self.horizon, self.log_e, log_e)
+        f = np.interp(s, self.log_s, row, left=row[0], right=0.0) ** 1.5
+        # Exposición a ras de suelo (Atmosphere() por defecto), exacta: eta*E/(2*pi*r^2)
+        return f * eta * E_joules / (2.0 * np.pi * r ** 2)
+
+    def profile(self, E_joules: float, burst_altitude_m: float, r_m: np.ndarray) -> Dict[str, np.ndarray]:
+        return {
+            "overpressure_kpa": self.overpressure(E_joules, burst_altitude_m, r_m) / 1000.0,
+            "thermal_fluence_Jm2": self.thermal_exposure(E_joules, r_m),
+        }
+
+    def measure_error(self, n: int = 400, seed: int = 0) -> Dict[str, float]:
+        """
+        Error relativo máximo frente a ImpactMetricsVec sobre escenarios aleatorios dentro
+        de las mallas. Para la sobrepresión se excluyen presiones < 1 Pa (ruido de la cola
+        del tramo cercano); para el térmico, puntos con fracción de horizonte < 1e-3.
+        """
+        rng = np.random.default_rng(seed)
+        r = np.geomspace(10.0, 1e6, 300)
+        err_p, err_t = 0.0, 0.0
+        for _ in range(n):
+            E = 10.0 ** rng.uniform(LOG_E[0] + 1, LOG_E[1] - 1)
+            h = rng.choice([0.0, 10.0 ** rng.uniform(1, 5)])
+            exact = ImpactMetricsVec.overpressure_collins_airburst(E, h, r)
+            ok = exact >= 1.0
+            if ok.any():
+                err_p = max(err_p, float(np.max(np.abs(self.overpressure(E, h, r)[ok] / exact[ok] - 1.0))))
+            exact = ImpactMetricsVec.corrected_exposure(E, r)
+            Rf = ImpactMetricsVec.fireball_radius(E)
+            ok = ImpactMetricsVec.horizon_fraction(r, Rf) >= 1e-3
+            if ok.any():
+                err_t = max(err_t, float(np.max(np.abs(self.thermal_exposure(E, r)[ok] / exact[ok] - 1.0))))
+        return {"overpressure": err_p, "thermal": err_t}
+
+
+_tables: Optional[ProfileTables] = None
+_tables_lock = threading.Lock()
+
+
+def get_profile_tables() -> ProfileTables:
+    """
+    Tablas compartidas: se cargan de PROFILE_TABLES_PATH o, si no existen, se construyen
+    al primer uso y se guardan ahí para los siguientes procesos.
+    """
+    global _tables
+    with _tables_lock:
+        if _tables is None:
+            if os.path.exists(PROFILE_TABLES_PATH):
+                _tables = ProfileTables.load(PROFILE_TABLES_PATH)
+            else:
+                _tables = ProfileTables.build()
+                try:
+                    _tables.save(PROFILE_TABLES_PATH)
+                except OSError:
+                    pass  # sin disco escribible: se reconstruyen en cada proceso
+        return _tables
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the radial profile lookup tables")
+    parser.add_argument("out", nargs="?", default=PROFILE_TABLES_PATH, help="output .npz file")
+    args = parser.parse_args()
+    tables = ProfileTables.build()
+    tables.save(args.out)
+    print(f"tables written to {args.out}; max relative error: {tables.max_rel_error}")
@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+import pyproj
+import rasterio
+from rasterio.env import set_gdal_config
+
+from services.tile_store import TileStoreReader, is_tile_store
+
+
+def configure_gdal_cache(cachemax_mb: int) -> None:
+    ''' Set the size of the GDAL block cache (shared by every open dataset in the process).
+
+        Must be called before the first raster read to take effect.
+
+        Args:
+            cachemax_mb (int): Cache size in megabytes
+    '''
+    set_gdal_config("GDAL_CACHEMAX", int(cachemax_mb))  # values below 100000 are read as MB
+
+
+def make_projection(crs) -> callable:
+    ''' Build a callable projecting (lon, lat) in WGS84 to the given CRS. '''
+    return pyproj.Transformer.from_crs("EPSG:4326", crs, always_xy=True).transform
+
+
+def open_population_source(path: str):
+    ''' Open a population grid: a memory-mapped tile store directory or any GDAL raster. '''
+    if is_tile_store(path):
+        return TileStoreReader(path)
+    return rasterio.open(path)
+
+
+class RasterPool:
+    ''' Hands out one rasterio dataset and one WGS84 -> raster CRS transformer per thread.
+
+        Neither a GDAL dataset handle nor a pyproj Transformer is safe to share between
+        threads, so every worker thread lazily opens its own pair on first use and keeps
+        it for the lifetime of the thread. Blocks decoded by one handle are still shared
+        with the others through the process-wide GDAL block cache. If path is a tile store
+        (see services.tile_store) the handles are memory maps of the same file instead.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+
+    def get(self) -> tuple[rasterio.io.DatasetReader, callable]:
+        ''' Get the (dataset, projection) pair owned by the calling thread.
+
+            Returns:
+                tuple: Open dataset and a callable projecting (lon, lat) to the raster CRS
+        '''
+        handle = getattr(self._local, "handle", None)
+        if handle is None or handle[0].closed:
+            src = open_population_source(self.path)
+            proj_to_raster = make_projection(src.crs)
+            handle = (src, proj_to_raster)
+            self._local.handle = handle
+            with self._lock:
+                self._opened.append(src)
+        return handle
+
+    @property
+    def open_handles(self) -> int:
+        ''' Number of datasets currently open across all threads. '''
+        with self._lock:
+            self._opened = [src for src in self._opened if not src.closed]
+            return len(self._opened)
+
+    def close_all(self) -> None:
+        ''' Close every dataset opened by this pool; threads reopen on next use. '''
+        with self._lock:
+            for src in self._opened:
+                src.close()
+            self._opened = []
+
+
+def read_population(src: rasterio.io.DatasetReader, window: rasterio.windows.Window) -> np.ndarray:
+    ''' Read a window (already clipped to the raster extent) of population counts
+        with nodata pixels set to 0.
+    '''
+    data = src.read(1, window=window)
+    if src.nodata is not None:
+        data[data == src.nodata] = 0
+    return data
@@ -0,0 +1,254 @@
+''' Population-at-risk maps: the population within radius_m of every pixel of a raster.
+
+    A map is the population raster convolved with a disk kernel, so one build answers the
+    circle query for every possible impact point at once. The kernel holds the exact
+    covered fraction of each pixel (circle_coverage, as estimate_population), so a map
+    pixel equals estimate_population centred on that pixel. The convolution runs by tiles
+    with FFTs (overlap-save): each tile of the output reads its window of the raster plus
+    a halo of the kernel radius, and the cost is O(N log N) in the raster size whatever
+    the radius.
+
+    The radius comes from an impactor: the overpressure isobar of an airburst
+    (ImpactMetricsVec.radius_for_overpressure_airburst) or the fireball radius, or is given
+    directly.
+    Alongside each map a JSON sidecar lists its hotspots: the most populated impact points,
+    at least one radius apart.
+
+    Build offline (from the 1 km raster by default) with:
+
+        python -m services.risk_map data/risk_maps --radius-m 50000
+        python -m services.risk_map data/risk_maps --energy 4e16 --burst-altitude-m 8000 --threshold-kpa 20
+'''
+import argparse
+import glob
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pyproj
+import rasterio
+
+from services.circle_coverage import circle_coverage
+from services.impact_metrics import ImpactMetrics
+from services.impact_metrics_vec import ImpactMetricsVec
+from services.raster_pool import RasterPool
+
+RISK_TILE_SIZE = 2048      # output pixels per tile edge; the FFT adds 2 kernel radii
+RISK_HOTSPOTS = 100        # hotspots kept per map
+INDEX_SUFFIX = ".json"
+
+
+def risk_radius_m(energy: float, burst_altitude_m: float = 0.0, threshold_kpa: float | None = None) -> float:
+    ''' Damage radius of an impactor used as the kernel radius.
+
+        Args:
+            energy (float): Impact energy (J)
+            burst_altitude_m (float): Burst altitude; 0 for a ground impact
+            threshold_kpa (float | None): Overpressure threshold for an airburst
+
+        Returns:
+            float: The overpressure isobar of an airburst, otherwise the fireball radius (m)
+    '''
+    if burst_altitude_m > 0 and threshold_kpa is not None:
+        # The vectorized inversion: the scalar bisection can miss the crossing and return R_max
+        radius = float(ImpactMetricsVec.radius_for_overpressure_airburst(energy, burst_altitude_m, threshold_kpa))
+        if not math.isnan(radius):
+            return radius
+    return float(ImpactMetrics.fireball_radius(energy))
+
+
+def disk_kernel(radius_m: float, res_m: float) -> np.ndarray:
+    ''' Covered fraction of every pixel by a circle centred on the central pixel. '''
+    r_px = int(math.ceil(radius_m / res_m))
+    size = 2 * r_px + 1
+    half = (r_px + 0.5) * res_m
+    transform = rasterio.Affine(res_m, 0.0, -half, 0.0, -res_m, half)
+    return circle_coverage(0.0, 0.0, radius_m, transform, (size, size)).to_mask().astype("float64")
+
+
+def _fft_size(n: int) -> int:
+    # Smallest 2^a 3^b 5^c >= n: pocketfft is fastest on these sizes
+    best = 1 << max(0, (n - 1).bit_length())
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            p = p35
+            while p < n:
+                p *= 2
+            best = min(best, p)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def build_risk_map(raster_path: str, out_dir: str, radius_m: float, tile_size: int = RISK_TILE_SIZE,
+                   hotspots: int = RISK_HOTSPOTS) -> dict:
+    ''' Convolve a population raster with a disk and write the population-at-risk map.
+
+        Args:
+            raster_path (str): Population GeoTIFF (the 1 km raster keeps global maps small)
+            out_dir (str): Output directory; writes risk_<radius>m.tif and its .json sidecar
+            radius_m (float): Disk radius in raster CRS units (meters)
+            tile_size (int): Output pixels per tile edge
+            hotspots (int): Number of hotspots to keep
+
+        Returns:
+            dict: The sidecar written next to the map
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    name = f"risk_{int(round(radius_m))}m"
+    tif_path = os.path.join(out_dir, name + ".tif")
+    start = time.perf_counter()
+
+    with rasterio.open(raster_path) as src:
+        res = src.res[0]
+        kernel = disk_kernel(radius_m, res)
+        r_px = kernel.shape[0] // 2
+        fft_shape = (_fft_size(tile_size + 2 * r_px), _fft_size(tile_size + 2 * r_px))
+        # Kernel at the origin of the FFT grid; the wrap-around of the circular convolution
+        # then only touches the first 2 * r_px rows / columns, which are the halo
+        kernel_fft = np.fft.rfft2(kernel, fft_shape)
+        block = max(1, r_px)  # hotspot candidates: the maximum of every block x block cell
+        candidates = []
+
+        profile = {
+            "driver": "GTiff", "width": src.width, "height": src.height, "count": 1, "dtype": "float32",
+            "crs": src.crs, "transform": src.transform, "nodata": None,
+            "tiled": True, "blockxsize": 256, "blockysize": 256, "compress": "deflate", "predictor": 3,
+        }
+        with rasterio.open(tif_path, "w", **profile) as dst:
+            for row in range(0, src.height, tile_size):
+                for col in range(0, src.width, tile_size):
+                    h, w = min(tile_size, src.height - row), min(tile_size, src.width - col)
+                    window = rasterio.windows.Window(col - r_px, row - r_px, w + 2 * r_px, h + 2 * r_px)
+                    data = src.read(1, window=window, boundless=True, fill_value=0).astype("float64")
+                    if src.nodata is not None:
+                        data[data == src.nodata] = 0
+                    if not data.any():
+                        dst.write(np.zeros((h, w), dtype="float32"), 1, window=rasterio.windows.Window(col, row, w, h))
+                        continue
+                    full = np.fft.irfft2(np.fft.rfft2(data, fft_shape) * kernel_fft, fft_shape)
+                    risk = np.maximum(full[2 * r_px:2 * r_px + h, 2 * r_px:2 * r_px + w], 0.0)
+                    dst.write(risk.astype("float32"), 1, window=rasterio.windows.Window(col, row, w, h))
+                    candidates.extend(_block_maxima(risk, row, col, block, hotspots))
+        dst_transform = src.transform
+        proj_from_raster = pyproj.Transformer.from_crs(src.crs, "EPSG:4326", always_xy=True).transform
+
+    index = {
+        "radius_m": float(radius_m),
+        "map": os.path.abspath(tif_path),
+        "source": os.path.abspath(raster_path),
+        "resolution_m": res,
+        "kernel_pixels": int(kernel.shape[0]),
+        "build_seconds": time.perf_counter() - start,
+        "hotspots": _select_hotspots(candidates, radius_m, res, dst_transform, proj_from_raster, hotspots),
+    }
+    with open(os.path.join(out_dir, name + INDEX_SUFFIX), "w") as f:
+        json.dump(index, f, indent=1)
+    return index
+
+
+def _block_maxima(risk: np.ndarray, row_off: int, col_off: int, block: int, keep: int) -> list[tuple]:
+    ''' (value, row, col) of the largest block maxima of a tile, at most keep of them. '''
+    h, w = risk.shape
+    nr, nc = -(-h // block), -(-w // block)
+    padded = np.zeros((nr * block, nc * block))
+    padded[:h, :w] = risk
+    cells = padded.reshape(nr, block, nc, block).transpose(0, 2, 1, 3).reshape(nr, nc, block * block)
+    arg = cells.argmax(axis=2)
+    values = np.take_along_axis(cells, arg[..., None], axis=2)[..., 0]
+    best = np.argsort(values, axis=None)[::-1][:keep]
+    out = []
+    for flat in best:
+        i, j = divmod(int(flat), nc)
+        if values[i, j] <= 0:
+            break
+        di, dj = divmod(int(arg[i, j]), block)
+        out.append((float(values[i, j]), row_off + i * block + di, col_off + j * block + dj))
+    return out
+
+
+def _select_hotspots(candidates: list[tuple], radius_m: float, res: float, transform: rasterio.Affine,
+                     proj_from_raster: callable, keep: int) -> list[dict]:
+    ''' Greedy non-maximum suppression: best candidates first, none within radius_m of another. '''
+    selected = []
+    min_px2 = (radius_m / res) ** 2
+    for value, row, col in sorted(candidates, reverse=True):
+        if any((row - r) ** 2 + (col - c) ** 2 < min_px2 for _, r, c in selected):
+            continue
+        selected.append((value, row, col))
+        if len(selected) == keep:
+            break
+    hotspots = []
+    for value, row, col in selected:
+        x, y = transform * (col + 0.5, row + 0.5)
+        lon, lat = proj_from_raster(x, y)
+        hotspots.append({"lon": lon, "lat": lat, "population": value})
+    return hotspots
+
+
+class RiskMap:
+    ''' Query side of one population-at-risk map. '''
+
+    def __init__(self, index_path: str):
+        with open(index_path) as f:
+            self.index = json.load(f)
+        self.radius_m = self.index["radius_m"]
+        self.pool = RasterPool(self.index["map"])
+
+    def value_at(self, lon: float, lat: float) -> float | None:
+        ''' Population within radius_m of the pixel containing (lon, lat), None outside the map. '''
+        src, proj_to_raster = self.pool.get()
+        row, col = src.index(*proj_to_raster(lon, lat))
+        if not (0 <= row < src.height and 0 <= col < src.width):
+            return None
+        return float(src.read(1, window=rasterio.windows.Window(col, row, 1, 1))[0, 0])
+
+
+class RiskMapStore:
+    ''' Every risk map built in a directory, by radius. '''
+
+    def __init__(self, out_dir: str):
+        self.maps = {}
+        for path in sorted(glob.glob(os.path.join(out_dir, "risk_*m" + INDEX_SUFFIX))):
+            risk_map = RiskMap(path)
+            self.maps[risk_map.radius_m] = risk_map
+
+    @classmethod
+    def open_if_built(cls, out_dir: str) -> "RiskMapStore | None":
+        ''' Open the maps in out_dir, or return None if none has been built. '''
+        if not glob.glob(os.path.join(out_dir, "risk_*m" + INDEX_SUFFIX)):
+            return None
+        return cls(out_dir)
+
+    def get(self, radius_m: float, tolerance_m: float = 1.0) -> RiskMap | None:
+        ''' The map built for radius_m (within tolerance_m), or None. '''
+        best = min(self.maps, key=lambda r: abs(r - radius_m), default=None)
+        if best is None or abs(best - radius_m) > tolerance_m:
+            return None
+        return self.maps[best]
+
+
+if __name__ == "__main__":
+    from services.population_datasets import RASTER_LOWRES_PATH
+
+    parser = argparse.ArgumentParser(description="Build a population-at-risk map by FFT disk convolution")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--raster", default=RASTER_LOWRES_PATH, help="population GeoTIFF (default: 1 km raster)")
+    parser.add_argument("--radius-m", type=float, help="disk radius; or give the impactor below")
+    parser.add_argument("--energy", type=float, help="impact energy (J)")
+    parser.add_argument("--burst-altitude-m", type=float, default=0.0)
+    parser.add_argument("--threshold-kpa", type=float, help="overpressure isobar of an airburst")
+    parser.add_argument("--tile-size", type=int, default=RISK_TILE_SIZE)
+    parser.add_argument("--hotspots", type=int, default=RISK_HOTSPOTS)
+    args = parser.parse_args()
+    if args.radius_m is None and args.energy is None:
+        parser.error("give --radius-m or --energy")
+    radius = args.radius_m or risk_radius_m(args.energy, args.burst_altitude_m, args.threshold_kpa)
+    built = build_risk_map(args.raster, args.out_dir, radius, args.tile_size, args.hotspots)
+    print(f"{built['map']}: radius {radius:.0f} m, {built['build_seconds']:.1f} s")
+    for spot in built["hotspots"][:10]:
+        print(f"  {spot['lon']:9.4f} {spot['lat']:8.4f} {spot['population']:14.0f}")
@@ -0,0 +1,274 @@
+''' Content negotiation for the JSON endpoints: orjson, MessagePack or Arrow IPC, compressed.
+
+    The population and impacts routers depend on negotiate(), which keeps the request's
+    Accept and Accept-Encoding headers for the response, and answer with NegotiatedResponse,
+    which renders its content in the first format the client accepts:
+
+        application/json                      orjson (stdlib json when orjson is missing)
+        application/msgpack                   MessagePack (needs msgpack)
+        application/vnd.apache.arrow.stream   Arrow IPC stream of the payload's table (needs pyarrow)
+
+    and compresses bodies of RESPONSE_COMPRESS_MIN_BYTES or more with zstd (needs zstandard)
+    or gzip, as Accept-Encoding allows. When no accepted format can hold the response (or the
+    client accepts none of these), it is JSON, as before negotiation existed: Accept is taken
+    as a preference, never turned into a 406 after the work is done.
+
+    Bulk endpoints skip pydantic and return NegotiatedResponse over NumPy arrays. Arrays and
+    Table columns stay columnar in MessagePack and Arrow; in JSON a Table is written as the
+    list of records the response models document, so JSON clients see the same payloads.
+'''
+import gzip
+import io
+import json
+import os
+from contextvars import ContextVar
+
+import numpy as np
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack output is optional
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow IPC output is optional
+    pa = None
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+# --- CONFIG ---
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))  # 0 compresses everything
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "1") == "1"  # honour Accept-Encoding
+# Bodies are compressed per request: the fastest levels, which already shrink bulk JSON two- to
+# four-fold (the default levels take several times longer for 10-20% less)
+GZIP_LEVEL = 1
+ZSTD_LEVEL = 1
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+# Other names clients use for the same formats
+ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK,
+           "application/vnd.apache.arrow.file": ARROW}
+
+
+# (Accept, Accept-Encoding) of the current request; set by negotiate()
+_request_accept: ContextVar[tuple[str | None, str | None]] = ContextVar("request_accept", default=(None, None))
+
+
+class Table:
+    ''' Named columns of equal length: records in JSON, columns in MessagePack and Arrow. '''
+
+    def __init__(self, **columns):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+
+    def records(self) -> list[dict]:
+        names = list(self.columns)
+        return [dict(zip(names, row)) for row in zip(*(c.tolist() for c in self.columns.values()))]
+
+
+def available_media_types() -> list[str]:
+    ''' The formats this server can write, in its order of preference. '''
+    return [JSON] + ([MSGPACK] if msgpack is not None else []) + ([ARROW] if pa is not None else [])
+
+
+# OpenAPI content of the negotiated responses, for the routers' responses=
+NEGOTIATED_RESPONSES = {200: {"content": {m: {} for m in available_media_types() if m != JSON}}}
+
+
+def _parse_quality(header: str) -> list[tuple[str, float]]:
+    ''' Lower-cased (token, q) of an Accept-style header by decreasing q, header order among equals; q=0 dropped. '''
+    items = []
+    for i, part in enumerate(header.split(",")):
+        token, *params = (p.strip() for p in part.split(";"))
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if token and q > 0:
+            items.append((-q, i, token.lower()))
+    return [(token, -q) for q, _, token in sorted(items)]
+
+
+def acceptable_media_types(accept: str | None) -> list[str]:
+    ''' Available formats the client accepts, best first; JSON when it sent no Accept. '''
+    available = available_media_types()
+    if not accept:
+        return [JSON]
+    out = []
+    for token, _ in _parse_quality(accept):
+        if token in ("*/*", "application/*"):
+            matches = available
+        else:
+            token = ALIASES.get(token, token)
+            matches = [token] if token in available else []
+        out.extend(m for m in matches if m not in out)
+    return out
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    ''' zstd or gzip, whichever the client gives the higher q (zstd on a tie or "*"), or None. '''
+    if not accept_encoding or not RESPONSE_COMPRESSION:
+        return None
+    offered = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    quality = {}
+    for token, q in _parse_quality(accept_encoding):
+        for encoding in (offered if token == "*" else [token] if token in offered else []):
+            quality.setdefault(encoding, q)
+    return max(offered, key=lambda e: quality.get(e, 0.0)) if quality else None
+
+
+def compress(body: bytes, encoding: str | None) -> tuple[bytes, str | None]:
+    ''' Compress body with encoding if it is at least RESPONSE_COMPRESS_MIN_BYTES long. '''
+    if encoding is None or len(body) < RESPONSE_COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body), encoding
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), encoding
+
+
+# --- Encoders ---
+def _json_default(obj):
+    if isinstance(obj, Table):
+        if orjson is not None:
+            return obj.records()
+        names = list(obj.columns)
+        return [dict(zip(names, row)) for row in zip(*(_json_default(c) for c in obj.columns.values()))]
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == "f":
+            # null for NaN / inf, as orjson and pydantic write them
+            return np.where(np.isfinite(obj), obj, None).tolist()
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_json_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, Table):
+        return {name: column.tolist() for name, column in obj.columns.items()}
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+
+def encode_msgpack(content) -> bytes:
+    return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+
+
+def _is_column(value) -> bool:
+    if isinstance(value, np.ndarray):
+        return value.ndim == 1
+    return isinstance(value, list) and all(isinstance(v, (int, float)) or v is None for v in value)
+
+
+def _is_records(value) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(v, dict) for v in value)
+
+
+def arrow_table(content) -> tuple[dict | list, dict] | None:
+    ''' Split content into its table and the remaining fields, or None if it holds no table.
+
+        The table is a Table or a list of records (the only one in content), otherwise the
+        equal-length arrays at the top level of content.
+
+        Returns:
+            tuple | None: Columns (dict) or records (list), and the other fields
+    '''
+    if isinstance(content, Table):
+        return content.columns, {}
+    if not isinstance(content, dict):
+        return (content, {}) if _is_records(content) else None
+    tables = [k for k, v in content.items() if isinstance(v, Table) or _is_records(v)]
+    if len(tables) == 1:
+        key = tables[0]
+        table = content[key]
+        rest = {k: v for k, v in content.items() if k != key}
+        return (table.columns if isinstance(table, Table) else table), rest
+    if tables:
+        return None
+    columns = {k: v for k, v in content.items() if _is_column(v)}
+    if not columns or len({len(v) for v in columns.values()}) != 1:
+        return None
+    return columns, {k: v for k, v in content.items() if k not in columns}
+
+
+def encode_arrow(content) -> bytes | None:
+    ''' Arrow IPC stream of the table of content, the other fields as JSON in the schema
+        metadata; None if content holds no table. '''
+    split = arrow_table(content)
+    if split is None:
+        return None
+    table, rest = split
+    if isinstance(table, dict):
+        batch = pa.RecordBatch.from_pydict({k: np.asarray(v) if isinstance(v, np.ndarray) else v
+                                            for k, v in table.items()})
+    else:
+        batch = pa.RecordBatch.from_pylist(table)
+    if rest:
+        batch = batch.replace_schema_metadata({k: encode_json(v) for k, v in rest.items()})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
+
+
+ENCODERS = {JSON: encode_json, MSGPACK: encode_msgpack, ARROW: encode_arrow}
+
+
+def encode(content, media_types: list[str]) -> tuple[bytes, str]:
+    ''' Encode content in the first of media_types that can hold it, JSON if none can. '''
+    for media_type in media_types:
+        body = ENCODERS[media_type](content)
+        if body is not None:
+            return body, media_type
+    return encode_json(content), JSON
+
+
+async def negotiate(request: Request):
+    ''' Router dependency: keep the request's Accept headers for NegotiatedResponse.
+
+        Async so that it runs in the request's own context, which the response is built in.
+    '''
+    _request_accept.set((request.headers.get("accept"), request.headers.get("accept-encoding")))
+
+
+class NegotiatedResponse(Response):
+    ''' Response rendered in the format and compression negotiated for the current request.
+
+        Takes the same content as JSONResponse, plus NumPy arrays and Table columns.
+    '''
+    media_type = JSON
+
+    def __init__(self, content, status_code: int = 200, headers: dict | None = None,
+                 media_type: str | None = None, background=None):
+        accept, accept_encoding = _request_accept.get()
+        body, chosen = encode(content, [media_type] if media_type else acceptable_media_types(accept))
+        body, encoding = compress(body, choose_encoding(accept_encoding))
+        headers = dict(headers or {})
+        headers["Vary"] = "Accept, Accept-Encoding"
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        super().__init__(body, status_code, headers, chosen, background)
@@ -0,0 +1,191 @@
+''' Row-prefix-sum ("summed-area") tables for constant-time span sums over a population raster.
+
+    The raster is cut into TILE_SIZE x TILE_SIZE tiles. Each non-empty tile is stored as a
+    float64 .npy of shape (rows, cols + 1) where entry [r, c] is the sum of the first c pixels
+    of row r within the tile, so the sum of any row span is two lookups per tile it crosses.
+    Tiles that contain no population are not written at all.
+
+    Build offline with:
+
+        python -m services.summed_area data/GHS_POP_E2025_GLOBE_R2023A_54009_1000_V1_0.tif data/prefix_1000
+'''
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+import rasterio
+
+from services.circle_coverage import circle_coverage, get_circle_window
+from services.raster_pool import make_projection
+
+TILE_SIZE = 1024
+INDEX_FILE = "index.json"
+
+
+def build_prefix_tables(raster_path: str, out_dir: str, tile_size: int = TILE_SIZE) -> dict:
+    ''' Build the row-prefix tables of a single-band population raster.
+
+        Args:
+            raster_path (str): Source GeoTIFF
+            out_dir (str): Output directory (created if missing)
+            tile_size (int): Tile edge in pixels
+
+        Returns:
+            dict: The index written to out_dir/index.json
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    tiles = []
+    with rasterio.open(raster_path) as src:
+        nodata = src.nodata
+        for row_off in range(0, src.height, tile_size):
+            for col_off in range(0, src.width, tile_size):
+                window = rasterio.windows.Window(col_off, row_off,
+                                                 min(tile_size, src.width - col_off),
+                                                 min(tile_size, src.height - row_off))
+                data = src.read(1, window=window).astype("float64")
+                if nodata is not None:
+                    data[data == nodata] = 0
+                if not np.any(data):
+                    continue
+                prefix = np.zeros((data.shape[0], data.shape[1] + 1), dtype="float64")
+                np.cumsum(data, axis=1, out=prefix[:, 1:])
+                ti, tj = row_off // tile_size, col_off // tile_size
+                np.save(os.path.join(out_dir, _tile_name(ti, tj)), prefix)
+                tiles.append([ti, tj])
+
+        index = {
+            "source": os.path.basename(raster_path),
+            "crs": src.crs.to_wkt(),
+            "transform": list(src.transform)[:6],
+            "width": src.width,
+            "height": src.height,
+            "tile_size": tile_size,
+            "tiles": tiles,
+        }
+    with open(os.path.join(out_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f)
+    return index
+
+
+class PrefixSumIndex:
+    ''' Read side of the row-prefix tables: memory-mapped tiles plus the raster georeferencing.
+
+        Exposes index(), window_transform(), height and width like a rasterio dataset so the
+        windowing helpers of population_service work unchanged.
+    '''
+
+    def __init__(self, out_dir: str):
+        with open(os.path.join(out_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.out_dir = out_dir
+        self.crs = index["crs"]
+        self.transform = rasterio.Affine(*index["transform"])
+        self.width = index["width"]
+        self.height = index["height"]
+        self.tile_size = index["tile_size"]
+        self.tiles_x = -(-self.width // self.tile_size)
+        self._present = {(ti, tj) for ti, tj in index["tiles"]}
+        self._tiles = {}
+        self._local = threading.local()
+
+    @classmethod
+    def open_if_built(cls, out_dir: str) -> "PrefixSumIndex | None":
+        ''' Open the tables in out_dir, or return None if they have not been built. '''
+        if not os.path.exists(os.path.join(out_dir, INDEX_FILE)):
+            return None
+        return cls(out_dir)
+
+    @property
+    def proj_to_raster(self) -> callable:
+        ''' WGS84 -> raster CRS projection owned by the calling thread. '''
+        proj = getattr(self._local, "proj", None)
+        if proj is None:
+            proj = self._local.proj = make_projection(self.crs)
+        return proj
+
+    def index(self, x: float, y: float) -> tuple[int, int]:
+        return rasterio.transform.rowcol(self.transform, x, y)
+
+    def window_transform(self, window: rasterio.windows.Window) -> rasterio.Affine:
+        return rasterio.windows.transform(window, self.transform)
+
+    def circle_sum(self, lon: float, lat: float, radius_m: float) -> float:
+        ''' Population inside a circle: prefix-sum lookups for the full row spans,
+            individual pixels (recovered from the prefix table) for the edge.
+
+            Args:
+                lon (float): Longitude of circle center in WGS84
+                lat (float): Latitude of circle center in WGS84
+                radius_m (float): Radius of circle in meters
+
+            Returns:
+                float: Population within the circle
+        '''
+        x, y = self.proj_to_raster(lon, lat)
+        window = get_circle_window(self, x, y, radius_m)
+        if window is None:
+            return 0.0
+        cov = circle_coverage(x, y, radius_m, self.window_transform(window),
+                              (window.height, window.width))
+        rows = np.concatenate([cov.rows, cov.edge_rows]) + window.row_off
+        lo = np.concatenate([cov.full_lo, cov.edge_cols]) + window.col_off
+        hi = np.concatenate([cov.full_hi, cov.edge_cols + 1]) + window.col_off
+        weights = np.concatenate([np.ones(len(cov.rows)), cov.edge_frac])
+        return self.weighted_span_sum(rows, lo, hi, weights)
+
+    def weighted_span_sum(self, rows: np.ndarray, lo: np.ndarray, hi: np.ndarray,
+                          weights: np.ndarray) -> float:
+        ''' Sum of weights[i] * raster[rows[i], lo[i]:hi[i]] over all spans (raster indices). '''
+        T = self.tile_size
+        keep = hi > lo
+        rows, lo, hi, weights = rows[keep], lo[keep], hi[keep], weights[keep]
+
+        # Split every span at tile column boundaries
+        n_seg = (hi - 1) // T - lo // T + 1
+        seg_rows = np.repeat(rows, n_seg)
+        seg_w = np.repeat(weights, n_seg)
+        seg_tj = np.repeat(lo // T, n_seg) + np.arange(n_seg.sum()) - np.repeat(np.cumsum(n_seg) - n_seg, n_seg)
+        seg_lo = np.maximum(np.repeat(lo, n_seg), seg_tj * T) - seg_tj * T
+        seg_hi = np.minimum(np.repeat(hi, n_seg), (seg_tj + 1) * T) - seg_tj * T
+        seg_ti = seg_rows // T
+        seg_rl = seg_rows - seg_ti * T
+
+        # Two lookups per segment, grouped by tile
+        key = seg_ti * self.tiles_x + seg_tj
+        order = np.argsort(key, kind="stable")
+        uniq, starts = np.unique(key[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        total = 0.0
+        for k, s, e in zip(uniq, starts, ends):
+            tile = self._tile(int(k // self.tiles_x), int(k % self.tiles_x))
+            if tile is None:
+                continue
+            sel = order[s:e]
+            rl = seg_rl[sel]
+            total += float(np.dot(tile[rl, seg_hi[sel]] - tile[rl, seg_lo[sel]], seg_w[sel]))
+        return total
+
+    def _tile(self, ti: int, tj: int) -> np.ndarray | None:
+        if (ti, tj) not in self._present:
+            return None
+        tile = self._tiles.get((ti, tj))
+        if tile is None:
+            tile = np.load(os.path.join(self.out_dir, _tile_name(ti, tj)), mmap_mode="r")
+            self._tiles[(ti, tj)] = tile
+        return tile
+
+
+def _tile_name(ti: int, tj: int) -> str:
+    return f"{ti}_{tj}.npy"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build row-prefix-sum tables for a population raster")
+    parser.add_argument("raster", help="source GeoTIFF")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    args = parser.parse_args()
+    built = build_prefix_tables(args.raster, args.out_dir, args.tile_size)
+    print(f"{len(built['tiles'])} tiles written to {args.out_dir}")
@@ -0,0 +1,137 @@
+import io
+import json
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from services.impact_metrics_vec import ImpactMetricsVec
+from services.telemetry import span
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow IPC output is optional
+    pa = None
+
+# =======================
+# Configuración
+# =======================
+SWEEP_BATCH = int(os.getenv("SWEEP_BATCH", "10000"))            # escenarios evaluados por lote
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", "10000000"))
+SWEEP_FIRST_BATCH = 256  # el primer lote es pequeño para que el cliente reciba datos enseguida
+
+AXES = ("diameter_m", "velocity_mps", "density_kgm3", "porosity", "burst_altitude_m")
+
+
+@dataclass
+class SweepSpec:
+    """
+    Malla de escenarios: producto cartesiano de los valores de cada eje (en el orden de
+    AXES, el último eje varía más rápido). Los parámetros no barridos son fijos.
+
+    Como en ImpactMetrics.summarize, un airburst sin altura de explosión (eje de altura
+    todo a 0) se evalúa como impacto en suelo. Un eje que mezcla 0 con alturas positivas
+    no se admite: las columnas de la respuesta son las mismas para todos los puntos.
+    """
+    axes: Dict[str, np.ndarray]
+    shape_factor: float = 1.0
+    is_airburst: bool = True
+    target_density_kgm3: float = 2500.0
+    water_depth_m: Optional[float] = None
+
+    def __post_init__(self):
+        if self.is_airburst:
+            positive = np.asarray(self.axes["burst_altitude_m"]) > 0
+            if not positive.any():
+                self.is_airburst = False
+            elif not positive.all():
+                raise ValueError("burst_altitude_m values must all be positive for an airburst, "
+                                 "or all 0 for a ground impact")
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(len(self.axes[name]) for name in AXES)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+
+def iter_sweep_batches(spec: SweepSpec, batch_size: int = SWEEP_BATCH) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Evalúa la malla por lotes; cada lote es un dict de columnas (parámetros de entrada +
+    métricas de ImpactMetricsVec.summarize_batch). Los lotes empiezan en SWEEP_FIRST_BATCH
+    escenarios y crecen hasta batch_size. Sólo hay un lote en memoria a la vez.
+    """
+    if spec.size > SWEEP_MAX_POINTS:
+        raise ValueError(f"Sweep has {spec.size} points; the maximum is {SWEEP_MAX_POINTS}")
+
+    start, size = 0, min(SWEEP_FIRST_BATCH, batch_size)
+    while start < spec.size:
+        flat = np.arange(start, min(start + size, spec.size))
+        start, size = start + size, min(size * 4, batch_size)
+        idx = np.unravel_index(flat, spec.shape)
+        columns = {name: spec.axes[name][i] for name, i in zip(AXES, idx)}
+        # Se mide aquí y no en el router: los lotes se evalúan mientras se envía el cuerpo
+        with span("impact.sweep_batch"):
+            metrics = ImpactMetricsVec.summarize_batch(
+                columns["diameter_m"], columns["velocity_mps"], columns["density_kgm3"],
+                columns["porosity"], columns["burst_altitude_m"], spec.shape_factor, spec.is_airburst,
+                spec.target_density_kgm3, spec.water_depth_m)
+        columns.update(metrics)
+        yield columns
+
+
+def iter_ndjson(spec: SweepSpec, batch_size: int = SWEEP_BATCH) -> Iterator[bytes]:
+    """ Un objeto JSON por escenario y línea; NaN (umbral no alcanzado) se escribe como null. """
+    template = None
+    for columns in iter_sweep_batches(spec, batch_size):
+        if template is None:
+            # Las claves son las mismas en todos los lotes: una plantilla de línea y los
+            # valores formateados por columna evitan construir un dict por escenario
+            template = "{" + ", ".join(f"{json.dumps(k)}: %s" for k in columns) + "}"
+        formatted = [
+            [repr(v) if math.isfinite(v) else "null" for v in np.asarray(col, dtype="float64").tolist()]
+            for col in columns.values()
+        ]
+        yield ("\n".join(template % row for row in zip(*formatted)) + "\n").encode()
+
+
+def iter_arrow(spec: SweepSpec, batch_size: int = SWEEP_BATCH) -> Iterator[bytes]:
+    """ Stream Arrow IPC: el esquema con el primer lote y luego un record batch por lote. """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    sink = io.BytesIO()
+    writer = None
+    for columns in iter_sweep_batches(spec, batch_size):
+        batch = pa.RecordBatch.from_pydict({k: np.asarray(v, dtype="float64") for k, v in columns.items()})
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield _drain(sink)
+    if writer is not None:
+        writer.close()
+        yield _drain(sink)
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def axis_values(values: Optional[List[float]] = None, start: Optional[float] = None,
+                stop: Optional[float] = None, num: int = 1, log: bool = False) -> np.ndarray:
+    """ Valores de un eje: lista explícita o num puntos entre start y stop (lineal o logarítmico). """
+    if values is not None:
+        return np.asarray(values, dtype="float64")
+    if start is None or stop is None:
+        raise ValueError("An axis needs either values or start and stop")
+    if log:
+        if start <= 0 or stop <= 0:
+            raise ValueError("A log axis needs positive start and stop")
+        return np.geomspace(start, stop, num)
+    return np.linspace(start, stop, num)
@@ -0,0 +1,212 @@
+''' Per-stage latency histograms, Prometheus text exposition and Server-Timing headers.
+
+    Code marks stages with span():
+
+        with span("population.read", level="100m") as s:
+            data = read_population(src, window)
+            s.label(pixels=pixel_bucket(data.size))
+
+    A span is recorded into the stage histogram when METRICS_ENABLED, and into the calling
+    request's Server-Timing header when the client sent "X-Server-Timing: 1" (and
+    SERVER_TIMING_ENABLED). When neither applies span() returns a shared no-op object, so
+    instrumented code pays one context-variable lookup per stage.
+
+    Request spans follow the request into Starlette's threadpool and the population
+    dispatcher threads (both run with a copy of the request context). Work done in
+    worker processes (WORKER_MODE=process) is only counted in the request totals.
+'''
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# --- CONFIG ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"  # record histograms for /metrics
+METRICS_REQUIRE_API_KEY = os.getenv("METRICS_REQUIRE_API_KEY", "0") == "1"  # /metrics behind X-API-KEY
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"  # honour X-Server-Timing requests
+
+# Histogram bucket upper bounds, seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SERVER_TIMING_HEADER = b"x-server-timing"
+
+# Spans of the current request, or None when it did not ask for Server-Timing
+_request_spans: ContextVar[list | None] = ContextVar("request_spans", default=None)
+
+
+class Histogram:
+    ''' Cumulative-bucket latency histogram family keyed by label values (thread-safe). '''
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: dict, seconds: float) -> None:
+        key = tuple(sorted(labels.items()))
+        i = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), values):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-2]!r}")
+            lines.append(f"{self.name}_count{{{labels}}} {values[-1]}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+stage_seconds = Histogram("metrics_service_stage_seconds", "Duration of instrumented computation stages")
+request_seconds = Histogram("metrics_service_request_seconds", "Duration of HTTP requests until the response starts")
+
+
+class Span:
+    __slots__ = ("stage", "labels", "start")
+
+    def __init__(self, stage: str, labels: dict):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        seconds = time.perf_counter() - self.start
+        if METRICS_ENABLED:
+            stage_seconds.observe({"stage": self.stage, **self.labels}, seconds)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((self.stage, seconds))
+
+    def label(self, **labels) -> None:
+        ''' Add labels known only once the stage has run (e.g. the pixel count). '''
+        self.labels.update(labels)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def label(self, **labels) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(stage: str, **labels) -> Span | _NullSpan:
+    ''' Time a stage (use as a context manager); a no-op unless metrics or Server-Timing are on.
+
+        Args:
+            stage (str): Stage name, e.g. "population.read"
+            **labels: Histogram labels; keep their values low-cardinality
+
+        Returns:
+            Span: Context manager whose label() adds labels before the span closes
+    '''
+    if not METRICS_ENABLED and _request_spans.get() is None:
+        return _NULL_SPAN
+    return Span(stage, labels)
+
+
+def pixel_bucket(pixels: int) -> str:
+    ''' Power-of-ten upper bound of a pixel count as a label value ("1e4" = 1001..10000 pixels). '''
+    return "0" if pixels <= 0 else f"1e{max(0, math.ceil(math.log10(pixels)))}"
+
+
+def render_metrics() -> str:
+    ''' All histograms in the Prometheus text exposition format. '''
+    return "\n".join(request_seconds.render() + stage_seconds.render()) + "\n"
+
+
+def _server_timing(spans: list, total_s: float) -> bytes:
+    # Repeated stages (e.g. one read per window cluster) are summed into one entry
+    totals: dict[str, list] = {}
+    for stage, seconds in spans:
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = [f"{stage.replace('.', '-')};dur={1000.0 * s:.3f}" + (f';desc="x{n}"' if n > 1 else "")
+             for stage, (s, n) in totals.items()]
+    parts.append(f"total;dur={1000.0 * total_s:.3f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+def _route_template(scope: Scope) -> str:
+    # Path template of the matched route (never the raw path, which is unbounded). Recent
+    # FastAPI versions keep included routers nested and record the full prefixed path in
+    # the request's effective route context; older ones flatten it into the route itself.
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None and getattr(context, "path", None):
+        return context.path
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+class TelemetryMiddleware:
+    ''' ASGI middleware timing requests and adding the opt-in Server-Timing response header.
+
+        Requests pass straight through when metrics are disabled and the client did not ask
+        for Server-Timing.
+    '''
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        wants_timing = SERVER_TIMING_ENABLED and any(
+            name == SERVER_TIMING_HEADER and value.strip() == b"1" for name, value in scope["headers"])
+        if not METRICS_ENABLED and not wants_timing:
+            await self.app(scope, receive, send)
+            return
+
+        spans = [] if wants_timing else None
+        token = _request_spans.set(spans)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                total_s = time.perf_counter() - start
+                if METRICS_ENABLED:
+                    request_seconds.observe({"method": scope["method"], "route": _route_template(scope),
+                                             "status": str(message["status"])}, total_s)
+                if spans is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(spans, total_s)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_spans.reset(token)
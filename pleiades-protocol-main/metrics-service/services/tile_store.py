@@ -0,0 +1,114 @@
+''' Uncompressed, memory-mapped copy of a population raster.
+
+    The raster is materialized once into a raw .npy array (nodata set to 0) with a small JSON
+    sidecar holding the CRS, affine transform and source nodata. Window reads are then plain
+    slices of an np.memmap: no GDAL call, no decompression and no copy, and since every uvicorn
+    worker maps the same file, the pages are shared through the OS page cache.
+
+    The build writes the array tile by tile and skips tiles without population, so on
+    filesystems with sparse file support the empty (ocean) part of the grid takes no disk.
+
+        python -m services.tile_store data/GHS_POP_E2025_GLOBE_R2023A_54009_100_V1_0.tif data/store_100
+'''
+import argparse
+import json
+import os
+
+import numpy as np
+import rasterio
+
+ARRAY_FILE = "population.npy"
+SIDECAR_FILE = "population.json"
+TILE_SIZE = 2048
+
+
+def build_tile_store(raster_path: str, out_dir: str, tile_size: int = TILE_SIZE) -> dict:
+    ''' Materialize a single-band raster into an uncompressed .npy store.
+
+        Args:
+            raster_path (str): Source GeoTIFF
+            out_dir (str): Output directory (created if missing)
+            tile_size (int): Edge of the tiles copied at a time
+
+        Returns:
+            dict: The sidecar written to out_dir/population.json
+    '''
+    os.makedirs(out_dir, exist_ok=True)
+    with rasterio.open(raster_path) as src:
+        array = np.lib.format.open_memmap(os.path.join(out_dir, ARRAY_FILE), mode="w+",
+                                          dtype=src.dtypes[0], shape=(src.height, src.width))
+        for row_off in range(0, src.height, tile_size):
+            for col_off in range(0, src.width, tile_size):
+                window = rasterio.windows.Window(col_off, row_off,
+                                                 min(tile_size, src.width - col_off),
+                                                 min(tile_size, src.height - row_off))
+                data = src.read(1, window=window)
+                if src.nodata is not None:
+                    data[data == src.nodata] = 0
+                if np.any(data):
+                    array[window.toslices()] = data
+        array.flush()
+        del array
+
+        sidecar = {
+            "source": os.path.basename(raster_path),
+            "crs": src.crs.to_wkt(),
+            "transform": list(src.transform)[:6],
+            "source_nodata": src.nodata,
+        }
+    with open(os.path.join(out_dir, SIDECAR_FILE), "w") as f:
+        json.dump(sidecar, f)
+    return sidecar
+
+
+def is_tile_store(path: str) -> bool:
+    ''' Whether path is a directory built by build_tile_store. '''
+    return os.path.isfile(os.path.join(path, SIDECAR_FILE))
+
+
+class TileStoreReader:
+    ''' Read-only view of a tile store with the subset of the rasterio DatasetReader
+        interface used by the population services (read, index, window_transform, ...).
+    '''
+    nodata = None  # nodata was set to 0 when the store was built
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, SIDECAR_FILE)) as f:
+            sidecar = json.load(f)
+        self.name = path
+        self.crs = sidecar["crs"]
+        self.transform = rasterio.Affine(*sidecar["transform"])
+        self._array = np.load(os.path.join(path, ARRAY_FILE), mmap_mode="r")
+        self.height, self.width = self._array.shape
+        self.closed = False
+
+    @property
+    def res(self) -> tuple[float, float]:
+        return (self.transform.a, -self.transform.e)
+
+    def index(self, x: float, y: float) -> tuple[int, int]:
+        return rasterio.transform.rowcol(self.transform, x, y)
+
+    def window_transform(self, window: rasterio.windows.Window) -> rasterio.Affine:
+        return rasterio.windows.transform(window, self.transform)
+
+    def read(self, band: int = 1, window: rasterio.windows.Window | None = None, **kwargs) -> np.ndarray:
+        ''' Zero-copy view of the window (which must lie inside the store). '''
+        if window is None:
+            return self._array
+        (r0, r1), (c0, c1) = window.toranges()
+        return self._array[int(r0):int(r1), int(c0):int(c1)]
+
+    def close(self) -> None:
+        self._array = None
+        self.closed = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize a population raster into a memory-mapped store")
+    parser.add_argument("raster", help="source GeoTIFF")
+    parser.add_argument("out_dir", help="output directory")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    args = parser.parse_args()
+    build_tile_store(args.raster, args.out_dir, args.tile_size)
+    print(f"store written to {args.out_dir}")
@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from services.impact_metrics import psi_to_kpa
+
+CAL_CM2 = 41_840.0  # J/m^2 in 1 cal/cm^2
+
+
+@dataclass(frozen=True)
+class VulnerabilityCurve:
+    ''' Log-logistic vulnerability curve: P(x) = 1 / (1 + (median / x) ** slope).
+
+        median is the hazard level with 50% probability and slope sets how fast the
+        probability rises around it (P(median / c) = 1 / (1 + c ** slope)).
+    '''
+    median: float
+    slope: float
+
+    @classmethod
+    def from_points(cls, x50: float, x05: float) -> "VulnerabilityCurve":
+        ''' Curve through P(x50) = 0.5 and P(x05) = 0.05. '''
+        return cls(x50, float(np.log(19.0) / np.log(x50 / x05)))
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype="float64")
+        with np.errstate(divide="ignore", over="ignore"):
+            return np.where(x > 0, 1.0 / (1.0 + (self.median / x) ** self.slope), 0.0)
+
+
+# Fatality curves (indicative). Overpressure in kPa: ~50% killed at 5 psi and ~5% at 2 psi
+# (OTA 1979 rule of thumb, mostly from building collapse). Thermal fluence in J/m^2:
+# ~50% at third-degree burn levels (8 cal/cm^2), ~5% at first-degree levels (3 cal/cm^2).
+OVERPRESSURE_FATALITY = VulnerabilityCurve.from_points(psi_to_kpa(5.0), psi_to_kpa(2.0))
+THERMAL_FATALITY = VulnerabilityCurve.from_points(8.0 * CAL_CM2, 3.0 * CAL_CM2)
@@ -0,0 +1,135 @@
+''' Process-pool worker mode for the CPU-bound population and hazard-grid work.
+
+    With WORKER_MODE=process, population queries and hazard tiles run in a pool of
+    WORKER_PROCESSES worker processes instead of threads, so one API process can use every
+    core. Workers are started with "spawn" (no inherited GDAL handles or threads) and each
+    opens its own population datasets once, in the pool initializer. Large arrays come back
+    through POSIX shared memory instead of being pickled through the result pipe.
+'''
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# --- CONFIG ---
+WORKER_MODE = os.getenv("WORKER_MODE", "thread")  # "thread" or "process"
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+BROADCAST_TIMEOUT_S = 10.0  # how long broadcast() waits for every worker to be free
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    ''' Handle of an array placed in shared memory by share_array. '''
+    name: str
+    shape: tuple
+    dtype: str
+
+
+def share_array(array: np.ndarray) -> SharedArray:
+    ''' Copy an array into a new shared memory block (worker side).
+
+        The block outlives this handle; the receiver must release it with take_array.
+    '''
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    ref = SharedArray(shm.name, array.shape, array.dtype.str)
+    shm.close()
+    return ref
+
+
+def take_array(ref: SharedArray) -> np.ndarray:
+    ''' Copy an array out of shared memory and free the block (receiver side). '''
+    shm = shared_memory.SharedMemory(name=ref.name)
+    try:
+        return np.ndarray(ref.shape, dtype=ref.dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def is_process_mode() -> bool:
+    return WORKER_MODE == "process"
+
+
+# Worker side: the barrier shared by the pool, which broadcast() calls wait on
+_worker_barrier = None
+
+
+def _init_worker(barrier) -> None:
+    ''' Open this worker's population datasets up front (one set per process). '''
+    global _worker_barrier
+    _worker_barrier = barrier
+    from services.population_datasets import warm_up
+    warm_up()  # a missing dataset is reported by the queries that need it
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _on_every_worker(fn: callable, timeout_s: float) -> tuple[int, object]:
+    result = fn()
+    # Hold this worker until every worker has taken one of the calls, so none takes two
+    _worker_barrier.wait(timeout_s)
+    return os.getpid(), result
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_barrier = None
+_pool_lock = threading.Lock()
+_broadcast_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    ''' Shared worker pool, created on first use. '''
+    global _pool, _pool_barrier
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context("spawn")
+            _pool_barrier = context.Barrier(WORKER_PROCESSES)
+            _pool = ProcessPoolExecutor(WORKER_PROCESSES, mp_context=context,
+                                        initializer=_init_worker, initargs=(_pool_barrier,))
+        return _pool
+
+
+def broadcast(fn: callable, timeout_s: float = BROADCAST_TIMEOUT_S) -> dict[int, object]:
+    ''' Run fn once in every worker process, e.g. to collect per-worker statistics.
+
+        Each call waits for the others, so the pool's WORKER_PROCESSES calls land on as many
+        distinct workers; the calls queue behind the work already submitted.
+
+        Args:
+            fn (callable): Module-level function without arguments
+            timeout_s (float): How long the workers wait for each other
+
+        Returns:
+            dict[int, object]: Result of fn by worker PID
+
+        Raises:
+            TimeoutError: If some workers stayed busy for timeout_s
+    '''
+    pool = get_process_pool()
+    with _broadcast_lock:
+        futures = [pool.submit(_on_every_worker, fn, timeout_s) for _ in range(WORKER_PROCESSES)]
+        wait(futures)
+        try:
+            return dict(f.result() for f in futures)
+        except threading.BrokenBarrierError:
+            _pool_barrier.reset()
+            raise TimeoutError(f"Worker processes stayed busy for {timeout_s:g} s")
+
+
+def prefork() -> set[int]:
+    ''' Start every worker now (and open its datasets) instead of on the first requests.
+
+        Returns:
+            set[int]: PIDs of the workers that answered
+    '''
+    pool = get_process_pool()
+    futures = [pool.submit(_ready) for _ in range(WORKER_PROCESSES)]
+    wait(futures)
+    return {f.result() for f in futures}
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+from pyproj import Transformer
+
+from benchmarks.synthetic_raster import MOLLWEIDE, write_population_raster
+from services import population_service
+from services.circle_coverage import circle_coverage, get_circle_window
+from services.population_datasets import LazyDataset, _open_pyramid, _open_prefix_index, _open_raster
+from services.raster_pool import read_population
+
+
+@dataclass
+class SyntheticPopulation:
+    ''' A 100 m and a 1 km synthetic raster sharing their cities, centred on (lon, lat). '''
+    high_path: str
+    low_path: str
+    lon: float
+    lat: float
+    center_x: float
+    center_y: float
+    high_half_width_m: float
+    low_half_width_m: float
+
+
+@pytest.fixture(scope="session")
+def synthetic_population(tmp_path_factory) -> SyntheticPopulation:
+    out = tmp_path_factory.mktemp("population")
+    lon, lat = 0.3, 0.2
+    center_x, center_y = Transformer.from_crs("EPSG:4326", MOLLWEIDE, always_xy=True).transform(lon, lat)
+    high_half, low_half = 30_000.0, 300_000.0
+    high_path, low_path = str(out / "population_100.tif"), str(out / "population_1000.tif")
+    write_population_raster(high_path, center_x, center_y, 100.0, high_half, city_extent_m=high_half)
+    write_population_raster(low_path, center_x, center_y, 1000.0, low_half, city_extent_m=high_half)
+    return SyntheticPopulation(high_path, low_path, lon, lat, center_x, center_y, high_half, low_half)
+
+
+@pytest.fixture
+def population(synthetic_population, monkeypatch, tmp_path):
+    ''' population_service reading the synthetic rasters, with no prefix tables or pyramid built.
+
+        Tests opt into an index with use_prefix_tables() / use_pyramid().
+    '''
+    missing = str(tmp_path / "not_built")
+    monkeypatch.setattr(population_service, "raster_high",
+                        LazyDataset("raster_100m", synthetic_population.high_path, _open_raster, required=True))
+    monkeypatch.setattr(population_service, "raster_low",
+                        LazyDataset("raster_1km", synthetic_population.low_path, _open_raster, required=True))
+    monkeypatch.setattr(population_service, "prefix_high", LazyDataset("prefix_100m", missing, _open_prefix_index))
+    monkeypatch.setattr(population_service, "prefix_low", LazyDataset("prefix_1km", missing, _open_prefix_index))
+    monkeypatch.setattr(population_service, "pyramid", LazyDataset("pyramid", missing, _open_pyramid))
+    return population_service
+
+
+@pytest.fixture
+def direct_circle_sum(population):
+    ''' Unrounded estimate_population without indexes: exact coverage over the raster window. '''
+    def circle_sum(lon: float, lat: float, radius_m: float) -> float:
+        src, proj_to_raster = population.select_raster_and_transform(radius_m)
+        x, y = proj_to_raster(lon, lat)
+        window = get_circle_window(src, x, y, radius_m)
+        if window is None:
+            return 0.0
+        data = read_population(src, window)
+        return circle_coverage(x, y, radius_m, src.window_transform(window), data.shape).weighted_sum(data)
+    return circle_sum
+
+
+def to_wgs84(x, y) -> tuple[np.ndarray, np.ndarray]:
+    ''' Mollweide -> (lon, lat). '''
+    lon, lat = Transformer.from_crs(MOLLWEIDE, "EPSG:4326", always_xy=True).transform(x, y)
+    return np.asarray(lon), np.asarray(lat)
+
+
+@pytest.fixture
+def mollweide_to_wgs84():
+    return to_wgs84
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+import rasterio
+from pyproj import Transformer
+from rasterio.transform import from_origin
+
+from benchmarks.synthetic_raster import MOLLWEIDE, write_land_mask, write_population_raster
+from services.coastal_index import CoastalIndex, build_coastal_index, tsunami_exposure, wave_range_km
+from services.impact_metrics import R_EARTH
+from services.impact_metrics_vec import ImpactMetricsVec
+
+
+def brute_force(index: CoastalIndex, lon: float, lat: float, range_km: float) -> tuple[np.ndarray, np.ndarray]:
+    ''' Population and distance of every coast cell within range_km, by a haversine scan of all cells. '''
+    cell_lon = np.radians(np.asarray(index.lon, dtype="float64"))
+    cell_lat = np.radians(np.asarray(index.lat, dtype="float64"))
+    lon0, lat0 = np.radians(lon), np.radians(lat)
+    a = np.sin((cell_lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(cell_lat) * np.sin((cell_lon - lon0) / 2) ** 2
+    dist_km = 2.0 * R_EARTH / 1000.0 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    keep = dist_km <= range_km
+    return np.asarray(index.population, dtype="float64")[keep], dist_km[keep]
+
+
+def assert_same_cells(index: CoastalIndex, lon: float, lat: float, range_km: float):
+    population, dist_km = index.cells_within(lon, lat, range_km)
+    ref_population, ref_dist_km = brute_force(index, lon, lat, range_km)
+    assert len(dist_km) == len(ref_dist_km)
+    np.testing.assert_allclose(np.sort(dist_km), np.sort(ref_dist_km))
+    np.testing.assert_allclose(population.sum(), ref_population.sum(), rtol=1e-12)
+
+
+@pytest.fixture(scope="module")
+def synthetic_index(tmp_path_factory) -> tuple[CoastalIndex, float, float]:
+    ''' Coastal index of a synthetic population raster and its write_land_mask mask. '''
+    out = tmp_path_factory.mktemp("coastal")
+    center_x, center_y = Transformer.from_crs("EPSG:4326", MOLLWEIDE, always_xy=True).transform(0.3, 0.2)
+    population_path = str(out / "population.tif")
+    write_population_raster(population_path, center_x, center_y, 2000.0, 200_000.0)
+    mask_path = str(out / "mask.tif")
+    write_land_mask(mask_path, population_path)
+    build_coastal_index(mask_path, population_path, str(out / "index"))
+    return CoastalIndex(str(out / "index")), center_x, center_y
+
+
+@pytest.fixture(scope="module")
+def global_index(tmp_path_factory) -> CoastalIndex:
+    ''' Coastal index of a global 1-degree WGS84 mask with coast up to the poles and the antimeridian. '''
+    out = tmp_path_factory.mktemp("coastal_global")
+    rng = np.random.default_rng(0)
+    water = rng.random((180, 360)) < 0.3
+    profile = {"driver": "GTiff", "width": 360, "height": 180, "count": 1, "crs": "EPSG:4326",
+               "transform": from_origin(-180.0, 90.0, 1.0, 1.0)}
+    with rasterio.open(out / "mask.tif", "w", dtype="uint8", **profile) as dst:
+        dst.write(np.where(water, 0, 1).astype("uint8"), 1)
+    with rasterio.open(out / "population.tif", "w", dtype="float32", nodata=-200.0, **profile) as dst:
+        dst.write(rng.uniform(0.0, 1e5, (180, 360)).astype("float32"), 1)
+    build_coastal_index(str(out / "mask.tif"), str(out / "population.tif"), str(out / "index"))
+    return CoastalIndex(str(out / "index"))
+
+
+def test_synthetic_mask_has_coast(synthetic_index):
+    index, _, _ = synthetic_index
+    assert index.index["cells"] > 0
+    assert index.index["total_population"] > 0
+
+
+@pytest.mark.parametrize("offset_km, range_km", [(0, 50), (-80, 60), (-120, 200), (0, 1000)])
+def test_cells_within_matches_brute_force(synthetic_index, offset_km, range_km):
+    index, center_x, center_y = synthetic_index
+    lon, lat = Transformer.from_crs(MOLLWEIDE, "EPSG:4326", always_xy=True).transform(
+        center_x, center_y + offset_km * 1000.0)
+    assert_same_cells(index, lon, lat, range_km)
+
+
+@pytest.mark.parametrize("lon, lat, range_km", [
+    (179.7, 10.0, 500.0),     # across the antimeridian, eastward
+    (-179.6, -35.0, 800.0),   # across the antimeridian, westward
+    (20.0, 88.5, 600.0),      # over the north pole
+    (-100.0, -89.2, 300.0),   # around the south pole
+    (0.0, 0.0, 30_000.0),     # the whole sphere
+])
+def test_cells_within_antimeridian_and_poles(global_index, lon, lat, range_km):
+    assert_same_cells(global_index, lon, lat, range_km)
+
+
+@pytest.mark.parametrize("energy", [1e20, 1e22])
+def test_band_totals(synthetic_index, energy):
+    index, center_x, center_y = synthetic_index
+    lon, lat = Transformer.from_crs(MOLLWEIDE, "EPSG:4326", always_xy=True).transform(
+        center_x, center_y - 120_000.0 - 30_000.0)
+    bands = (0.5, 1.0, 2.0, 5.0, 10.0)
+    result = tsunami_exposure(index, lon, lat, energy, 3000.0, bands)
+
+    range_km = wave_range_km(energy, 3000.0, bands[0])
+    population, dist_km = brute_force(index, lon, lat, range_km)
+    height = ImpactMetricsVec.tsunami_wave_height_coast(energy, 3000.0, dist_km)
+    edges = list(bands) + [np.inf]
+    for band, lo, hi in zip(result["bands"], edges[:-1], edges[1:]):
+        inside = (height >= lo) & (height < hi)
+        assert band["coast_cells"] == int(inside.sum())
+        assert band["population"] == pytest.approx(population[inside].sum(), rel=1e-9)
+    assert result["exposed_population"] == pytest.approx(population[height >= bands[0]].sum(), rel=1e-9)
+    assert result["coast_cells"] == len(dist_km)
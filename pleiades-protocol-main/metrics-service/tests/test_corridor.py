@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from services.corridor import sample_polyline
+from services.population_datasets import LazyDataset, _open_pyramid
+from services.population_pyramid import build_pyramid
+
+
+def pixel_centres(population, to_wgs84, lons, lats, radius_m) -> tuple[np.ndarray, np.ndarray]:
+    ''' Centre (lon, lat) of the pixel holding each point, where the sweep centres its circles. '''
+    src, proj_to_raster = population.select_raster_and_transform(radius_m)
+    xs, ys = proj_to_raster(np.asarray(lons), np.asarray(lats))
+    t = src.transform
+    cols, rows = np.floor((xs - t.c) / t.a), np.floor((ys - t.f) / t.e)
+    return to_wgs84(t.c + (cols + 0.5) * t.a, t.f + (rows + 0.5) * t.e)
+
+
+def corridor(synthetic_population, mollweide_to_wgs84, vertices_m, samples) -> tuple[np.ndarray, np.ndarray]:
+    ''' Points sampled along a polyline given in Mollweide meters relative to the raster centre. '''
+    x, y = np.array(vertices_m, dtype="float64").T
+    lons, lats = mollweide_to_wgs84(synthetic_population.center_x + x, synthetic_population.center_y + y)
+    lons, lats, _ = sample_polyline(lons.tolist(), lats.tolist(), samples)
+    return lons, lats
+
+
+CORRIDORS = {
+    # West to east through the centre, then a right-angle turn to the north
+    "turn": ([(-20_000.0, -5_000.0), (3_000.0, -5_000.0), (3_000.0, 20_000.0)], 150, 3_000.0),
+    # Leaves the 100 m raster (half-width 30 km) through the east edge and comes back
+    "leaves_raster": ([(10_000.0, 1_000.0), (45_000.0, 8_000.0), (20_000.0, 25_000.0)], 120, 4_000.0),
+    # Large radius on the 1 km raster, past its corner
+    "low_res": ([(-100_000.0, 0.0), (250_000.0, 250_000.0), (350_000.0, 330_000.0)], 80, 120_000.0),
+}
+
+
+@pytest.mark.parametrize("name", CORRIDORS)
+@pytest.mark.parametrize("chunk_pixels", [16_000_000, 60_000])
+def test_sweep_matches_direct_queries(population, synthetic_population, direct_circle_sum, mollweide_to_wgs84,
+                                      monkeypatch, name, chunk_pixels):
+    monkeypatch.setattr(population, "CORRIDOR_CHUNK_PIXELS", chunk_pixels)
+    vertices, samples, radius_m = CORRIDORS[name]
+    lons, lats = corridor(synthetic_population, mollweide_to_wgs84, vertices, samples)
+    sums = population.estimate_population_corridor(lons.tolist(), lats.tolist(), radius_m)
+
+    centre_lons, centre_lats = pixel_centres(population, mollweide_to_wgs84, lons, lats, radius_m)
+    direct = [direct_circle_sum(lon, lat, radius_m) for lon, lat in zip(centre_lons, centre_lats)]
+    np.testing.assert_allclose(sums, direct, rtol=1e-9, atol=1e-6)
+    assert [round(s) for s in sums] == [population.estimate_population(lon, lat, radius_m)
+                                        for lon, lat in zip(centre_lons, centre_lats)]
+    assert min(sums) < max(sums)
+
+
+@pytest.fixture(scope="module")
+def pyramid_dir(synthetic_population, tmp_path_factory) -> str:
+    out = str(tmp_path_factory.mktemp("pyramid") / "pyramid")
+    build_pyramid(synthetic_population.high_path, out, levels=3)
+    return out
+
+
+@pytest.mark.parametrize("name", ["turn", "leaves_raster"])
+@pytest.mark.parametrize("pixel_budget", [2_000_000, 20_000])
+def test_pyramid_path_matches_direct_queries(population, synthetic_population, direct_circle_sum,
+                                             mollweide_to_wgs84, pyramid_dir, monkeypatch, name, pixel_budget):
+    monkeypatch.setattr(population, "pyramid", LazyDataset("pyramid", pyramid_dir, _open_pyramid))
+    monkeypatch.setattr(population, "PYRAMID_PIXEL_BUDGET", pixel_budget)
+    vertices, samples, radius_m = CORRIDORS[name]
+    lons, lats = corridor(synthetic_population, mollweide_to_wgs84, vertices, samples)
+    sums = population.estimate_population_corridor(lons.tolist(), lats.tolist(), radius_m)
+
+    # The same circles as estimate_population, at the points themselves
+    assert [round(s) for s in sums] == [population.estimate_population(lon, lat, radius_m)
+                                        for lon, lat in zip(lons, lats)]
+    direct = np.array([direct_circle_sum(lon, lat, radius_m) for lon, lat in zip(lons, lats)])
+    if pixel_budget == 2_000_000:
+        # The whole window fits in the budget: every circle is read at 100 m, exactly
+        np.testing.assert_allclose(sums, direct, rtol=1e-9, atol=1e-6)
+    else:
+        # Coarser levels with the edge refined as far as the budget allows
+        np.testing.assert_allclose(sums, direct, rtol=0.02)
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from services.impact_metrics import RHO_TARGET, Asteroid, Atmosphere, ImpactMetrics, ImpactScenario, Target
+from services.impact_metrics_vec import ImpactMetricsVec
+
+R_MIN, R_MAX = 10.0, 1_000_000.0
+
+
+def random_airbursts(seed: int, n: int = 5000):
+    """ Escenarios aleatorios: ~0.2 kt .. 24 Gt, 0 .. 50 km de altura, umbrales de daño. """
+    rng = np.random.default_rng(seed)
+    E = 10 ** rng.uniform(12, 20, n)
+    h = rng.uniform(0.0, 50_000.0, n)
+    kpa = np.array(list(ImpactMetrics.damage_thresholds_kpa().values()) + [100.0, 500.0])
+    return E, h, rng.choice(kpa, n)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_radius_for_overpressure_airburst_is_a_crossing(seed):
+    E, h, kpa = random_airbursts(seed)
+    target = kpa * 1_000.0
+    p = ImpactMetricsVec.overpressure_collins_airburst
+    R = ImpactMetricsVec.radius_for_overpressure_airburst(E, h, kpa, R_min=R_MIN, R_max=R_MAX)
+
+    # NaN exactamente donde ni en R_min se alcanza el umbral
+    np.testing.assert_array_equal(np.isnan(R), p(E, h, R_MIN) < target)
+
+    # Cruce real: p >= umbral justo antes del radio y p <= umbral justo después
+    # (también en los saltos de la transición Mach)
+    inner = ~np.isnan(R) & (R < R_MAX)
+    eps = np.maximum(R[inner] * 1e-9, 1e-6)
+    before = p(E[inner], h[inner], np.maximum(R[inner] - eps, R_MIN))
+    after = p(E[inner], h[inner], R[inner] + eps)
+    assert np.all(before >= target[inner])
+    assert np.all(after <= target[inner])
+
+    # R_max: el umbral no se cruza dentro del rango
+    capped = R == R_MAX
+    assert np.all(p(E[capped], h[capped], R_MAX) >= target[capped])
+
+
+def test_radius_for_overpressure_airburst_matches_scalar_where_monotonic():
+    # La bisección escalar es fiable en el tramo cercano (monótono): ambos deben coincidir
+    E, h, kpa = random_airbursts(0, 500)
+    R = ImpactMetricsVec.radius_for_overpressure_airburst(E, h, kpa)
+    for e, hh, k, r in zip(E, h, kpa, R):
+        ref = ImpactMetrics.radius_for_overpressure_airburst(e, hh, k, tol=1.0)
+        if ref is None:
+            assert np.isnan(r)
+        elif abs(ref - r) > 1.0:
+            # Sólo si la bisección se saltó un cruce anterior (el tramo lejano vuelve a crecer)
+            assert r < ref
+
+
+# Malla pequeña de escenarios para comparar con las funciones escalares de ImpactMetrics
+ASTEROID_AXES = ([5.0, 50.0, 300.0], [12_000.0, 25_000.0], [1_500.0, 3_000.0], [0.0, 0.3])
+GRID_D, GRID_V, GRID_RHO, GRID_POR = (a.ravel() for a in np.meshgrid(*ASTEROID_AXES, indexing="ij"))
+GRID_E = ImpactMetricsVec.kinetic_energy(GRID_D, GRID_V, GRID_RHO, 1.0, GRID_POR)
+GRID_R = np.array([0.0, 100.0, 3_000.0, 50_000.0, 400_000.0])
+GRID_H = np.array([0.0, 500.0, 10_000.0, 40_000.0])
+
+
+def scalar_grid(fn, *axes):
+    """ fn escalar evaluada en el producto de los ejes, con la forma de la malla. """
+    grids = np.meshgrid(*axes, indexing="ij")
+    return np.vectorize(fn, otypes=["float64"])(*grids), grids
+
+
+@pytest.mark.parametrize("name, vectorized, scalar, axes", [
+    ("kinetic_energy",
+     lambda d, v, rho, por: ImpactMetricsVec.kinetic_energy(d, v, rho, 1.0, por),
+     lambda d, v, rho, por: ImpactMetrics.kinetic_energy(Asteroid(d, v, rho, 1.0, por)),
+     ASTEROID_AXES),
+    ("fireball_radius", ImpactMetricsVec.fireball_radius, ImpactMetrics.fireball_radius, (GRID_E,)),
+    ("thermal_exposure_at_distance",
+     lambda E, r, h: ImpactMetricsVec.thermal_exposure_at_distance(E, r, 0.1, h),
+     lambda E, r, h: ImpactMetrics.thermal_exposure_at_distance(E, r, Atmosphere(0.1, h)),
+     (GRID_E, GRID_R, GRID_H)),
+    ("corrected_exposure", ImpactMetricsVec.corrected_exposure, ImpactMetrics.corrected_exposure,
+     (GRID_E, GRID_R)),
+    ("overpressure_collins_airburst", ImpactMetricsVec.overpressure_collins_airburst,
+     ImpactMetrics.overpressure_collins_airburst, (GRID_E, GRID_H, GRID_R)),
+    ("crater_diameter_simple", ImpactMetricsVec.crater_diameter_simple,
+     lambda E, rho: ImpactMetrics.crater_diameter_simple(E, Target(rho)), (GRID_E, [1_000.0, 2_500.0])),
+    ("seismic_magnitude_Mw", ImpactMetricsVec.seismic_magnitude_Mw, ImpactMetrics.seismic_magnitude_Mw,
+     (GRID_E,)),
+])
+def test_vectorized_matches_scalar(name, vectorized, scalar, axes):
+    expected, grids = scalar_grid(scalar, *axes)
+    np.testing.assert_allclose(vectorized(*grids), expected, rtol=1e-12, atol=0.0, equal_nan=True)
+
+
+@pytest.mark.parametrize("is_airburst, burst_altitude_m, water_depth_m", [
+    (True, 8_000.0, None),
+    (True, 30_000.0, None),
+    (False, 0.0, None),
+    (False, 0.0, 3_000.0),
+])
+def test_summarize_batch_matches_summarize(is_airburst, burst_altitude_m, water_depth_m):
+    batch = ImpactMetricsVec.summarize_batch(GRID_D, GRID_V, GRID_RHO, GRID_POR, burst_altitude_m, 1.0,
+                                             is_airburst, RHO_TARGET, water_depth_m)
+    for i in range(len(GRID_D)):
+        ref = ImpactMetrics.summarize(Asteroid(GRID_D[i], GRID_V[i], GRID_RHO[i], 1.0, GRID_POR[i]),
+                                      ImpactScenario(is_airburst), Target(RHO_TARGET, water_depth_m),
+                                      Atmosphere(burst_altitude_m=burst_altitude_m))
+        np.testing.assert_allclose(batch["energy_joules"][i], ref["energy"]["E_joules"], rtol=1e-12)
+        np.testing.assert_allclose(batch["yield_megatons"][i], ref["energy"]["yield_megatons"], rtol=1e-12)
+        for sample in ref["thermal_profile"]:
+            np.testing.assert_allclose(batch[f"thermal_fluence_Jm2_{sample['r_km']}km"][i],
+                                       sample["fluence_Jm2"], rtol=1e-12)
+        if is_airburst:
+            for key, r_km in ref["overpressure_isobars_km"].items():
+                np.testing.assert_allclose(batch[f"isobar_{key}_km"][i], np.nan if r_km is None else r_km,
+                                           rtol=1e-12, equal_nan=True)
+        else:
+            np.testing.assert_allclose(batch["crater_diameter_m"][i], ref["crater"]["final_diameter_m"], rtol=1e-12)
+            np.testing.assert_allclose(batch["seismic_Mw"][i], ref["seismic"]["Mw"], rtol=1e-12)
+            if water_depth_m:
+                np.testing.assert_allclose(batch["tsunami_H_100km_m"][i], ref["tsunami"]["H_100km_m"], rtol=1e-12)
@@ -0,0 +1,31 @@
+import pytest
+
+from services.montecarlo import Distribution, UncertainImpact, run_montecarlo
+
+
+def asteroid(**kwargs) -> UncertainImpact:
+    return UncertainImpact(diameter_m=Distribution("uniform", 50.0, 150.0),
+                           velocity_mps=Distribution(a=20_000.0),
+                           density_kgm3=Distribution(a=3_000.0), **kwargs)
+
+
+def test_airburst_at_altitude_zero_is_a_ground_impact():
+    """ Como ImpactMetrics.summarize: sin altura de explosión, cráter y Mw en vez de isóbaras. """
+    airburst = run_montecarlo(asteroid(is_airburst=True), 1000, seed=1)["metrics"]
+    ground = run_montecarlo(asteroid(is_airburst=False), 1000, seed=1)["metrics"]
+    assert airburst == ground
+    assert "crater_diameter_m" in airburst and not any(k.startswith("isobar_") for k in airburst)
+
+
+def test_airburst_isobars_at_positive_altitude():
+    metrics = run_montecarlo(asteroid(burst_altitude_m=Distribution("lognormal", 8_000.0, 0.3)),
+                             1000, seed=1)["metrics"]
+    assert "crater_diameter_m" not in metrics
+    assert metrics["isobar_window_break_light_km"]["valid_fraction"] == 1.0
+
+
+@pytest.mark.parametrize("altitude", [Distribution("normal", 8_000.0, 2_000.0),
+                                      Distribution("uniform", 0.0, 10_000.0)])
+def test_airburst_altitude_that_can_reach_zero_is_rejected(altitude):
+    with pytest.raises(ValueError, match="burst_altitude_m"):
+        run_montecarlo(asteroid(burst_altitude_m=altitude), 1000, seed=1)
@@ -0,0 +1,108 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from services import impact_metrics, neo_catalog
+from services.neo_catalog import FORMULAS, NeoScenarioStore, read_catalog
+
+SAMPLE = os.path.join(os.path.dirname(__file__), os.pardir, "catalog", "neo_sample.csv")
+
+
+def write_catalog(path, rows) -> str:
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def sample_rows() -> list:
+    with open(SAMPLE, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def regime_scenarios(regime: str) -> int:
+    """ Escenarios (3 por objeto) de un régimen en el catálogo de ejemplo. """
+    airburst = regime == "airburst"
+    return 3 * sum((obj["burst_altitude_m"] is not None) == airburst for obj in read_catalog(SAMPLE))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = NeoScenarioStore(str(tmp_path / "neo_store.sqlite"))
+    assert store.ingest(SAMPLE)["computed"] == 36
+    return store
+
+
+def test_first_ingest_computes_every_scenario(store):
+    obj = store.get("2008TC3")
+    assert obj["name"] == "2008 TC3"
+    assert list(obj["scenarios"]) == ["low", "nominal", "high"]
+    assert store.list_objects()["total"] == 12
+
+
+def test_second_ingest_reuses_every_scenario(store):
+    stats = store.ingest(SAMPLE)
+    assert (stats["computed"], stats["reused"], stats["deleted"]) == (0, 36, 0)
+
+
+def test_edited_row_recomputes_only_that_object(store, tmp_path):
+    rows = sample_rows()
+    rows[2]["density_min_kgm3"], rows[2]["density_max_kgm3"] = "1600", "3400"
+    before = store.get(rows[2]["id"])["scenarios"]
+    stats = store.ingest(write_catalog(tmp_path / "edited.csv", rows))
+    assert (stats["computed"], stats["reused"], stats["deleted"]) == (3, 33, 0)
+
+    after = store.get(rows[2]["id"])["scenarios"]
+    assert after["high"]["inputs"]["density_kgm3"] == 3400.0
+    for case in after:
+        assert after[case]["metrics"]["energy_joules"] > before[case]["metrics"]["energy_joules"]
+
+
+def test_edited_maximum_keeps_the_low_case(store, tmp_path):
+    rows = sample_rows()
+    rows[2]["diameter_max_m"] = "95"
+    before = store.get(rows[2]["id"])["scenarios"]
+    stats = store.ingest(write_catalog(tmp_path / "edited.csv", rows))
+    assert (stats["computed"], stats["reused"]) == (2, 34)  # nominal y high
+    assert store.get(rows[2]["id"])["scenarios"]["low"] == before["low"]
+
+
+def test_changed_constant_recomputes_only_its_regime(store, monkeypatch):
+    monkeypatch.setattr(impact_metrics, "GRAVITY", impact_metrics.GRAVITY * 1.01)  # sólo el cráter
+    stats = store.ingest(SAMPLE)
+    assert stats["computed"] == regime_scenarios("ground")
+    assert stats["reused"] == regime_scenarios("airburst")
+
+
+def test_changed_formula_recomputes_only_its_regime(store, monkeypatch):
+    def overpressure_collins_airburst(E_joules, burst_altitude_m, r_m):
+        return np.zeros_like(np.asarray(r_m, dtype="float64"))
+
+    monkeypatch.setitem(FORMULAS, "airburst", FORMULAS["airburst"][:-2] + (
+        overpressure_collins_airburst, FORMULAS["airburst"][-1]))
+    stats = store.ingest(SAMPLE)
+    assert stats["computed"] == regime_scenarios("airburst")
+    assert stats["reused"] == regime_scenarios("ground")
+
+
+def test_removed_row_is_deleted(store, tmp_path):
+    rows = sample_rows()
+    removed = rows.pop(0)["id"]
+    stats = store.ingest(write_catalog(tmp_path / "shorter.csv", rows))
+    assert (stats["computed"], stats["reused"], stats["deleted"]) == (0, 33, 3)
+    assert store.get(removed) is None
+    assert store.list_objects()["total"] == 11
+
+
+def test_unknown_id_is_none(store):
+    assert store.get("NOT-IN-CATALOG") is None
+
+
+def test_fingerprints_are_independent_per_regime(monkeypatch):
+    before = {regime: neo_catalog.model_fingerprint(regime) for regime in FORMULAS}
+    monkeypatch.setattr(impact_metrics, "J_PER_KT", impact_metrics.J_PER_KT * 1.01)  # sólo las isóbaras
+    assert neo_catalog.model_fingerprint("airburst") != before["airburst"]
+    assert neo_catalog.model_fingerprint("ground") == before["ground"]
@@ -0,0 +1,26 @@
+import pytest
+
+from services.impact_metrics import ImpactMetrics
+from services.impact_metrics_vec import ImpactMetricsVec
+from services.risk_map import risk_radius_m
+
+
+# Airbursts where the scalar bisection misses the isobar and returns R_max (1000 km)
+@pytest.mark.parametrize("energy, burst_altitude_m, threshold_kpa", [
+    (1.2465034893647642e17, 13_489.3, 20.7),
+    (2.00467797189254e19, 30_331.8, 100.0),
+    (3.363786575155284e18, 136.9, 20.7),
+])
+def test_risk_radius_is_the_isobar(energy, burst_altitude_m, threshold_kpa):
+    radius = risk_radius_m(energy, burst_altitude_m, threshold_kpa)
+    assert radius < 100_000.0
+    p = ImpactMetricsVec.overpressure_collins_airburst
+    assert p(energy, burst_altitude_m, radius * (1 - 1e-6)) >= threshold_kpa * 1000.0
+    assert p(energy, burst_altitude_m, radius * (1 + 1e-6)) <= threshold_kpa * 1000.0
+
+
+def test_risk_radius_falls_back_to_the_fireball():
+    energy = 4e16
+    fireball = ImpactMetrics.fireball_radius(energy)
+    assert risk_radius_m(energy) == fireball  # ground impact
+    assert risk_radius_m(energy, 8_000.0, 1e6) == fireball  # threshold never reached
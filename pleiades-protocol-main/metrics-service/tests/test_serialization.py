@@ -0,0 +1,68 @@
+import gzip
+import io
+
+import msgpack
+import numpy as np
+import orjson
+import pyarrow as pa
+
+from services import serialization
+from services.serialization import ARROW, JSON, MSGPACK, NegotiatedResponse, Table
+
+
+def respond(content, accept=None, accept_encoding=None) -> NegotiatedResponse:
+    serialization._request_accept.set((accept, accept_encoding))
+    return NegotiatedResponse(content)
+
+
+def test_json_by_default_and_for_unknown_types():
+    for accept in (None, "*/*", "text/html", "text/html, application/xhtml+xml", "text/csv;q=0.9"):
+        response = respond({"a": 1}, accept)
+        assert response.media_type == JSON
+        assert orjson.loads(response.body) == {"a": 1}
+
+
+def test_accept_quality_order():
+    assert serialization.acceptable_media_types(f"{JSON};q=0.5, application/x-msgpack") == [MSGPACK, JSON]
+    assert serialization.acceptable_media_types(f"{ARROW}, */*;q=0.1") == [ARROW, JSON, MSGPACK]
+    assert serialization.acceptable_media_types(f"{MSGPACK};q=0") == []
+
+
+def test_table_is_records_in_json_and_columns_elsewhere():
+    content = {"radius_m": 5.0, "results": Table(lat=[1.0, 2.0], population_estimate=np.array([3.0, np.nan]))}
+    assert orjson.loads(respond(content).body) == {
+        "radius_m": 5.0, "results": [{"lat": 1.0, "population_estimate": 3.0}, {"lat": 2.0, "population_estimate": None}]}
+
+    packed = msgpack.unpackb(respond(content, MSGPACK).body)
+    assert packed["results"]["lat"] == [1.0, 2.0]
+
+    response = respond(content, ARROW)
+    assert response.media_type == ARROW
+    table = pa.ipc.open_stream(io.BytesIO(response.body)).read_all()
+    assert table.column("lat").to_pylist() == [1.0, 2.0]
+    assert table.schema.metadata[b"radius_m"] == b"5.0"
+
+
+def test_arrow_falls_back_to_json_without_a_table():
+    response = respond({"energy": 1.0}, ARROW)
+    assert response.media_type == JSON
+    assert orjson.loads(response.body) == {"energy": 1.0}
+
+
+def test_compression_above_threshold():
+    small = respond({"a": 1}, accept_encoding="gzip")
+    assert "content-encoding" not in small.headers
+    big = {"r_m": np.arange(10_000, dtype="float64")}
+    response = respond(big, accept_encoding="gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == serialization.encode_json(big)
+    assert respond(big, accept_encoding="gzip;q=0.5, zstd").headers["content-encoding"] == "zstd"
+    assert "content-encoding" not in respond(big, accept_encoding="identity").headers
+
+
+def test_encoding_choice():
+    assert serialization.choose_encoding("gzip, zstd") == "zstd"
+    assert serialization.choose_encoding("zstd;q=0.5, gzip") == "gzip"
+    assert serialization.choose_encoding("br, *;q=0.1") == "zstd"
+    assert serialization.choose_encoding("br, identity") is None
+    assert serialization.choose_encoding("gzip;q=0") is None
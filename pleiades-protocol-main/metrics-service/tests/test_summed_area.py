@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from services.population_datasets import LazyDataset, _open_prefix_index
+from services.summed_area import PrefixSumIndex, build_prefix_tables
+
+# Centres relative to the centre of the 100 m raster (half-width 30 km), in Mollweide meters
+CIRCLES = [
+    (0.0, 0.0, 5_000.0),                # inside
+    (1_234.5, -876.5, 40.0),            # smaller than a pixel
+    (29_500.0, 0.0, 2_000.0),           # crosses the east edge
+    (-29_950.0, 300.0, 3_000.0),        # crosses the west edge
+    (0.0, 30_000.0, 1_500.0),           # centred on the north edge
+    (-200.0, -29_990.0, 7_000.0),       # crosses the south edge
+    (29_000.0, 29_000.0, 4_000.0),      # corner
+    (30_400.0, 30_400.0, 2_000.0),      # centre outside, overlaps the corner
+    (0.0, 0.0, 45_000.0),               # larger than the raster
+    (40_000.0, 0.0, 5_000.0),           # outside the raster
+]
+
+
+@pytest.fixture(scope="module")
+def prefix_dirs(synthetic_population, tmp_path_factory) -> dict:
+    ''' Prefix tables of both synthetic rasters, in small tiles so that spans cross tiles. '''
+    out = tmp_path_factory.mktemp("prefix")
+    build_prefix_tables(synthetic_population.high_path, str(out / "prefix_100"), tile_size=128)
+    build_prefix_tables(synthetic_population.low_path, str(out / "prefix_1000"), tile_size=128)
+    return {"high": str(out / "prefix_100"), "low": str(out / "prefix_1000")}
+
+
+@pytest.mark.parametrize("dx, dy, radius_m", CIRCLES)
+def test_circle_sum_matches_the_raster_path(synthetic_population, prefix_dirs, direct_circle_sum,
+                                            mollweide_to_wgs84, dx, dy, radius_m):
+    index = PrefixSumIndex(prefix_dirs["high"])
+    lon, lat = mollweide_to_wgs84(synthetic_population.center_x + dx, synthetic_population.center_y + dy)
+    np.testing.assert_allclose(index.circle_sum(lon, lat, radius_m), direct_circle_sum(lon, lat, radius_m),
+                               rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("dx, dy, radius_m", [(0.0, 0.0, 150_000.0), (280_000.0, -100_000.0, 120_000.0),
+                                              (-290_000.0, 295_000.0, 200_000.0)])
+def test_estimate_population_with_prefix_tables(population, synthetic_population, prefix_dirs, direct_circle_sum,
+                                                mollweide_to_wgs84, monkeypatch, dx, dy, radius_m):
+    lon, lat = mollweide_to_wgs84(synthetic_population.center_x + dx, synthetic_population.center_y + dy)
+    expected = round(direct_circle_sum(lon, lat, radius_m))
+    monkeypatch.setattr(population, "prefix_high", LazyDataset("prefix_100m", prefix_dirs["high"], _open_prefix_index))
+    monkeypatch.setattr(population, "prefix_low", LazyDataset("prefix_1km", prefix_dirs["low"], _open_prefix_index))
+    assert population.estimate_population(lon, lat, radius_m) == expected
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from models.impact_models import SweepRequest
+from services.impact_metrics import Asteroid, Atmosphere, ImpactMetrics, ImpactScenario, Target
+from services.sweep import AXES, SweepSpec, axis_values, iter_sweep_batches
+
+
+def spec_of(payload: SweepRequest) -> SweepSpec:
+    """ La SweepSpec que construye el router /impacts/sweep. """
+    return SweepSpec(
+        axes={name: axis_values(**getattr(payload, name).model_dump()) for name in AXES},
+        shape_factor=payload.shape_factor,
+        is_airburst=payload.is_airburst,
+        target_density_kgm3=payload.target_density_kgm3,
+        water_depth_m=payload.water_depth_m,
+    )
+
+
+def test_default_sweep_matches_summarize():
+    """ Con los valores por defecto (airburst a 0 m) el barrido da lo mismo que summarize: impacto en suelo. """
+    payload = SweepRequest(diameter_m={"values": [20.0, 100.0, 1000.0]},
+                           velocity_mps={"values": [12_000.0, 20_000.0]},
+                           density_kgm3={"values": [3_000.0]})
+    columns = next(iter_sweep_batches(spec_of(payload)))
+    assert not any(key.startswith("isobar_") for key in columns)
+
+    for i in range(len(columns["diameter_m"])):
+        asteroid = Asteroid(columns["diameter_m"][i], columns["velocity_mps"][i], columns["density_kgm3"][i],
+                            payload.shape_factor, columns["porosity"][i])
+        expected = ImpactMetrics.summarize(asteroid, ImpactScenario(payload.is_airburst),
+                                           Target(payload.target_density_kgm3, payload.water_depth_m),
+                                           Atmosphere(burst_altitude_m=columns["burst_altitude_m"][i]))
+        np.testing.assert_allclose(columns["energy_joules"][i], expected["energy"]["E_joules"], rtol=1e-12)
+        np.testing.assert_allclose(columns["crater_diameter_m"][i], expected["crater"]["final_diameter_m"], rtol=1e-12)
+        np.testing.assert_allclose(columns["seismic_Mw"][i], expected["seismic"]["Mw"], rtol=1e-12)
+
+
+def test_airburst_altitudes_mixing_zero_are_rejected():
+    payload = SweepRequest(diameter_m={"values": [100.0]}, velocity_mps={"values": [20_000.0]},
+                           density_kgm3={"values": [3_000.0]},
+                           burst_altitude_m={"start": 0.0, "stop": 10_000.0, "num": 5})
+    with pytest.raises(ValueError, match="burst_altitude_m"):
+        spec_of(payload)